@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark of the import time of the command line tool, measured with python -X importtime, for:
+  - auto_po_lyglot --show-prompts
+  - a one-entry run with the ollama client (against a local stub of the Ollama OpenAI-compatible API)
+  - the import of all the client modules, as done by the package __init__ before the names were imported lazily
+
+Usage: python benchmarks/bench_import_time.py [number of runs per case, default 5]
+"""
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SRC = str(Path(__file__).resolve().parents[1] / 'src')
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+# the heavy packages we want to see (or not) in the imports
+WATCHED = ['openai', 'anthropic', 'google.generativeai', 'xai_sdk', 'langcodes', 'polib', 'streamlit']
+
+
+class StubOllamaHandler(BaseHTTPRequestHandler):
+  def do_POST(self):
+    self.rfile.read(int(self.headers.get('Content-Length', 0)))
+    body = json.dumps({
+      "id": "stub", "object": "chat.completion", "created": 0, "model": "stub",
+      "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": '"Ciao"'}}],
+    }).encode()
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+def import_times(args, cwd, env):
+  """
+  Runs python -X importtime with the given args
+  Returns:
+      tuple(float, dict): the total import time in ms and the cumulative import time of the watched packages
+  """
+  result = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=cwd, env=env, capture_output=True, text=True)
+  if result.returncode != 0:
+    raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-2000:]}")
+  total, packages = 0, {}
+  for line in result.stderr.splitlines():
+    match = IMPORTTIME_RE.match(line)
+    if not match:
+      continue
+    cumulative, indent, name = int(match.group(2)), len(match.group(3)), match.group(4)
+    if indent == 1:  # top level import
+      total += cumulative
+    if name in WATCHED:
+      packages[name] = max(packages.get(name, 0), cumulative)
+  return total / 1000, {name: time / 1000 for name, time in packages.items()}
+
+
+def main():
+  nb_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+  server = ThreadingHTTPServer(('127.0.0.1', 0), StubOllamaHandler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    input_po = Path(tmp_dir) / 'one_entry.po'
+    input_po.write_text('msgid ""\nmsgstr ""\n"Content-Type: text/plain; charset=UTF-8\\n"\n\n'
+                        'msgid "Hello"\nmsgstr "Bonjour"\n', encoding='utf-8')
+    env = {**os.environ, 'PYTHONPATH': SRC, 'OLLAMA_BASE_URL': f'http://127.0.0.1:{server.server_port}/v1'}
+    cases = {
+      '--show-prompts': ['-m', 'auto_po_lyglot.po_main', '--show-prompts'],
+      'one-entry run (ollama)': ['-m', 'auto_po_lyglot.po_main', '-l', 'ollama', '-m', 'stub', '-i', str(input_po),
+                                 '--target-language', 'Italian', '-oo'],
+      'all clients (eager)': ['-c', 'import auto_po_lyglot.getenv, auto_po_lyglot.csv_extractor, '
+                              'auto_po_lyglot.clients.openai_ollama_client, auto_po_lyglot.clients.claude_client, '
+                              'auto_po_lyglot.clients.gemini_client, auto_po_lyglot.django_po'],
+    }
+    for case, args in cases.items():
+      runs = [import_times(args, tmp_dir, env) for _ in range(nb_runs)]
+      best_total, packages = min(runs, key=lambda run: run[0])
+      imported = ', '.join(f"{name} {time:.0f}ms" for name, time in sorted(packages.items(), key=lambda p: -p[1]))
+      print(f"{case:<25} {best_total:8.0f}ms  ({imported or 'no watched package'})")
+  server.shutdown()
+
+
+if __name__ == '__main__':
+  main()
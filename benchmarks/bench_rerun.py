@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmark of an incremental re-run of translate_pofile on a big catalog where all the entries are already translated
+in the output file. Compares the lookup of the existing translations with polib's linear POFile.find (the previous
+implementation) and with the POIndex used by translate_pofile.
+
+Usage: python benchmarks/bench_rerun.py [number of entries, default 20000]
+"""
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import polib
+
+from auto_po_lyglot.clients.client_base import AutoPoLyglotClient
+from auto_po_lyglot.getenv import Params
+from auto_po_lyglot.po_index import POIndex
+
+
+class NoLLMClient(AutoPoLyglotClient):
+  def get_translation(self, system_prompt, user_prompt):
+    raise AssertionError("a re-run of a fully translated file must not call the LLM")
+
+
+def build_catalog(nb_entries, translated_prefix):
+  po = polib.POFile()
+  po.metadata = {'Content-Type': 'text/plain; charset=UTF-8'}
+  for i in range(nb_entries):
+    po.append(polib.POEntry(msgid=f"Message number {i}", msgstr=f"{translated_prefix} {i}",
+                            occurrences=[(f"app/views_{i % 50}.py", str(i))]))
+  return po
+
+
+def main():
+  nb_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+  params = Params()
+  params.original_language, params.context_language = 'English', 'French'
+  params.model, params.owner, params.owner_mail = 'no-llm', '<OWNER>', '<OWNER EMAIL>'
+  params.fuzzy = params.force = params.compile = False
+  params.workers = 1
+  with tempfile.TemporaryDirectory() as tmp:
+    input_file = Path(tmp) / 'input.po'
+    output_file = Path(tmp) / 'output.po'
+    build_catalog(nb_entries, "Message numéro").save(input_file)
+    build_catalog(nb_entries, "Messaggio numero").save(output_file)
+    in_po, out_po = polib.pofile(input_file), polib.pofile(output_file)
+
+    sample = list(in_po)[:: max(1, nb_entries // 1000)]
+    start = perf_counter()
+    for entry in sample:
+      out_po.find(entry.msgid)
+    linear = (perf_counter() - start) * len(in_po) / len(sample)
+
+    start = perf_counter()
+    index = POIndex(out_po)
+    for entry in in_po:
+      index.find(entry)
+    indexed = perf_counter() - start
+
+    client = NoLLMClient(params, 'Italian')
+    start = perf_counter()
+    _, _, already_translated, _, _ = client.translate_pofile(input_file, output_file)
+    rerun = perf_counter() - start
+    assert already_translated == nb_entries
+
+  print(f"{nb_entries} entries")
+  print(f"lookups with POFile.find (extrapolated from {len(sample)} lookups): {linear:8.2f}s")
+  print(f"lookups with POIndex (including index build):           {indexed:8.2f}s")
+  print(f"full translate_pofile re-run (parse, lookups, save):    {rerun:8.2f}s")
+
+
+if __name__ == "__main__":
+  main()
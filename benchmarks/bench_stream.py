@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Benchmark of the translation of a big catalog with translate_pofile, which loads the input and output files in memory,
+and with the streaming mode (--stream-po), which reads, translates and writes them by windows of entries. The LLM is
+replaced by an instant fake one. Measures the time and the peak memory (with tracemalloc) of a first run translating
+every entry and of a re-run where all the entries are already translated.
+
+Usage: python benchmarks/bench_stream.py [number of entries, default 50000]
+"""
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+import polib
+
+from auto_po_lyglot.clients.client_base import AutoPoLyglotClient
+from auto_po_lyglot.getenv import Params
+
+
+class InstantClient(AutoPoLyglotClient):
+  def get_translation(self, system_prompt, user_prompt):
+    return '"Messaggio tradotto"'
+
+
+def build_catalog(nb_entries):
+  po = polib.POFile()
+  po.metadata = {'Content-Type': 'text/plain; charset=UTF-8'}
+  for i in range(nb_entries):
+    po.append(polib.POEntry(msgid=f"Message number {i}", msgstr=f"Message numéro {i}",
+                            occurrences=[(f"app/views_{i % 50}.py", str(i))]))
+  return po
+
+
+def measure(client, input_file, output_file):
+  tracemalloc.start()
+  start = perf_counter()
+  client.translate_pofile(input_file, output_file)
+  elapsed = perf_counter() - start
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return elapsed, peak / 1024 / 1024
+
+
+def main():
+  nb_entries = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+  params = Params()
+  params.original_language, params.context_language = 'English', 'French'
+  params.model, params.owner, params.owner_mail = 'instant', '<OWNER>', '<OWNER EMAIL>'
+  params.fuzzy = params.force = params.compile = False
+  params.system_prompt = params.user_prompt = None
+  params.workers = params.batch_size = 1
+  params.checkpoint_entries = params.checkpoint_seconds = 0
+  params.stream_window = 1000
+  with tempfile.TemporaryDirectory() as tmp:
+    input_file = Path(tmp) / 'input.po'
+    build_catalog(nb_entries).save(input_file)
+    print(f"{nb_entries} entries ({input_file.stat().st_size / 1024 / 1024:.1f} MB)")
+    for stream_po in (False, True):
+      params.stream_po = stream_po
+      client = InstantClient(params, 'Italian')
+      output_file = Path(tmp) / f'output_{stream_po}.po'
+      first_run = measure(client, input_file, output_file)
+      rerun = measure(client, input_file, output_file)
+      name = 'stream_po' if stream_po else 'translate_pofile'
+      print(f"{name:16} first run: {first_run[0]:7.2f}s, peak memory {first_run[1]:7.1f} MB | "
+            f"re-run: {rerun[0]:7.2f}s, peak memory {rerun[1]:7.1f} MB")
+
+
+if __name__ == "__main__":
+  main()
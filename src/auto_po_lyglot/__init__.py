@@ -1,25 +1,53 @@
-from .getenv import ParamsLoader, ClientBuilder, get_outfile_name
-from .csv_extractor import extract_csv
-from .clients.openai_ollama_client import OpenAIAPICompatibleClient, OpenAIClient, OllamaClient
-from .clients.claude_client import ClaudeClient, CachedClaudeClient
-from .clients.client_base import AutoPoLyglotClient
-from .clients.gemini_client import GeminiClient
-from .default_prompts import system_prompt, user_prompt
-from .django_po import locate_django_translation_files
+# The public names are imported lazily (see __getattr__) so that a run only imports the SDK of the LLM client it uses
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = [
-  'ParamsLoader',
-  'ClientBuilder',
-  'get_outfile_name',
-  'OpenAIAPICompatibleClient',
-  'OpenAIClient',
-  'OllamaClient',
-  'ClaudeClient',
-  'CachedClaudeClient',
-  'GeminiClient',
-  'AutoPoLyglotClient',
-  'system_prompt',
-  'user_prompt',
-  'extract_csv',
-  'locate_django_translation_files'
-]
+if TYPE_CHECKING:  # pragma: no cover
+  # for type checkers and IDEs only
+  from .getenv import ParamsLoader, ClientBuilder, get_outfile_name  # noqa: F401
+  from .csv_extractor import extract_csv  # noqa: F401
+  from .clients.openai_ollama_client import (  # noqa: F401
+    OpenAIAPICompatibleClient, OpenAIClient, OpenAIBatchClient, OllamaClient
+  )
+  from .clients.ollama_native_client import OllamaNativeClient  # noqa: F401
+  from .clients.claude_client import ClaudeClient, CachedClaudeClient  # noqa: F401
+  from .clients.client_base import AutoPoLyglotClient  # noqa: F401
+  from .clients.gemini_client import GeminiClient, CachedGeminiClient  # noqa: F401
+  from .default_prompts import system_prompt, user_prompt  # noqa: F401
+  from .django_po import locate_django_translation_files  # noqa: F401
+
+# module of each public name
+_lazy_names = {
+  'ParamsLoader': '.getenv',
+  'ClientBuilder': '.getenv',
+  'get_outfile_name': '.getenv',
+  'OpenAIAPICompatibleClient': '.clients.openai_ollama_client',
+  'OpenAIClient': '.clients.openai_ollama_client',
+  'OpenAIBatchClient': '.clients.openai_ollama_client',
+  'OllamaClient': '.clients.openai_ollama_client',
+  'OllamaNativeClient': '.clients.ollama_native_client',
+  'ClaudeClient': '.clients.claude_client',
+  'CachedClaudeClient': '.clients.claude_client',
+  'GeminiClient': '.clients.gemini_client',
+  'CachedGeminiClient': '.clients.gemini_client',
+  'AutoPoLyglotClient': '.clients.client_base',
+  'system_prompt': '.default_prompts',
+  'user_prompt': '.default_prompts',
+  'extract_csv': '.csv_extractor',
+  'locate_django_translation_files': '.django_po',
+}
+
+__all__ = list(_lazy_names)
+
+
+def __getattr__(name):
+  module = _lazy_names.get(name)
+  if module is None:
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+  value = getattr(importlib.import_module(module, __name__), name)
+  globals()[name] = value  # next accesses don't go through __getattr__
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,106 @@
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+from time import monotonic
+
+import polib
+
+logger = logging.getLogger(__name__)
+
+# statuses of the entries which have a translation in the output file
+TRANSLATED_STATUSES = ('Already', 'Shared', 'Singular', 'Plural')
+
+
+def has_translation(entry):
+  """
+  Returns True if an entry of an output po file has a translation (its plural forms for an entry with plural management)
+  """
+  return entry.msgstr != "" or bool(entry.msgid_plural and entry.msgstr_plural.get(0))
+
+
+def save_pofile_atomically(po, output_file):
+  """
+  Saves a po file in a temporary file renamed to output_file, so that output_file is never left half written
+  """
+  output_path = Path(output_file)
+  fd, tmp_file = tempfile.mkstemp(dir=output_path.parent, prefix=f'.{output_path.name}.', suffix='.tmp')
+  os.close(fd)
+  try:
+    po.save(tmp_file)
+    os.replace(tmp_file, output_path)
+  except BaseException:
+    Path(tmp_file).unlink(missing_ok=True)
+    raise
+
+
+def write_text_atomically(text, output_file):
+  """
+  Same as save_pofile_atomically for a text file
+  """
+  output_path = Path(output_file)
+  fd, tmp_file = tempfile.mkstemp(dir=output_path.parent, prefix=f'.{output_path.name}.', suffix='.tmp')
+  try:
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+      f.write(text)
+    os.replace(tmp_file, output_path)
+  except BaseException:
+    Path(tmp_file).unlink(missing_ok=True)
+    raise
+
+
+class Checkpointer:
+  """
+  Periodically saves the entries translated so far in the output file, every_entries translations or every_seconds
+  seconds after the previous save (0 disables the corresponding trigger). The entries which are not translated yet
+  are not saved so that a new run with the same output file resumes where the previous one stopped, except the ones
+  already translated in the existing output file (indexed by out_index) whose translation is kept.
+  """
+  def __init__(self, po, output_file, every_entries=0, every_seconds=0, out_index=None):
+    self.po = po
+    self.output_file = output_file
+    self.out_index = out_index
+    self.every_entries = every_entries or 0
+    self.every_seconds = every_seconds or 0
+    self.translated = set()
+    self.nb_pending = 0
+    self.last_save = monotonic()
+    self.lock = threading.Lock()
+
+  def add(self, res):
+    """
+    Records the result of the translation of an entry (see translate_entry) and saves a checkpoint if needed
+    """
+    with self.lock:
+      if res['status'] not in TRANSLATED_STATUSES:
+        return
+      self.translated.add(id(res['entry']))
+      self.nb_pending += 1
+      if ((self.every_entries and self.nb_pending >= self.every_entries) or
+          (self.every_seconds and monotonic() - self.last_save >= self.every_seconds)):
+        self._save()
+
+  def save(self):
+    """
+    Saves a checkpoint with the entries translated so far
+    """
+    with self.lock:
+      self._save()
+
+  def _save(self):
+    checkpoint = polib.POFile(wrapwidth=self.po.wrapwidth)
+    checkpoint.header = self.po.header
+    checkpoint.metadata = self.po.metadata.copy()
+    for entry in self.po:
+      if id(entry) in self.translated:
+        checkpoint.append(entry)
+      elif self.out_index:
+        # not reached yet (or failed): keep its translation of the previous run
+        out_entry = self.out_index.find(entry)
+        if out_entry and has_translation(out_entry):
+          checkpoint.append(out_entry)
+    save_pofile_atomically(checkpoint, self.output_file)
+    logger.info(f"Checkpoint: saved {len(checkpoint)} translated entries in {self.output_file}")
+    self.nb_pending = 0
+    self.last_save = monotonic()
@@ -1,78 +1,170 @@
-from time import sleep
-from anthropic import Anthropic
-from .client_base import AutoPoLyglotClient, PoLyglotException
+import json
+from anthropic import Anthropic, AsyncAnthropic
+from .client_base import TRANSLATION_SCHEMA, AutoPoLyglotClient, PoLyglotException
+from .metrics import record_usage
+from .streaming import FirstLineReader
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def record_claude_usage(usage):
+  # input_tokens does not include the tokens written to or read from the prompt cache
+  cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+  cache_creation = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+  record_usage(usage.input_tokens + cache_read + cache_creation, usage.output_tokens, cache_read)
+
+
+# in structured output mode, the translation is the input of this tool, which Claude is forced to use
+TRANSLATION_TOOL = {
+  "name": "record_translation",
+  "description": "Records the translation of the sentence and its explanation",
+  "input_schema": TRANSLATION_SCHEMA,
+}
+
+
+def get_message_text(message):
+  """
+  Returns the text of a Claude message or, in structured output mode, the input of the translation tool as JSON
+  """
+  for block in message.content:
+    if block.type == 'tool_use':
+      return json.dumps(block.input, ensure_ascii=False)
+  return message.content[0].text
+
+
 class ClaudeClient(AutoPoLyglotClient):
   def __init__(self, params, target_language=None):
     params.model = params.model or "claude-3-5-sonnet-20240620"  # default model if not provided
     super().__init__(params, target_language)
-    self.client = Anthropic(api_key=params.anthropic_api_key) if hasattr(params, 'anthropic_api_key') else Anthropic()
+    # the requests are retried by get_throttled_translation, not by the SDK
+    self.client = Anthropic(api_key=params.anthropic_api_key, max_retries=0) if hasattr(params, 'anthropic_api_key') \
+      else Anthropic(max_retries=0)
+
+  def create_async_client(self):
+    return AsyncAnthropic(api_key=self.params.anthropic_api_key, max_retries=0) \
+      if hasattr(self.params, 'anthropic_api_key') else AsyncAnthropic(max_retries=0)
+
+  def get_message_request(self, system_prompt, user_prompt):
+    return {
+      "model": self.params.model,
+      "max_tokens": 1000,
+      "temperature": self.params.temperature,
+      "system": system_prompt,
+      "messages": [
+          {
+              "role": "user",
+              "content": [
+                  {
+                      "type": "text",
+                      "text": user_prompt
+                  }
+              ]
+          }
+      ]
+    }
+
+  def get_structured_request(self, system_prompt, user_prompt):
+    return {
+      **self.get_message_request(system_prompt, user_prompt),
+      "tools": [TRANSLATION_TOOL],
+      "tool_choice": {"type": "tool", "name": TRANSLATION_TOOL["name"]},
+    }
 
   def get_translation(self, system_prompt, user_prompt):
+    return self.create_message(self.get_message_request(system_prompt, user_prompt))
+
+  def get_structured_translation(self, system_prompt, user_prompt):
+    return self.create_message(self.get_structured_request(system_prompt, user_prompt))
+
+  def create_message(self, request):
+    try:
+      message = self.client.messages.create(**request)
+      record_claude_usage(message.usage)
+      return get_message_text(message)
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+
+  def get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    """
+    Streams the answer and stops the request as soon as the translation line is complete
+    """
+    reader = FirstLineReader()
+    try:
+      with self.client.messages.stream(**{**self.get_message_request(system_prompt, user_prompt),
+                                          "max_tokens": max_tokens}) as stream:
+        for text in stream.text_stream:
+          if reader.add(text):
+            break
+        # the usage of the message so far: the input tokens and the output tokens received
+        record_claude_usage(stream.current_message_snapshot.usage)
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+    return reader.line
+
+  async def async_get_translation(self, system_prompt, user_prompt):
+    return await self.async_create_message(self.get_message_request(system_prompt, user_prompt))
+
+  async def async_get_structured_translation(self, system_prompt, user_prompt):
+    return await self.async_create_message(self.get_structured_request(system_prompt, user_prompt))
+
+  async def async_create_message(self, request):
     try:
-      message = self.client.messages.create(
-        model=self.params.model,
-        max_tokens=1000,
-        temperature=self.params.temperature,
-        system=system_prompt,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {
-                        "type": "text",
-                        "text": user_prompt
-                    }
-                ]
-            }
-        ]
-      )
-      return message.content[0].text
+      message = await self.async_client.messages.create(**request)
+      record_claude_usage(message.usage)
+      return get_message_text(message)
     except Exception as e:
-      raise PoLyglotException(str(e))
+      raise PoLyglotException(str(e)) from e
+
+  async def async_get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    reader = FirstLineReader()
+    try:
+      async with self.async_client.messages.stream(**{**self.get_message_request(system_prompt, user_prompt),
+                                                      "max_tokens": max_tokens}) as stream:
+        async for text in stream.text_stream:
+          if reader.add(text):
+            break
+        record_claude_usage(stream.current_message_snapshot.usage)
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+    return reader.line
 
 
 class CachedClaudeClient(ClaudeClient):
   use_large_system_prompt = True  # claude cached system prompt must be at least 1024 tokens
-  first = True
 
-  def get_translation(self, system_prompt, user_prompt):
-    retries = 0
-    next_retry_in = 1
-    max_retries = 5
-    while retries < max_retries:
-      try:
-        # uses a beta endpoint, changes in the future
-        response = self.client.beta.prompt_caching.messages.create(
-          model=self.params.model,
-          max_tokens=1024,
-          temperature=self.params.temperature,
-          system=[
-            {
-              "type": "text",
-              "text": system_prompt,
-              "cache_control": {"type": "ephemeral"}
-            }
-          ],
-          messages=[{"role": "user", "content": user_prompt}],
-        )
-        if self.first:
-          self.first = False
-          logger.info(f"claude cached usage: {response.usage}")
-        else:
-          logger.debug(f"claude cached usage: {response.usage}")
-        return response.content[0].text
-      except Exception as e:
-        if "overloaded_error" in str(e):
-          logger.info(f"claude cached overloaded error, next retry in {next_retry_in} seconds")
-          next_retry_in = 2 ** retries
-          if next_retry_in > 60:  # should never happen with max_retries = 5
-            next_retry_in = 60
-          sleep(next_retry_in)
-          retries += 1
-          continue
-        raise PoLyglotException(str(e))
+  def get_message_request(self, system_prompt, user_prompt):
+    return {
+      "model": self.params.model,
+      "max_tokens": 1024,
+      "temperature": self.params.temperature,
+      "system": [
+        {
+          "type": "text",
+          "text": system_prompt,
+          "cache_control": {"type": "ephemeral"}
+        }
+      ],
+      "messages": [{"role": "user", "content": user_prompt}],
+    }
+
+  def process_response(self, response):
+    logger.debug(f"claude cached usage: {response.usage}")
+    record_claude_usage(response.usage)
+    return get_message_text(response)
+
+  # the overloaded errors are retried by get_throttled_translation (see retry_rules)
+  def create_message(self, request):
+    try:
+      # uses a beta endpoint, changes in the future
+      response = self.client.beta.prompt_caching.messages.create(**request)
+      return self.process_response(response)
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+
+  async def async_create_message(self, request):
+    try:
+      response = await self.async_client.beta.prompt_caching.messages.create(**request)
+      return self.process_response(response)
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
@@ -1,15 +1,40 @@
 from abc import ABC, abstractmethod
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import functools
+import json
 import logging
 from pathlib import Path
 import polib
-from time import sleep
+import re
 from datetime import datetime
+from time import monotonic, sleep
+import weakref
 
-from auto_po_lyglot.getenv import get_language_code
+from auto_po_lyglot.checkpoint import TRANSLATED_STATUSES, Checkpointer, save_pofile_atomically
+from auto_po_lyglot.fingerprints import FingerprintStore, entry_fingerprint
+from auto_po_lyglot.language_codes import get_language_code
+from auto_po_lyglot.plural_forms import get_plural_forms, parse_plural_forms
+from auto_po_lyglot.po_index import POIndex
+from auto_po_lyglot.po_stream import POStreamReader, POStreamWriter, StreamedPOIndex, partial_file_name
+from auto_po_lyglot.translation_memory import TranslationMemory, hash_text
+from .event_loop import submit_coroutine
+from .metrics import llm_metrics, new_usage
+from .rate_limiter import RateLimiter, TokenBucketRateLimiter
+from .retry import DEFAULT_RETRY_RULES, RetryBudget, RetryRule, classify_error, get_error_retry_after
+from .streaming import FirstLineReader
 from ..default_prompts import (
   system_prompt as default_system_prompt,
   additional_system_prompt,
   user_prompt as default_user_prompt,
+  batch_system_prompt,
+  plural_system_prompt,
+  plural_user_prompt,
+  multi_language_system_prompt,
+  multi_language_example,
+  structured_output_system_prompt,
+  structured_output_retry_prompt,
   po_placeholder_examples,
   basic_examples,
   ambiguous_examples,
@@ -19,11 +44,50 @@ from ..default_prompts import (
 
 logger = logging.getLogger(__name__)
 
+# a plural form line in a plural translation result, optionally prefixed by the form index
+PLURAL_FORM_RE = re.compile(r'^(?:[-*]\s*)?(?:form\s*\d+\s*:\s*)?"(.*)"$', re.IGNORECASE)
+# JSON schema of the answer of the LLM in structured output mode (see get_structured_translation)
+TRANSLATION_SCHEMA = {
+  "type": "object",
+  "properties": {
+    "translation": {"type": "string"},
+    "explanation": {"type": "string"},
+  },
+  "required": ["translation", "explanation"],
+}
+
 
 class PoLyglotException(Exception):
   pass
 
 
+class TranslationStats:
+  """
+  Statistics of the translation of a po file
+  """
+  def __init__(self):
+    self.nb_translations = 0
+    self.already_translated = 0
+    self.forced = 0
+    self.fuzzy = 0
+    self.failed = []
+
+  def count(self, res):
+    """
+    Counts the result of the translation of an entry (see translate_entry)
+    """
+    if res['status'] == 'Failed':
+      self.failed.append(res['entry'].msgid)
+      return
+    if res['status'] == 'Already':
+      self.already_translated += 1
+    elif res['status'] == 'Fuzzy':
+      self.fuzzy += 1
+    elif res['forced'] == 'True':
+      self.forced += 1
+    self.nb_translations += 1
+
+
 class AutoPoLyglotClient(ABC):
   """
   Base class for all LLM clients.
@@ -31,6 +95,15 @@ class AutoPoLyglotClient(ABC):
   # set to True in client sub classes to use a large system prompt. Useful for claude_cached 
   # where the system prompt must at least be 1024 tokens
   use_large_system_prompt = False
+  # default rate limits of the client, None means no limit. Can be overriden by the requests_per_minute and
+  # tokens_per_minute params.
+  requests_per_minute = None
+  tokens_per_minute = None
+  # how the transient errors of the provider are retried, by error class (see retry.classify_error). The max_retries
+  # param overrides the max number of retries of all the classes
+  retry_rules = DEFAULT_RETRY_RULES
+  # metrics of the requests sent to the LLM, shared by all the clients of the process by default
+  metrics = llm_metrics
 
   def __init__(self, params, target_language=None):
     self.params = params
@@ -39,6 +112,53 @@ class AutoPoLyglotClient(ABC):
     self.target_language = target_language
     logger.debug(f"TranspoClient using model {self.params.model}")
     self.first = True
+    self.rate_limiter = self.get_rate_limiter()
+    self.retry_rules = self.get_retry_rules()
+    retry_budget = getattr(self.params, 'retry_budget', None)
+    self.retry_budget = RetryBudget(0.2 if retry_budget is None else retry_budget)
+    # rendered system prompts, see get_system_prompt
+    self._system_prompts = {}
+    self.translation_memory = self.get_translation_memory()
+    # translations shared by all the jobs of a run, see dedup.py
+    self.shared_translations = None
+    # the po file being translated, used to aggregate the metrics by file
+    self.current_file = None
+    # the fingerprints of the entries of the output file being translated, see open_fingerprints
+    self.fingerprints = None
+    # async SDK clients by event loop, see async_client
+    self._async_clients = weakref.WeakKeyDictionary()
+
+  def get_rate_limiter(self):
+    """
+    Builds the rate limiter shared by all the requests of this client. Override it to plug another rate limiter.
+    A value of 0 in the params disables the corresponding limit.
+    """
+    requests_per_minute = getattr(self.params, 'requests_per_minute', None)
+    if requests_per_minute is None:
+      requests_per_minute = self.requests_per_minute
+    tokens_per_minute = getattr(self.params, 'tokens_per_minute', None)
+    if tokens_per_minute is None:
+      tokens_per_minute = self.tokens_per_minute
+    if not requests_per_minute and not tokens_per_minute:
+      return RateLimiter()
+    logger.debug(f"Rate limits: {requests_per_minute} requests/min, {tokens_per_minute} tokens/min")
+    return TokenBucketRateLimiter(requests_per_minute, tokens_per_minute)
+
+  def get_retry_rules(self):
+    max_retries = getattr(self.params, 'max_retries', None)
+    if max_retries is None:
+      return self.retry_rules
+    return {error_class: RetryRule(max_retries, rule.initial_delay, rule.max_delay, rule.use_rate_limiter)
+            for error_class, rule in self.retry_rules.items()}
+
+  def get_translation_memory(self):
+    """
+    Opens the translation memory given by the translation_memory param, if any
+    """
+    path = getattr(self.params, 'translation_memory', None)
+    if not path:
+      return None
+    return TranslationMemory(path, getattr(self.params, 'translation_memory_size', None))
 
   @abstractmethod
   def get_translation(self, phrase, context_translation):
@@ -56,6 +176,60 @@ class AutoPoLyglotClient(ABC):
     """
     ...
 
+  def get_structured_translation(self, system_prompt, user_prompt):
+    """
+    Same as get_translation in structured output mode: the answer must be a JSON object matching TRANSLATION_SCHEMA.
+    Sub classes should implement it with the JSON mode or tool calling of their LLM provider, by default the JSON
+    object is only asked by the system prompt (see get_structured_system_prompt).
+    """
+    return self.get_translation(system_prompt, user_prompt)
+
+  def get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    """
+    Same as get_translation when the explanations are disabled (no_explanation param): only the first line of the
+    answer, the translation, is returned. Sub classes should stream the answer, stop the request as soon as the first
+    line is complete (see FirstLineReader) and limit the answer to max_tokens. By default, the whole answer is awaited.
+    """
+    reader = FirstLineReader()
+    reader.add(self.get_translation(system_prompt, user_prompt))
+    return reader.line
+
+  def create_async_client(self):
+    """
+    Creates the client of the async SDK of the LLM provider. Async SDK clients are bound to the event loop where they
+    are used, so this is called once per event loop. Returns None for clients without async SDK.
+    """
+    return None
+
+  @property
+  def async_client(self):
+    """
+    The async SDK client for the running event loop
+    """
+    loop = asyncio.get_running_loop()
+    if loop not in self._async_clients:
+      self._async_clients[loop] = self.create_async_client()
+    return self._async_clients[loop]
+
+  async def async_get_translation(self, system_prompt, user_prompt):
+    """
+    Async version of get_translation. Sub classes should implement it with the async SDK of their LLM provider,
+    by default get_translation is run in a thread.
+    """
+    return await asyncio.to_thread(self.get_translation, system_prompt, user_prompt)
+
+  async def async_get_structured_translation(self, system_prompt, user_prompt):
+    """
+    Async version of get_structured_translation, by default get_structured_translation is run in a thread.
+    """
+    return await asyncio.to_thread(self.get_structured_translation, system_prompt, user_prompt)
+
+  async def async_get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    """
+    Async version of get_first_line_translation, by default get_first_line_translation is run in a thread.
+    """
+    return await asyncio.to_thread(self.get_first_line_translation, system_prompt, user_prompt, max_tokens)
+
   def _get_languages(self):
     return {
         "original_language": self.params.original_language,
@@ -154,7 +328,21 @@ class AutoPoLyglotClient(ABC):
     return {"ambiguous_explanation": params['ambiguous_explanation'].format(**explanation_params)}
 
   def get_system_prompt(self):
-    format = self.params.system_prompt or default_system_prompt
+    """
+    Returns the system prompt for the current languages. The rendered prompt is cached by languages and
+    prompt template so it is built only once per target language, and built again only if the
+    target language or the system prompt param changes.
+    """
+    template = self.params.system_prompt or default_system_prompt
+    key = (self.params.original_language, self.params.context_language, self.target_language,
+           template, self.use_large_system_prompt)
+    system_prompt = self._system_prompts.get(key)
+    if system_prompt is None:
+      system_prompt = self._system_prompts[key] = self._build_system_prompt(template)
+    return system_prompt
+
+  def _build_system_prompt(self, template):
+    format = template
     if self.use_large_system_prompt:
       format += self._get_additional_system_prompt()
     logger.debug("system prompt format: ", format)
@@ -208,6 +396,199 @@ class AutoPoLyglotClient(ABC):
 
     return translation, explanation
 
+  def get_structured_system_prompt(self, system_prompt):
+    return system_prompt + structured_output_system_prompt.format(**self._get_languages())
+
+  def process_structured_translation(self, raw_result):
+    """
+    Validates and processes the raw result of a translation in structured output mode
+    Args:
+        raw_result (str): The raw translation result, a JSON object (possibly surrounded by a markdown code block)
+    Returns:
+        tuple(str,str): The translation and its explanation
+    Raises:
+        ValueError: if the result is not a JSON object with a non empty "translation" string
+    """
+    start, end = raw_result.find('{'), raw_result.rfind('}')
+    if not 0 <= start < end:
+      raise ValueError("no JSON object found")
+    result = json.loads(raw_result[start:end + 1])
+    if not isinstance(result, dict):
+      raise ValueError("not a JSON object")
+    translation, explanation = result.get('translation'), result.get('explanation')
+    if not isinstance(translation, str) or not translation.strip():
+      raise ValueError("no translation")
+    explanation = explanation.strip() if isinstance(explanation, str) and explanation.strip() else None
+    return translation.strip(' "\n'), explanation
+
+  def estimate_tokens(self, system_prompt, user_prompt):
+    """
+    Rough estimation of the number of tokens of a request (about 4 characters per token)
+    """
+    return (len(system_prompt) + len(user_prompt)) // 4
+
+  def estimate_max_tokens(self, phrase, context_translation):
+    """
+    Upper bound of the number of tokens of the translation of a phrase, without explanation. A token is rarely
+    shorter than a character, even in the languages with ideograms, whose translations are also shorter.
+    """
+    return 32 + max(len(phrase), len(context_translation))
+
+  def record_request(self, usage, latency, error=False):
+    """
+    Records the metrics of a request sent to the LLM for the current file and target language
+    Args:
+        usage (dict): the tokens and retries of the request, see metrics.new_usage
+        latency (float): the time spent waiting for the response, in seconds
+        error (bool): True if the request failed
+    """
+    self.metrics.record(getattr(self.params, 'llm_client', None) or type(self).__name__, self.params.model,
+                        self.current_file, self.target_language or 'multi-language', usage, latency, error)
+
+  def get_retry_delay(self, error, retries):
+    """
+    Applies the retry rule of the class of the error (see retry_rules) and the retry budget of the client.
+    Args:
+        error (Exception): the error raised by get_translation
+        retries (int): the number of times the request was already retried
+    Returns:
+        float: the delay before sending the request again, or None if it must not be retried
+    """
+    error_class = classify_error(error)
+    rule = self.retry_rules.get(error_class)
+    if not rule or retries >= rule.max_retries:
+      return None
+    if not self.retry_budget.withdraw():
+      logger.warning(f"Retry budget exhausted, {error_class} error not retried: {error}")
+      return None
+    retry_after = get_error_retry_after(error)
+    if rule.use_rate_limiter and self.rate_limiter.blocks_on_backoff:
+      # all the requests of the client are suspended by the rate limiter
+      delay = self.rate_limiter.backoff(retry_after)
+      logger.info(f"Rate limit error ({error}), backing off for {delay:.1f} seconds")
+      return 0
+    delay = rule.get_delay(retries, retry_after)
+    logger.info(f"{error_class} error ({error}), retry {retries + 1}/{rule.max_retries} in {delay:.1f} seconds")
+    return delay
+
+  def get_throttled_translation(self, system_prompt, user_prompt, structured=False, max_tokens=None):
+    """
+    Calls get_translation (get_structured_translation if structured, get_first_line_translation if max_tokens is
+    given) when the rate limiter allows it. Retries the transient errors of the provider according to
+    get_retry_delay. The metrics of the request are recorded, the time spent in the rate limiter excluded.
+    """
+    if structured:
+      get_translation = self.get_structured_translation
+    elif max_tokens:
+      get_translation = functools.partial(self.get_first_line_translation, max_tokens=max_tokens)
+    else:
+      get_translation = self.get_translation
+    tokens = self.estimate_tokens(system_prompt, user_prompt)
+    self.retry_budget.deposit()
+    usage, latency, error = new_usage(), 0.0, True
+    try:
+      while True:
+        self.rate_limiter.acquire(tokens)
+        start = monotonic()
+        try:
+          raw_result = get_translation(system_prompt, user_prompt)
+          self.rate_limiter.success()
+          error = False
+          return raw_result
+        except Exception as e:
+          delay = self.get_retry_delay(e, usage['retries'])
+          if delay is None:
+            raise
+          usage['retries'] += 1
+        finally:
+          latency += monotonic() - start
+        sleep(delay)
+    finally:
+      self.record_request(usage, latency, error)
+
+  def get_prompt_hash(self, system_prompt):
+    return hash_text(system_prompt, self.params.user_prompt or default_user_prompt)
+
+  def get_translation_memory_key(self, system_prompt, phrase, context_translation):
+    prompt_hash = self.get_prompt_hash(system_prompt)
+    return TranslationMemory.make_key(self.params.model, self.params.original_language, self.params.context_language,
+                                      self.target_language, phrase, context_translation, prompt_hash,
+                                      not getattr(self.params, 'no_explanation', False))
+
+  def recall_translation(self, system_prompt, phrase, context_translation):
+    """
+    Looks for a translation in the translation memory
+    Returns:
+        tuple(str, tuple(str,str)): the translation memory key (None without translation memory) and the memorized
+                                    translation and explanation (None if not found)
+    """
+    if not self.translation_memory:
+      return None, None
+    memory_key = self.get_translation_memory_key(system_prompt, phrase, context_translation)
+    # when forced, translate again but still update the translation memory
+    memorized = None if self.params.force else self.translation_memory.get(memory_key)
+    if memorized:
+      logger.debug(f"Translation memory hit for '{phrase}'")
+    return memory_key, memorized
+
+  def recall_translations(self, system_prompt, phrases):
+    """
+    Looks for the translations of several phrases in the translation memory
+    Returns:
+        tuple(list, list): the translation memory keys and the memorized translations (None when not found)
+    """
+    memory_keys, translations = [], []
+    for phrase, context_translation in phrases:
+      memory_key, memorized = self.recall_translation(system_prompt, phrase, context_translation)
+      memory_keys.append(memory_key)
+      translations.append(memorized)
+    return memory_keys, translations
+
+  def memorize_translation(self, memory_key, translation, explanation):
+    if memory_key and translation:
+      self.translation_memory.put(memory_key, translation, explanation)
+
+  def _translate_phrase(self, system_prompt, phrase, context_translation, memory_key=None):
+    user_prompt = self.get_user_prompt(phrase, context_translation)
+    if getattr(self.params, 'structured_output', False):
+      translation, explanation = self.get_validated_translation(system_prompt, user_prompt)
+    else:
+      max_tokens = self.get_max_tokens(phrase, context_translation)
+      raw_result = self.get_throttled_translation(system_prompt, user_prompt, max_tokens=max_tokens)
+      translation, explanation = self.process_translation(raw_result)
+    self.memorize_translation(memory_key, translation, explanation)
+    return translation, explanation
+
+  def get_max_tokens(self, phrase, context_translation):
+    """
+    Returns the max number of tokens of the answer when the explanations are disabled (no_explanation param), None
+    otherwise
+    """
+    if not getattr(self.params, 'no_explanation', False):
+      return None
+    return self.estimate_max_tokens(phrase, context_translation)
+
+  def get_validated_translation(self, system_prompt, user_prompt):
+    """
+    Translates in structured output mode. When the answer is not valid, the request is sent once again
+    Returns:
+        tuple(str,str): The translation and its explanation
+    Raises:
+        PoLyglotException: if the second answer is not valid either
+    """
+    system_prompt = self.get_structured_system_prompt(system_prompt)
+    raw_result = self.get_throttled_translation(system_prompt, user_prompt, structured=True)
+    try:
+      return self.process_structured_translation(raw_result)
+    except ValueError as e:
+      logger.warning(f"Invalid structured translation ({e}), asking again: {raw_result!r}")
+    raw_result = self.get_throttled_translation(system_prompt, user_prompt + structured_output_retry_prompt,
+                                                structured=True)
+    try:
+      return self.process_structured_translation(raw_result)
+    except ValueError as e:
+      raise PoLyglotException(f"Invalid structured translation ({e}): {raw_result!r}") from e
+
   def translate(self, phrase, context_translation):
       """
       Translate a single phrase using the given context translation
@@ -220,9 +601,262 @@ class AutoPoLyglotClient(ABC):
       if self.target_language is None:
         raise PoLyglotException("Error:target_language must be set before trying to translate anything")
       system_prompt = self.get_system_prompt()
-      user_prompt = self.get_user_prompt(phrase, context_translation)
-      raw_result = self.get_translation(system_prompt, user_prompt)
-      return self.process_translation(raw_result)
+      memory_key, memorized = self.recall_translation(system_prompt, phrase, context_translation)
+      if memorized:
+        return memorized
+      return self._translate_phrase(system_prompt, phrase, context_translation, memory_key)
+
+  async def async_get_throttled_translation(self, system_prompt, user_prompt, structured=False, max_tokens=None):
+    """
+    Async version of get_throttled_translation
+    """
+    if structured:
+      get_translation = self.async_get_structured_translation
+    elif max_tokens:
+      get_translation = functools.partial(self.async_get_first_line_translation, max_tokens=max_tokens)
+    else:
+      get_translation = self.async_get_translation
+    tokens = self.estimate_tokens(system_prompt, user_prompt)
+    self.retry_budget.deposit()
+    usage, latency, error = new_usage(), 0.0, True
+    try:
+      while True:
+        await self.rate_limiter.async_acquire(tokens)
+        start = monotonic()
+        try:
+          raw_result = await get_translation(system_prompt, user_prompt)
+          self.rate_limiter.success()
+          error = False
+          return raw_result
+        except Exception as e:
+          delay = self.get_retry_delay(e, usage['retries'])
+          if delay is None:
+            raise
+          usage['retries'] += 1
+        finally:
+          latency += monotonic() - start
+        await asyncio.sleep(delay)
+    finally:
+      self.record_request(usage, latency, error)
+
+  async def _async_translate_phrase(self, system_prompt, phrase, context_translation, memory_key=None):
+    user_prompt = self.get_user_prompt(phrase, context_translation)
+    if getattr(self.params, 'structured_output', False):
+      translation, explanation = await self.async_get_validated_translation(system_prompt, user_prompt)
+    else:
+      max_tokens = self.get_max_tokens(phrase, context_translation)
+      raw_result = await self.async_get_throttled_translation(system_prompt, user_prompt, max_tokens=max_tokens)
+      translation, explanation = self.process_translation(raw_result)
+    self.memorize_translation(memory_key, translation, explanation)
+    return translation, explanation
+
+  async def async_get_validated_translation(self, system_prompt, user_prompt):
+    """
+    Async version of get_validated_translation
+    """
+    system_prompt = self.get_structured_system_prompt(system_prompt)
+    raw_result = await self.async_get_throttled_translation(system_prompt, user_prompt, structured=True)
+    try:
+      return self.process_structured_translation(raw_result)
+    except ValueError as e:
+      logger.warning(f"Invalid structured translation ({e}), asking again: {raw_result!r}")
+    raw_result = await self.async_get_throttled_translation(system_prompt, user_prompt + structured_output_retry_prompt,
+                                                            structured=True)
+    try:
+      return self.process_structured_translation(raw_result)
+    except ValueError as e:
+      raise PoLyglotException(f"Invalid structured translation ({e}): {raw_result!r}") from e
+
+  async def async_translate(self, phrase, context_translation):
+    """
+    Async version of translate
+    """
+    if self.target_language is None:
+      raise PoLyglotException("Error:target_language must be set before trying to translate anything")
+    system_prompt = self.get_system_prompt()
+    memory_key, memorized = self.recall_translation(system_prompt, phrase, context_translation)
+    if memorized:
+      return memorized
+    return await self._async_translate_phrase(system_prompt, phrase, context_translation, memory_key)
+
+  def get_batch_system_prompt(self):
+    return self.get_system_prompt() + batch_system_prompt.format(**self._get_languages())
+
+  def get_batch_user_prompt(self, phrases):
+    return json.dumps([{"id": i, "original": phrase, "context": context_translation}
+                       for i, (phrase, context_translation) in enumerate(phrases, 1)], ensure_ascii=False)
+
+  def process_batch_translation(self, raw_result, nb_phrases):
+    """
+    Process the raw result of a batch translation
+    Args:
+        raw_result (str): The raw batch translation result, a JSON list of {id, translation, explanation} objects
+        nb_phrases (int): The number of phrases sent in the batch
+    Returns:
+        dict: The (translation, explanation) tuples by phrase position in the batch. Missing or invalid translations
+              are not in the dict.
+    """
+    start, end = raw_result.find('['), raw_result.rfind(']')
+    try:
+      items = json.loads(raw_result[start:end + 1]) if 0 <= start < end else []
+    except ValueError:
+      items = []
+    results = {}
+    for item in items if isinstance(items, list) else []:
+      if not isinstance(item, dict):
+        continue
+      item_id, translation, explanation = item.get('id'), item.get('translation'), item.get('explanation')
+      if isinstance(item_id, int) and 1 <= item_id <= nb_phrases and isinstance(translation, str) and translation.strip():
+        explanation = explanation if isinstance(explanation, str) and explanation else None
+        results[item_id - 1] = (translation.strip(' "\n'), explanation)
+    return results
+
+  def translate_batch(self, phrases):
+    """
+    Translate several phrases in a single request. The phrases which are missing or invalid in the
+    response are translated again one by one.
+    Args:
+        phrases (list(tuple(str,str))): The phrases to translate and their context translation
+    Returns:
+        list(tuple(str,str)): The translation and explanation of each phrase
+    """
+    if self.target_language is None:
+      raise PoLyglotException("Error:target_language must be set before trying to translate anything")
+    system_prompt = self.get_system_prompt()
+    memory_keys, translations = self.recall_translations(system_prompt, phrases)
+    to_translate = [i for i, translation in enumerate(translations) if translation is None]
+    if len(to_translate) > 1:
+      batch_phrases = [phrases[i] for i in to_translate]
+      raw_result = self.get_throttled_translation(self.get_batch_system_prompt(), self.get_batch_user_prompt(batch_phrases))
+      results = self.process_batch_translation(raw_result, len(batch_phrases))
+      if len(results) < len(batch_phrases):
+        logger.warning(f"{len(batch_phrases) - len(results)} translations out of {len(batch_phrases)} missing or invalid "
+                       "in the batch response, translating them one by one")
+      for position, i in enumerate(to_translate):
+        if position in results:
+          translations[i] = results[position]
+          self.memorize_translation(memory_keys[i], *results[position])
+    # fallback to single requests
+    for i, translation in enumerate(translations):
+      if translation is None:
+        translations[i] = self._translate_phrase(system_prompt, *phrases[i], memory_keys[i])
+    return translations
+
+  def get_plural_forms(self):
+    """
+    Returns:
+        tuple(int, str): The number of plural forms of the target language and the gettext rule selecting them
+    """
+    return parse_plural_forms(get_plural_forms(self.target_language))
+
+  def expand_plural_forms(self, singular_translation, plural_translation, nplurals):
+    """
+    Returns the translations of all the plural forms when only the singular and plural translations are known
+    """
+    return [singular_translation] + [plural_translation] * (nplurals - 1)
+
+  def get_plural_system_prompt(self):
+    return self.get_system_prompt() + plural_system_prompt.format(**self._get_languages())
+
+  def get_plural_user_prompt(self, phrase, plural_phrase, context_translations):
+    nplurals, plural_rule = self.get_plural_forms()
+    return plural_user_prompt.format(original_language=self.params.original_language,
+                                     context_language=self.params.context_language,
+                                     target_language=self.target_language,
+                                     original_phrase=phrase,
+                                     original_plural_phrase=plural_phrase,
+                                     context_translations=', '.join(f'"{c}"' for c in context_translations),
+                                     nplurals=nplurals,
+                                     plural_rule=plural_rule)
+
+  def process_plural_translation(self, raw_result, nplurals):
+    """
+    Process the raw result of a plural translation, made of one quoted translation line per plural form
+    optionally followed by an explanation
+    Returns:
+        tuple(list(str),str): The translation of each plural form (None if the result does not contain exactly
+                              nplurals forms) and the explanation
+    """
+    lines = [line.strip() for line in raw_result.strip().split('\n')]
+    forms = []
+    while lines:
+      match = PLURAL_FORM_RE.match(lines[0])
+      if not match:
+        break
+      forms.append(match.group(1).strip())
+      lines.pop(0)
+    explanation = '\n'.join(line for line in lines if line) or None
+    return (forms if len(forms) == nplurals and all(forms) else None), explanation
+
+  def _recall_plural_translation(self, phrase, plural_phrase, context_translations):
+    """
+    Returns:
+        tuple: the plural system prompt, the translation memory key and the memorized (forms, explanation) if any
+    """
+    if self.target_language is None:
+      raise PoLyglotException("Error:target_language must be set before trying to translate anything")
+    system_prompt = self.get_plural_system_prompt()
+    memory_key, memorized = self.recall_translation(system_prompt, f"{phrase}\0{plural_phrase}",
+                                                    '\0'.join(context_translations))
+    if memorized:
+      forms = json.loads(memorized[0])
+      if len(forms) == self.get_plural_forms()[0]:
+        return system_prompt, memory_key, (forms, memorized[1])
+    return system_prompt, memory_key, None
+
+  def _process_plural_result(self, raw_result, plural_phrase, memory_key):
+    """
+    Returns:
+        tuple(list(str),str): the forms and explanation of a plural translation, None if the number of forms is wrong
+    """
+    nplurals, _ = self.get_plural_forms()
+    forms, explanation = self.process_plural_translation(raw_result, nplurals)
+    if forms is None:
+      logger.warning(f"The translation of '{plural_phrase}' does not contain the {nplurals} plural forms of "
+                     f"{self.target_language}, translating the singular and plural phrases separately")
+      return None
+    self.memorize_translation(memory_key, json.dumps(forms, ensure_ascii=False), explanation)
+    return forms, explanation
+
+  def translate_plural(self, phrase, plural_phrase, context_translations):
+    """
+    Translate the singular and plural phrases of an entry in a single request returning all the plural forms of
+    the target language. If the response does not contain the right number of forms, the singular and plural
+    phrases are translated separately.
+    Args:
+        phrase (str): The singular phrase to translate
+        plural_phrase (str): The plural phrase to translate
+        context_translations (list(str)): The context translation of each plural form of the context language
+    Returns:
+        tuple(list(str),str): The translation of each plural form of the target language and the explanation
+    """
+    system_prompt, memory_key, memorized = self._recall_plural_translation(phrase, plural_phrase, context_translations)
+    if memorized:
+      return memorized
+    raw_result = self.get_throttled_translation(system_prompt,
+                                                self.get_plural_user_prompt(phrase, plural_phrase, context_translations))
+    result = self._process_plural_result(raw_result, plural_phrase, memory_key)
+    if result is None:
+      (singular_translation, explanation), (plural_translation, _) = (
+        self.translate(phrase, context_translations[0]), self.translate(plural_phrase, context_translations[-1]))
+      result = self.expand_plural_forms(singular_translation, plural_translation, self.get_plural_forms()[0]), explanation
+    return result
+
+  async def async_translate_plural(self, phrase, plural_phrase, context_translations):
+    """
+    Async version of translate_plural
+    """
+    system_prompt, memory_key, memorized = self._recall_plural_translation(phrase, plural_phrase, context_translations)
+    if memorized:
+      return memorized
+    raw_result = await self.async_get_throttled_translation(
+      system_prompt, self.get_plural_user_prompt(phrase, plural_phrase, context_translations))
+    result = self._process_plural_result(raw_result, plural_phrase, memory_key)
+    if result is None:
+      (singular_translation, explanation), (plural_translation, _) = await asyncio.gather(
+        self.async_translate(phrase, context_translations[0]), self.async_translate(plural_phrase, context_translations[-1]))
+      result = self.expand_plural_forms(singular_translation, plural_translation, self.get_plural_forms()[0]), explanation
+    return result
 
   def set_po_header_and_metadata(self, po, input_file):
     input_path = Path(input_file)
@@ -242,7 +876,9 @@ by the model.
 {self.params.owner} {self.params.owner_mail}, {datetime.now().year}.
 """
     po.metadata['Last-Translator'] = f'Auto-po-lyglot using {self.params.model} (https://github.com/leolivier/auto-po-lyglot)'
-    po.metadata['Language'] = get_language_code(self.target_language).upper()
+    # the code of the locale directories, e.g. pt_BR (empty if the language is unknown)
+    po.metadata['Language'] = get_language_code(self.target_language) or ''
+    po.metadata['Plural-Forms'] = get_plural_forms(self.target_language)
     po.metadata['PO-Revision-Date'] = f"{datetime.now():%Y-%m-%d %H:%M+00:00}\n"  # "2024-08-07 20:09+0200""
 
   def _copy_entry(self, to_entry, from_entry):
@@ -255,68 +891,410 @@ by the model.
     if from_entry.msgstr_plural:  # entry with plural management. Deep copy the plural case
       to_entry.msgstr_plural = from_entry.msgstr_plural.copy()
 
-  def translate_entry(self, entry, out_po=None):
+  def get_entry_fingerprint(self, entry):
+    """
+    Returns the fingerprint of an entry of the input po file for the current model and prompts (see fingerprints.py)
     """
-    Translate a single entry
+    return entry_fingerprint(self.params.model, self.get_prompt_hash(self.get_system_prompt()), entry)
+
+  def check_entry(self, entry, out_index=None):
+    """
+    Checks if an entry must be translated. If it is already translated in the output file (and not forced, nor
+    changed since its translation when the fingerprints are tracked), the existing translation is copied into the
+    entry.
     Args:
-        entry (polib.POEntry): The entry to translate
-        out_po (polib.POFile): The output po file if already existing
+        entry (polib.POEntry): The entry to check
+        out_index (POIndex): The index of the output po file if already existing
     Returns:
-        nothing (the entry is updated in-place)
+        dict: {"status": 'Empty', 'Fuzzy', 'Already' or 'Shared', "forced": forced, "entry": entry} if the entry must
+              not be translated, {"status": None, "forced": forced, "entry": entry} if it must be translated. With
+              fingerprints, the result also contains the "fingerprint" of the entry
     """
     forced = False
     if not entry.msgid:
-      return {"status": 'Empty', "forced": forced}
+      return {"status": 'Empty', "forced": forced, "entry": entry}
     # dont translate fuzzy entries except if forced by 'fuzzy' param
     if entry.fuzzy and not self.params.fuzzy:
-      return {"status": 'Fuzzy', "forced": forced}
-    if out_po:
-      out_entry = out_po.find(entry.msgid)
-      # don't translate again the existing translations except if forced by params
+      return {"status": 'Fuzzy', "forced": forced, "entry": entry}
+    # computed before the entry is updated with its translation
+    fingerprint = self.get_entry_fingerprint(entry) if self.fingerprints is not None else None
+    if out_index:
+      out_entry = out_index.find(entry)
+      # don't translate again the existing translations except if forced by params or changed since
       if out_entry:
         if ((out_entry.msgstr != "" or
              (out_entry.msgid_plural and out_entry.msgstr_plural[0] != ""))
-            and not self.params.force):
+            and not self.params.force and not self._is_changed(entry, fingerprint)):
           self._copy_entry(entry, out_entry)
-          return {"status": 'Already', "forced": forced}
+          return {"status": 'Already', "forced": forced, "entry": entry, "fingerprint": fingerprint}
         else:
           forced = "True"
-    original_phrase = entry.msgid
-    if entry.msgid_plural:  # entry with plural management. First manage the singular case
-      context_translation = entry.msgstr_plural[0] if entry.msgstr_plural else entry.msgid_plural
-    else:
-      context_translation = entry.msgstr if entry.msgstr else entry.msgid
-    translation, explanation = self.translate(original_phrase, context_translation)
+    if self.shared_translations is not None:
+      shared_entry = self.shared_translations.find(self.target_language, entry)
+      if shared_entry:  # already translated for another catalog of the run
+        entry.msgstr, entry.comment = shared_entry.msgstr, shared_entry.comment
+        if shared_entry.msgstr_plural:
+          entry.msgstr_plural = shared_entry.msgstr_plural.copy()
+        return {"status": 'Shared', "forced": forced, "entry": entry, "fingerprint": fingerprint}
+    return {"status": None, "forced": forced, "entry": entry, "fingerprint": fingerprint}
+
+  def _is_changed(self, entry, fingerprint):
+    if fingerprint and self.fingerprints.is_changed(entry, fingerprint):
+      logger.info(f"'{entry.msgid}' changed since its translation, translating it again")
+      return True
+    return False
+
+  def fail_entry(self, entry, res, error):
+    """
+    Records the failure of the translation of an entry: the entry is left untranslated so that a next run translates
+    it again.
+    Returns:
+        dict: the result of the entry, with the 'Failed' status and the error
+    """
+    logger.error(f"Error while translating '{entry.msgid}', skipping it: {error}")
+    entry.msgstr = ''
+    if entry.msgstr_plural:
+      entry.msgstr_plural = {i: '' for i in entry.msgstr_plural}
+    res.update(status='Failed', error=str(error))
+    return res
+
+  def check_prompts(self):
+    """
+    Builds the system prompt (cached) before the first request, so that a prompt which can't be built, e.g. for a
+    language without examples, stops the translation instead of failing every entry. Called only when an entry
+    must be translated by the LLM.
+    """
+    self.get_system_prompt()
+
+  def _translate_safely(self, entry, res, translate):
+    """
+    Sets the status of the result of an entry by calling translate(entry). The errors are recorded with fail_entry,
+    except the ones building the prompts (see check_prompts) which stop the translation of the file.
+    """
+    self.check_prompts()
+    try:
+      res['status'] = translate(entry)
+    except Exception as e:
+      self.fail_entry(entry, res, e)
+    return res
+
+  def get_entry_phrases(self, entry):
+    """
+    Returns the list of (original phrase, context translation) to be translated for an entry: the singular case
+    and, for entries with plural management, the plural case
+    """
+    if entry.msgid_plural:  # entry with plural management
+      return [
+        (entry.msgid, entry.msgstr_plural[0] if entry.msgstr_plural else entry.msgid_plural),
+        (entry.msgid_plural, entry.msgstr_plural[1] if entry.msgstr_plural else entry.msgid_plural),
+      ]
+    return [(entry.msgid, entry.msgstr if entry.msgstr else entry.msgid)]
+
+  def get_entry_context_translations(self, entry):
+    """
+    Returns the context translation of each plural form of the context language for an entry with plural management
+    """
+    if entry.msgstr_plural and any(entry.msgstr_plural.values()):
+      return [entry.msgstr_plural[i] for i in sorted(entry.msgstr_plural)]
+    return [entry.msgid, entry.msgid_plural]
+
+  def set_entry_translations(self, entry, phrases, translations):
+    """
+    Updates an entry with the translations of its phrases
+    Args:
+        entry (polib.POEntry): The entry to update
+        phrases (list(tuple(str,str))): The phrases returned by get_entry_phrases
+        translations (list(tuple(str,str))): The translation and explanation of each phrase
+    Returns:
+        str: the translation status of the entry ('Singular' or 'Plural')
+    """
+    (original_phrase, context_translation), (translation, explanation) = phrases[0], translations[0]
+    if entry.msgid_plural:  # entry with plural management. The plural translation is used for all the plural forms
+      nplurals, _ = self.get_plural_forms()
+      forms = self.expand_plural_forms(translation, translations[1][0], nplurals)
+      return self.set_entry_plural_translations(entry, forms, explanation, [context for _, context in phrases])
     # Add explanation to comment
     if explanation:
       entry.comment = explanation
     # Update translation
-    if entry.msgid_plural:  # entry with plural management. Update the singular case
-      entry.msgstr_plural[0] = translation
-    else:
-      entry.msgstr = translation
+    entry.msgstr = translation
     logger.info(f"""==================
 {self.params.original_language}: "{original_phrase}"
 {self.params.context_language}: "{context_translation}"
 {self.target_language}: "{translation}"
 Comment:{explanation if explanation else ''}
 """)
+    return 'Singular'
 
-    if entry.msgid_plural:  # entry with plural management. Now manage the plural case
-      original_phrase = entry.msgid_plural
-      context_translation = entry.msgstr_plural[1] if entry.msgstr_plural else entry.msgid_plural
-      translation, explanation = self.translate(original_phrase, context_translation)
-      # Update translation
-      entry.msgstr_plural[1] = translation
-      # Note: the plural explanation is **not** stored in the out po file.
-      logger.info(f"""================== PLURAL CASE ==================
-{self.params.original_language}: "{original_phrase}"
-{self.params.context_language}: "{context_translation}"
-{self.target_language}: "{translation}"
+  def set_entry_plural_translations(self, entry, forms, explanation, context_translations):
+    """
+    Updates an entry with plural management with the translations of all the plural forms of the target language
+    Returns:
+        str: the translation status of the entry ('Plural')
+    """
+    if explanation:
+      entry.comment = explanation
+    entry.msgstr_plural = dict(enumerate(forms))
+    logger.info(f"""================== PLURAL CASE ==================
+{self.params.original_language}: "{entry.msgid}" / "{entry.msgid_plural}"
+{self.params.context_language}: {', '.join(f'"{c}"' for c in context_translations)}
+{self.target_language}: {', '.join(f'"{form}"' for form in forms)}
 Comment:{explanation if explanation else ''}
 """)
-      return {"status": 'Plural', "forced": forced}
-    return {"status": 'Singular', "forced": forced}
+    return 'Plural'
+
+  def translate_plural_entry(self, entry):
+    """
+    Translate an entry with plural management in a single request
+    Returns:
+        str: the translation status of the entry ('Plural')
+    """
+    context_translations = self.get_entry_context_translations(entry)
+    forms, explanation = self.translate_plural(entry.msgid, entry.msgid_plural, context_translations)
+    return self.set_entry_plural_translations(entry, forms, explanation, context_translations)
+
+  def _translate_entry(self, entry):
+    if entry.msgid_plural:  # entry with plural management
+      return self.translate_plural_entry(entry)
+    phrases = self.get_entry_phrases(entry)
+    translations = [self.translate(original_phrase, context_translation) for original_phrase, context_translation in phrases]
+    return self.set_entry_translations(entry, phrases, translations)
+
+  def translate_entry(self, entry, out_index=None):
+    """
+    Translate a single entry. If the translation fails, the entry is left untranslated and its status is 'Failed'.
+    Args:
+        entry (polib.POEntry): The entry to translate
+        out_index (POIndex): The index of the output po file if already existing
+    Returns:
+        dict: the translation status of the entry (the entry is updated in-place)
+    """
+    res = self.check_entry(entry, out_index)
+    if res['status']:
+      return res
+    return self._translate_safely(entry, res, self._translate_entry)
+
+  async def async_translate_entry(self, entry, out_index=None):
+    """
+    Async version of translate_entry
+    """
+    res = self.check_entry(entry, out_index)
+    if res['status']:
+      return res
+    self.check_prompts()
+    try:
+      if entry.msgid_plural:  # entry with plural management
+        context_translations = self.get_entry_context_translations(entry)
+        forms, explanation = await self.async_translate_plural(entry.msgid, entry.msgid_plural, context_translations)
+        res['status'] = self.set_entry_plural_translations(entry, forms, explanation, context_translations)
+      else:
+        phrases = self.get_entry_phrases(entry)
+        translations = [await self.async_translate(*phrase) for phrase in phrases]
+        res['status'] = self.set_entry_translations(entry, phrases, translations)
+    except Exception as e:
+      self.fail_entry(entry, res, e)
+    return res
+
+  def get_workers(self):
+    """
+    Returns the number of entries translated concurrently, given by the workers param
+    """
+    return getattr(self.params, 'workers', 1) or 1
+
+  def _map(self, func, items):
+    """
+    Applies func to all items, one after the other or concurrently depending on the workers param,
+    and yields the results in the items order.
+    """
+    workers = self.get_workers()
+    if workers <= 1:
+      for item in items:
+        yield func(item)
+      return
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auto_po_lyglot')
+    try:
+      futures = [executor.submit(func, item) for item in items]
+      for future in futures:
+        yield future.result()
+    finally:
+      # on error, don't start the pending items but let the running ones finish
+      executor.shutdown(wait=True, cancel_futures=True)
+
+  def _get_batches(self, entries, batch_size):
+    """
+    Splits the entries into batches of at most batch_size phrases (an entry is never split)
+    """
+    batch, nb_phrases = [], 0
+    for entry in entries:
+      phrases = self.get_entry_phrases(entry)
+      if batch and nb_phrases + len(phrases) > batch_size:
+        yield batch
+        batch, nb_phrases = [], 0
+      batch.append((entry, phrases))
+      nb_phrases += len(phrases)
+    if batch:
+      yield batch
+
+  def translate_entries_by_batch(self, entries, out_index, batch_size):
+    """
+    Checks all the entries then translates the ones which must be translated with translate_batch, by batches
+    of at most batch_size phrases.
+    """
+    to_translate = []
+    for entry in entries:
+      res = self.check_entry(entry, out_index)
+      if res['status']:
+        yield res
+      else:
+        to_translate.append((entry, res))
+    results = {id(entry): res for entry, res in to_translate}
+    # entries with plural management need all the plural forms of the target language: they have their own requests
+    plural_entries = [(entry, res) for entry, res in to_translate if entry.msgid_plural]
+    to_translate = [(entry, res) for entry, res in to_translate if not entry.msgid_plural]
+    yield from self._map(lambda item: self._translate_safely(*item, self.translate_plural_entry), plural_entries)
+    batches = list(self._get_batches([entry for entry, _ in to_translate], batch_size))
+    logger.info(f"Translating {len(to_translate)} entries in {len(batches)} batches")
+
+    def translate_batch(batch):
+      try:
+        return self.translate_batch([phrase for _, phrases in batch for phrase in phrases])
+      except Exception as e:
+        return e
+
+    for batch, translations in zip(batches, self._map(translate_batch, batches)):
+      if isinstance(translations, Exception):
+        logger.warning(f"Error while translating a batch of {len(batch)} entries ({translations}), "
+                       "translating them one by one")
+      for entry, phrases in batch:
+        res = results[id(entry)]
+        if isinstance(translations, Exception):  # only the entries which fail again are skipped
+          yield self._translate_safely(entry, res, self._translate_entry)
+          continue
+        entry_translations, translations = translations[:len(phrases)], translations[len(phrases):]
+        res['status'] = self.set_entry_translations(entry, phrases, entry_translations)
+        yield res
+
+  def translate_entries(self, entries, out_index=None):
+    """
+    Translate a list of entries, one after the other or concurrently depending on the workers param. If the
+    batch_size param is greater than 1, several entries are translated in each request.
+    Args:
+        entries (list(polib.POEntry)): The entries to translate
+        out_index (POIndex): The index of the output po file if already existing
+    Yields:
+        dict: The result of translate_entry for each entry. Without batches, the results are in the entry order
+    """
+    batch_size = getattr(self.params, 'batch_size', 1) or 1
+    if batch_size > 1:
+      yield from self.translate_entries_by_batch(entries, out_index, batch_size)
+      return
+    if getattr(self.params, 'async_requests', False):
+      yield from self.translate_entries_async(entries, out_index)
+      return
+    workers = self.get_workers()
+    if workers > 1:
+      logger.info(f"Translating {len(entries)} entries with {workers} workers")
+    # entries are updated in-place so they keep their order in the po file
+    yield from self._map(lambda entry: self.translate_entry(entry, out_index), entries)
+
+  def translate_entries_async(self, entries, out_index=None):
+    """
+    Translate a list of entries with the async API of the client, in a single event loop running in the background.
+    The workers param gives the maximum number of requests in flight.
+    Yields:
+        dict: The result of translate_entry for each entry, in the entry order
+    """
+    workers = self.get_workers()
+    logger.info(f"Translating {len(entries)} entries with up to {workers} requests in flight")
+    semaphore = None
+
+    async def translate_entry(entry):
+      nonlocal semaphore
+      # the semaphore must be created in the event loop
+      semaphore = semaphore or asyncio.Semaphore(workers)
+      async with semaphore:
+        return await self.async_translate_entry(entry, out_index)
+
+    futures = [submit_coroutine(translate_entry(entry)) for entry in entries]
+    try:
+      for future in futures:
+        yield future.result()
+    finally:
+      # on error, don't start the pending entries
+      for future in futures:
+        future.cancel()
+
+  def open_fingerprints(self, output_file):
+    """
+    Loads the fingerprints of the entries of output_file if the track_changes param is set
+    """
+    self.fingerprints = FingerprintStore(output_file) if getattr(self.params, 'track_changes', False) else None
+
+  def track_entry(self, res):
+    """
+    Records the fingerprint of the result of an entry if the fingerprints are tracked
+    """
+    if self.fingerprints is not None:
+      self.fingerprints.add(res)
+
+  def save_fingerprints(self, complete=True):
+    if self.fingerprints is not None:
+      self.fingerprints.save(complete)
+
+  def load_pofile(self, input_file, output_file):
+    """
+    Loads the input po file, sets its header for the target language and indexes the output file if it exists
+    Returns:
+        tuple(polib.POFile, POIndex): the input po file and the output file index (None if the output doesn't exist)
+    """
+    po = polib.pofile(input_file)
+    out_index = POIndex(polib.pofile(output_file)) if Path(output_file).exists() else None
+    self.set_po_header_and_metadata(po, input_file)
+    return po, out_index
+
+  def get_checkpointer(self, po, output_file, out_index=None):
+    return Checkpointer(po, output_file, getattr(self.params, 'checkpoint_entries', 0),
+                        getattr(self.params, 'checkpoint_seconds', 0), out_index)
+
+  def save_pofile(self, po, output_file, stats, checkpointer=None):
+    """
+    Saves (and compiles if required) the translated po file and logs the translation statistics. When the translation
+    was interrupted, the checkpointer is given and only the translated entries are saved, with the existing
+    translations of the entries not reached yet (and nothing is compiled).
+    Returns:
+        tuple: the translate_pofile result
+    """
+    self.save_fingerprints(complete=checkpointer is None)
+    if checkpointer:
+      checkpointer.save()
+    else:
+      save_pofile_atomically(po, output_file)
+      if self.params.compile:
+        logger.info(f"Compiling {output_file}")
+        mo_output_file = Path(output_file).with_suffix('.mo')
+        po.save_as_mofile(mo_output_file)
+    return self.log_stats(output_file, stats, len(po))
+
+  def log_stats(self, output_file, stats, nb_entries):
+    """
+    Logs the translation statistics of a po file of nb_entries entries
+    Returns:
+        tuple: the translate_pofile result
+    """
+    if stats.failed:
+      logger.warning(f"{len(stats.failed)} entries could not be translated in {output_file}: "
+                     f"{', '.join(repr(msgid) for msgid in stats.failed)}")
+    to_be_translated = nb_entries - stats.already_translated
+    if to_be_translated == 0:
+      logger.info(f"Nothing to translate in {output_file}")
+      percent_translated = 100
+    else:
+      percent_translated = round(stats.nb_translations / to_be_translated * 100, 2)
+      logger.info(f"Saved {output_file}, translated {stats.nb_translations} entries out "
+                  f"of {nb_entries} entries, with {stats.already_translated} entries already translated and not taken "
+                  f"into account ({percent_translated}%)")
+      logger.info(f"{stats.forced} forced entries, {stats.fuzzy} fuzzy entries")
+    return stats.nb_translations, percent_translated, stats.already_translated, stats.forced, stats.fuzzy
 
   def translate_pofile(self, input_file, output_file):
     """
@@ -330,41 +1308,240 @@ Comment:{explanation if explanation else ''}
       - the number of forced (ie overwritten) entries (if output_file already exists and force=True),
       - and the number of fuzzy entries not taken into account (if fuzzy=False).
     """
+    self.current_file = input_file
+    self.open_fingerprints(output_file)
+    if getattr(self.params, 'stream_po', False):
+      return self.translate_pofile_stream(input_file, output_file)
     logger.info(f"Translating {input_file} to {self.target_language} in {output_file}")
-    po = polib.pofile(input_file)
-    out_po = polib.pofile(output_file) if Path(output_file).exists() else None
-    self.set_po_header_and_metadata(po, input_file)
+    po, out_index = self.load_pofile(input_file, output_file)
+    if self.translation_memory:
+      memory_hits, memory_misses = self.translation_memory.hits, self.translation_memory.misses
+    stats = TranslationStats()
+    checkpointer = self.get_checkpointer(po, output_file, out_index)
+    interrupted = None
     try:
-      nb_translations = 0
-      already_translated = 0
-      forced = 0
-      fuzzy = 0
-      for entry in po:
-        res = self.translate_entry(entry, out_po)
-        if res['status'] == 'Already':
-          already_translated += 1
-        elif res['status'] == 'Fuzzy':
-          fuzzy += 1
-        elif res['forced'] == 'True':
-          forced += 1
-        sleep(0.5)  # Sleep for 1/2 second to avoid rate limiting
-        nb_translations += 1
+      for res in self.translate_entries(po, out_index):
+        stats.count(res)
+        checkpointer.add(res)
+        self.track_entry(res)
+    except KeyboardInterrupt:
+      checkpointer.save()
+      self.save_fingerprints(complete=False)
+      raise
     except Exception as e:
       logger.error(f"Error: {e}")
+      interrupted = checkpointer
     # Save the new .po file even if there was an error to not lose what was translated
-    po.save(output_file)
-    if self.params.compile:
-      logger.info(f"Compiling {output_file}")
-      mo_output_file = Path(output_file).with_suffix('.mo')
-      po.save_as_mofile(mo_output_file)
-    to_be_translated = len(po) - already_translated
-    if to_be_translated == 0:
-      logger.info(f"Nothing to translate in {output_file}")
-      percent_translated = 100
-    else:
-      percent_translated = round(nb_translations / (len(po)-already_translated) * 100, 2)
-      logger.info(f"Saved {output_file}, translated {nb_translations} entries out "
-                  f"of {len(po)} entries, with {already_translated} entries already translated and not taken into account "
-                  f"({percent_translated}%)")
-      logger.info(f"{forced} forced entries, {fuzzy} fuzzy entries")
-    return nb_translations, percent_translated, already_translated, forced, fuzzy
+    result = self.save_pofile(po, output_file, stats, interrupted)
+    if self.translation_memory:
+      logger.info(f"Translation memory: {self.translation_memory.hits - memory_hits} hits, "
+                  f"{self.translation_memory.misses - memory_misses} misses")
+    return result
+
+  def translate_pofile_stream(self, input_file, output_file):
+    """
+    Same as translate_pofile but for very large files: the input file is read and translated by windows of
+    stream_window entries and the translated entries are appended to the output file as they go, so that the memory
+    used does not depend on the size of the files (the index of the existing output file is stored in a temporary
+    SQLite database). The entries are written to a partial file renamed to output_file at the end. When the
+    translation is interrupted, the rest of the entries already translated in the existing output file are copied
+    before renaming, and if the process is killed, the partial file is used by the next run to resume the translation.
+    """
+    logger.info(f"Translating {input_file} to {self.target_language} in {output_file} (streaming)")
+    window_size = getattr(self.params, 'stream_window', None)
+    reader = POStreamReader(input_file, window_size)
+    self.set_po_header_and_metadata(reader.header, input_file)
+    # the partial file of a killed run contains the most recent translations
+    existing_files = [f for f in (partial_file_name(output_file), output_file) if Path(f).exists()]
+    out_index = StreamedPOIndex(*existing_files, window_size=window_size) if existing_files else None
+    stats = TranslationStats()
+    writer = POStreamWriter(output_file, reader.header)
+    windows = reader.windows()
+    window, translated = [], set()
+    interrupted = False
+    try:
+      for window in windows:
+        translated = set()
+        for res in self.translate_entries(window, out_index):
+          stats.count(res)
+          self.track_entry(res)
+          if res['status'] in TRANSLATED_STATUSES:
+            translated.add(id(res['entry']))
+        writer.write(window)
+        window = []
+    except (KeyboardInterrupt, Exception) as e:
+      # keep the entries translated in the current window and the existing translations of the next ones
+      writer.write(entry for entry in window if id(entry) in translated)
+      for window in windows:
+        writer.write(entry for entry in window
+                     if self.check_entry(entry, out_index)['status'] in TRANSLATED_STATUSES)
+      writer.commit()
+      self.save_fingerprints(complete=False)
+      if isinstance(e, KeyboardInterrupt):
+        raise
+      logger.error(f"Error: {e}")
+      interrupted = True
+    finally:
+      reader.close()
+      if out_index:
+        out_index.close()
+    if not interrupted:
+      writer.commit()
+      self.save_fingerprints()
+      if self.params.compile:
+        logger.info(f"Compiling {output_file} (loading it in memory)")
+        polib.pofile(output_file).save_as_mofile(Path(output_file).with_suffix('.mo'))
+    return self.log_stats(output_file, stats, writer.nb_entries)
+
+  def for_language(self, target_language):
+    """
+    Returns a copy of this client for another target language. The copy shares the LLM connection, the rate limiter,
+    the translation memory and the prompt cache of this client.
+    """
+    client = copy.copy(self)
+    client.target_language = target_language
+    return client
+
+  def get_multi_language_system_prompt(self, target_languages):
+    """
+    Returns the system prompt asking for translations into all the target languages at once. Cached like
+    get_system_prompt.
+    """
+    key = ('multi', self.params.original_language, self.params.context_language, tuple(target_languages))
+    system_prompt = self._system_prompts.get(key)
+    if system_prompt is None:
+      system_prompt = self._system_prompts[key] = self._build_multi_language_system_prompt(target_languages)
+    return system_prompt
+
+  def _build_multi_language_system_prompt(self, target_languages):
+    original_language, context_language = self.params.original_language, self.params.context_language
+    examples = ''
+    try:
+      for example in [basic_examples[0], *po_placeholder_examples, *html_markers_examples]:
+        translations = '\n'.join(f'{language}: "{example[language]}"' for language in target_languages)
+        examples += multi_language_example.format(original_language=original_language,
+                                                  context_language=context_language,
+                                                  original_phrase=example[original_language],
+                                                  context_translation=example[context_language],
+                                                  target_translations=translations)
+    except KeyError as e:
+      raise PoLyglotException(f"examples.py does not contain an example for these piece: {str(e)}")
+    system_prompt = multi_language_system_prompt.format(original_language=original_language,
+                                                        context_language=context_language,
+                                                        target_languages=', '.join(target_languages),
+                                                        examples=examples)
+    logger.debug(f"Multi language system prompt:\n{system_prompt}")
+    return system_prompt
+
+  def process_multi_language_translation(self, raw_result, target_languages):
+    """
+    Process the raw result of a multi language translation, made of one 'language: "translation"' line per language
+    Returns:
+        dict: The translation by target language, only for the languages found in the result
+    """
+    languages = {language.lower(): language for language in target_languages}
+    results = {}
+    for line in raw_result.split('\n'):
+      language, sep, translation = line.partition(':')
+      language = languages.get(language.strip(' `*-').lower())
+      translation = translation.strip(' "')
+      if sep and language and language not in results and translation:
+        results[language] = translation
+    return results
+
+  def translate_multi(self, phrase, context_translation, target_languages):
+    """
+    Translate a phrase into several target languages in a single request. The languages missing in the response
+    are translated one by one.
+    Returns:
+        dict: The (translation, explanation) tuple by target language
+    """
+    clients = {language: self.for_language(language) for language in target_languages}
+    translations, memory_keys = {}, {}
+    for language, client in clients.items():
+      memory_keys[language], memorized = client.recall_translation(client.get_system_prompt(), phrase,
+                                                                   context_translation)
+      if memorized:
+        translations[language] = memorized
+    to_translate = [language for language in target_languages if language not in translations]
+    if len(to_translate) > 1:
+      raw_result = self.get_throttled_translation(self.get_multi_language_system_prompt(to_translate),
+                                                  self.get_user_prompt(phrase, context_translation))
+      for language, translation in self.process_multi_language_translation(raw_result, to_translate).items():
+        translations[language] = (translation, None)
+        clients[language].memorize_translation(memory_keys[language], translation, None)
+    for language in to_translate:
+      if language not in translations:
+        client = clients[language]
+        translations[language] = client._translate_phrase(client.get_system_prompt(), phrase, context_translation,
+                                                          memory_keys[language])
+    return translations
+
+  def translate_pofile_multi(self, input_file, output_files):
+    """
+    Translate a .po file into several target languages at once: each request to the LLM returns the translations
+    of a phrase in all the target languages which need it.
+    Args:
+        input_file (str): The po file to translate
+        output_files (dict): The output file by target language
+    Returns:
+        dict: the translate_pofile result by target language
+    """
+    logger.info(f"Translating {input_file} to {', '.join(output_files)} in {', '.join(map(str, output_files.values()))}")
+    self.current_file = input_file
+    clients = {language: self.for_language(language) for language in output_files}
+    pos, out_indexes, stats, checkpointers = {}, {}, {}, {}
+    for language, client in clients.items():
+      client.open_fingerprints(output_files[language])
+      pos[language], out_indexes[language] = client.load_pofile(input_file, output_files[language])
+      stats[language] = TranslationStats()
+      checkpointers[language] = client.get_checkpointer(pos[language], output_files[language], out_indexes[language])
+
+    def translate_entry_multi(i):
+      results, to_translate = {}, []
+      for language, client in clients.items():
+        results[language] = client.check_entry(pos[language][i], out_indexes[language])
+        if not results[language]['status']:
+          to_translate.append(language)
+      if to_translate and pos[to_translate[0]][i].msgid_plural:
+        # entries with plural management are translated separately as each language has its own plural forms
+        for language in to_translate:
+          client = clients[language]
+          client._translate_safely(pos[language][i], results[language], client.translate_plural_entry)
+      elif to_translate:
+        # the entries to translate are still identical to the input entry in all languages
+        phrases = self.get_entry_phrases(pos[to_translate[0]][i])
+        for language in to_translate:
+          clients[language].check_prompts()
+        try:
+          translations = [self.translate_multi(phrase, context_translation, to_translate)
+                          for phrase, context_translation in phrases]
+        except Exception as e:
+          for language in to_translate:
+            clients[language].fail_entry(pos[language][i], results[language], e)
+          return results
+        for language in to_translate:
+          results[language]['status'] = clients[language].set_entry_translations(
+            pos[language][i], phrases, [translation[language] for translation in translations])
+      return results
+
+    nb_entries = len(next(iter(pos.values()))) if pos else 0
+    interrupted = False
+    try:
+      for results in self._map(translate_entry_multi, range(nb_entries)):
+        for language, res in results.items():
+          stats[language].count(res)
+          checkpointers[language].add(res)
+          clients[language].track_entry(res)
+    except KeyboardInterrupt:
+      for language, checkpointer in checkpointers.items():
+        checkpointer.save()
+        clients[language].save_fingerprints(complete=False)
+      raise
+    except Exception as e:
+      logger.error(f"Error: {e}")
+      interrupted = True
+    # Save the new .po files even if there was an error to not lose what was translated
+    return {language: clients[language].save_pofile(pos[language], output_files[language], stats[language],
+                                                    checkpointers[language] if interrupted else None)
+            for language in clients}
@@ -0,0 +1,35 @@
+import asyncio
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def get_background_loop():
+  """
+  Returns the event loop, running in a background thread, used to call the async API of the clients from synchronous
+  code. As there is a single loop for the whole process, the async SDK clients keep their connections open between
+  calls.
+  """
+  global _loop
+  with _loop_lock:
+    if _loop is None:
+      _loop = asyncio.new_event_loop()
+      threading.Thread(target=_loop.run_forever, name='auto_po_lyglot_loop', daemon=True).start()
+  return _loop
+
+
+def submit_coroutine(coro):
+  """
+  Schedules a coroutine in the background event loop
+  Returns:
+      concurrent.futures.Future: the future of its result
+  """
+  return asyncio.run_coroutine_threadsafe(coro, get_background_loop())
+
+
+def run_coroutine(coro):
+  """
+  Runs a coroutine in the background event loop and waits for its result
+  """
+  return submit_coroutine(coro).result()
@@ -1,25 +1,231 @@
+import asyncio
+from collections import OrderedDict
+from datetime import timedelta
+import threading
+from time import monotonic
 import google.generativeai as genai
+from google.generativeai import caching
 import os
-from .client_base import AutoPoLyglotClient
+from .client_base import TRANSLATION_SCHEMA, AutoPoLyglotClient
+from .metrics import record_usage
+from .streaming import FirstLineReader
 import logging
 
 logger = logging.getLogger(__name__)
 
+# in structured output mode, the answer is constrained to the JSON schema by the API
+STRUCTURED_GENERATION_CONFIG = {"response_mime_type": "application/json", "response_schema": TRANSLATION_SCHEMA}
+
+
+def record_gemini_usage(response):
+  usage = getattr(response, 'usage_metadata', None)
+  if usage:
+    record_usage(usage.prompt_token_count, usage.candidates_token_count,
+                 getattr(usage, 'cached_content_token_count', 0))
+
+
+def cancel_stream(response):
+  """
+  Stops the generation of a streamed response: its iterator is the gRPC call (or the HTTP response with the REST
+  transport), cancelling it stops the request
+  """
+  cancel = getattr(getattr(response, '_iterator', None), 'cancel', None)
+  if cancel is not None:
+    cancel()
+
+
+async def async_cancel_stream(response):
+  """
+  Async version of cancel_stream. With the gRPC transport, the iterator is an async generator over the call: closing
+  it stops reading the stream, and the call is cancelled by gRPC when it is released
+  """
+  iterator = getattr(response, '_iterator', None)
+  if hasattr(iterator, 'cancel'):
+    await iterator.cancel()
+  elif hasattr(iterator, 'aclose'):
+    await iterator.aclose()
+
+
+class GeminiModels:
+  """
+  The model handles of a Gemini client by system prompt (a Gemini model handle is bound to its system prompt).
+  Keeps the max_size most recently used handles, so that interleaving the target languages through the same client
+  does not recreate a handle at each switch. The object can be shared by several threads.
+  """
+  def __init__(self, create_model, max_size=8):
+    self.create_model = create_model
+    self.max_size = max_size
+    self.models = OrderedDict()
+    self.lock = threading.Lock()
+
+  def get(self, system_prompt):
+    with self.lock:
+      model = self.models.get(system_prompt)
+      if model is not None:
+        self.models.move_to_end(system_prompt)
+        return model
+      model = self.models[system_prompt] = self.create_model(system_prompt)
+      if len(self.models) > self.max_size:
+        self.models.popitem(last=False)
+      return model
+
+  def discard(self, system_prompt):
+    """
+    Removes the handle of a system prompt, a new one is created by the next get
+    """
+    with self.lock:
+      self.models.pop(system_prompt, None)
+
 
 class GeminiClient(AutoPoLyglotClient):
-  cached_system_prompt = None
+  # number of model handles kept, at least one per target language translated with the client
+  max_models = 8
 
   def __init__(self, params, target_language=None):
     params.model = params.model or 'gemini-1.5-flash'  # default model if not provided
     super().__init__(params, target_language)
     api_key = params.gemini_api_key if hasattr(params, 'gemini_api_key') else os.environ["GEMINI_API_KEY"]
     genai.configure(api_key=api_key)
-    # self.client = genai.GenerativeModel(params.model) # must be regenerated every time the system prompt changes
+    # shared with the copies of this client for the other target languages (see for_language)
+    self.models = GeminiModels(self.create_model, self.max_models)
+
+  def create_model(self, system_prompt):
+    return genai.GenerativeModel(self.params.model, system_instruction=system_prompt)
+
+  def get_translation(self, system_prompt, user_prompt, generation_config=None):
+    response = self.models.get(system_prompt).generate_content(user_prompt, generation_config=generation_config)
+    record_gemini_usage(response)
+    return response.text
+
+  def get_structured_translation(self, system_prompt, user_prompt):
+    return self.get_translation(system_prompt, user_prompt, STRUCTURED_GENERATION_CONFIG)
 
-  def get_translation(self, system_prompt, user_prompt):
-    if not self.cached_system_prompt or self.cached_system_prompt != system_prompt:
-      self.cached_system_prompt = system_prompt
-      self.client = genai.GenerativeModel(self.params.model, system_instruction=system_prompt)
+  def get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    """
+    Streams the answer and stops the request as soon as the translation line is complete
+    """
+    reader = FirstLineReader()
+    response = self.models.get(system_prompt).generate_content(
+      user_prompt, generation_config={"max_output_tokens": max_tokens}, stream=True)
+    chunk = None
+    try:
+      for chunk in response:
+        if reader.add(chunk.text):
+          break
+    finally:
+      cancel_stream(response)
+    if chunk is not None:  # the usage of a chunk is the usage so far
+      record_gemini_usage(chunk)
+    return reader.line
 
-    response = self.client.generate_content(user_prompt)
+  def create_async_client(self):
+    # the models used in an event loop
+    return GeminiModels(self.create_model, self.max_models)
+
+  async def async_get_translation(self, system_prompt, user_prompt, generation_config=None):
+    model = self.async_client.get(system_prompt)
+    response = await model.generate_content_async(user_prompt, generation_config=generation_config)
+    record_gemini_usage(response)
     return response.text
+
+  async def async_get_structured_translation(self, system_prompt, user_prompt):
+    return await self.async_get_translation(system_prompt, user_prompt, STRUCTURED_GENERATION_CONFIG)
+
+  async def async_get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    reader = FirstLineReader()
+    model = self.async_client.get(system_prompt)
+    response = await model.generate_content_async(user_prompt, generation_config={"max_output_tokens": max_tokens},
+                                                  stream=True)
+    chunk = None
+    try:
+      async for chunk in response:
+        if reader.add(chunk.text):
+          break
+    finally:
+      await async_cancel_stream(response)
+    if chunk is not None:
+      record_gemini_usage(chunk)
+    return reader.line
+
+
+class CachedGeminiClient(GeminiClient):
+  """
+  Gemini client storing the system prompt in a Gemini context cache, so that it is not billed as input tokens at each
+  request. The cache expires cache_ttl after its last refresh and is refreshed while it is used, so it does not
+  outlive the run for long. When the system prompt cannot be cached (e.g. it is smaller than the minimum size of a
+  context cache for the model), the requests are sent with the full system prompt.
+  """
+  use_large_system_prompt = True  # gemini context caches have a minimum size
+  cache_ttl = timedelta(minutes=10)
+
+  def __init__(self, params, target_language=None):
+    super().__init__(params, target_language)
+    # the context caches by system prompt (None if the system prompt could not be cached) and their last refresh
+    self._cached_contents = {}
+    self._cache_lock = threading.Lock()
+
+  def get_cached_content(self, system_prompt):
+    """
+    Returns the context cache of the system prompt, created on the first call and refreshed when half of its ttl
+    has elapsed, or None if the system prompt cannot be cached. A cache which can't be refreshed, e.g. because it
+    expired while the system prompt was not used, is created again and the model handles bound to it are discarded.
+    """
+    expired = False
+    with self._cache_lock:
+      if system_prompt in self._cached_contents:
+        cached_content, refreshed = self._cached_contents[system_prompt]
+        if cached_content is None or monotonic() - refreshed <= self.cache_ttl.total_seconds() / 2:
+          return cached_content
+        try:
+          cached_content.update(ttl=self.cache_ttl)
+          self._cached_contents[system_prompt] = (cached_content, monotonic())
+          return cached_content
+        except Exception as e:
+          logger.warning(f"Cannot refresh the Gemini context cache {cached_content.name}, creating a new one: {e}")
+          expired = True
+      try:
+        cached_content = caching.CachedContent.create(model=self.params.model, system_instruction=system_prompt,
+                                                      ttl=self.cache_ttl)
+        logger.info(f"Gemini context cache {cached_content.name} created for the system prompt "
+                    f"({cached_content.usage_metadata.total_token_count} tokens)")
+      except Exception as e:
+        logger.warning(f"Cannot cache the system prompt with {self.params.model}, it will be sent with each "
+                       f"request: {e}")
+        cached_content = None
+      self._cached_contents[system_prompt] = (cached_content, monotonic())
+    if expired:
+      # outside of the cache lock, which is taken by create_model under the lock of the model handles
+      self.discard_models(system_prompt)
+    return cached_content
+
+  def discard_models(self, system_prompt):
+    """
+    Discards the model handles of the system prompt, in all the event loops
+    """
+    self.models.discard(system_prompt)
+    for models in list(self._async_clients.values()):
+      models.discard(system_prompt)
+
+  def create_model(self, system_prompt):
+    cached_content = self.get_cached_content(system_prompt)
+    if cached_content is None:
+      return super().create_model(system_prompt)
+    return genai.GenerativeModel.from_cached_content(cached_content)
+
+  def get_translation(self, system_prompt, user_prompt, generation_config=None):
+    self.get_cached_content(system_prompt)  # keeps the cache alive
+    return super().get_translation(system_prompt, user_prompt, generation_config)
+
+  async def async_get_translation(self, system_prompt, user_prompt, generation_config=None):
+    # creating or refreshing the cache are blocking calls, run in a thread so they don't block the event loop. The
+    # model handle is then created from the existing cache
+    await asyncio.to_thread(self.get_cached_content, system_prompt)
+    return await super().async_get_translation(system_prompt, user_prompt, generation_config)
+
+  def get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    self.get_cached_content(system_prompt)  # keeps the cache alive
+    return super().get_first_line_translation(system_prompt, user_prompt, max_tokens)
+
+  async def async_get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    await asyncio.to_thread(self.get_cached_content, system_prompt)
+    return await super().async_get_first_line_translation(system_prompt, user_prompt, max_tokens)
@@ -1,21 +1,36 @@
 import xai_sdk
-import asyncio
 from .client_base import AutoPoLyglotClient
+from .event_loop import run_coroutine
+from .metrics import record_usage
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def record_grok_usage(response):
+  usage = getattr(response, 'usage', None)
+  if usage:
+    record_usage(getattr(usage, 'prompt_tokens', 0), getattr(usage, 'completion_tokens', 0),
+                 getattr(usage, 'cached_prompt_text_tokens', 0))
+
+
 class GrokClient(AutoPoLyglotClient):
   def __init__(self, params, target_language=None):
     params.model = params.model or ""  # default model given by Grok itself if not provided
     super().__init__(params, target_language)
-    self.client = xai_sdk.Client(api_key=params.xai_api_key) if hasattr(params, 'xai_api_key') else xai_sdk.Client()
+
+  def create_async_client(self):
+    # the xai_sdk client is asynchronous only
+    return xai_sdk.Client(api_key=self.params.xai_api_key) if hasattr(self.params, 'xai_api_key') else xai_sdk.Client()
 
   async def async_get_translation(self, system_prompt, user_prompt):
-    conversation = self.client.chat.create_conversation()
+    # a conversation is a local object keeping the history of the messages: a new one is needed for each
+    # translation, but they all share the connection of the client
+    conversation = self.async_client.chat.create_conversation()
     response = await conversation.add_response_no_stream(f'{system_prompt}\n{user_prompt}\n')
+    record_grok_usage(response)
     return response.message
 
   def get_translation(self, system_prompt, user_prompt):
-    return asyncio.run(self.async_get_translation(system_prompt, user_prompt))
+    # runs in the background event loop, which keeps the client and its connection between calls
+    return run_coroutine(self.async_get_translation(system_prompt, user_prompt))
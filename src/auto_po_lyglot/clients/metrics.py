@@ -0,0 +1,188 @@
+import contextvars
+import json
+import logging
+import os
+from pathlib import Path
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# the usage of the request being sent to the LLM, filled by the clients with record_usage
+_current_usage = contextvars.ContextVar('auto_po_lyglot_usage', default=None)
+
+PROMETHEUS_PREFIX = 'auto_po_lyglot_llm'
+# name, type and help of each exported metric, by RequestStats attribute
+PROMETHEUS_METRICS = {
+  'requests': ('requests_total', 'counter', 'Number of requests sent to the LLM'),
+  'errors': ('errors_total', 'counter', 'Number of requests which failed'),
+  'retries': ('retries_total', 'counter', 'Number of requests sent again after an error'),
+  'prompt_tokens': ('prompt_tokens_total', 'counter', 'Number of tokens in the prompts'),
+  'completion_tokens': ('completion_tokens_total', 'counter', 'Number of tokens in the completions'),
+  'cached_tokens': ('cached_tokens_total', 'counter', 'Number of prompt tokens read from the provider cache'),
+  'latency': ('latency_seconds_total', 'counter', 'Total time spent waiting for the LLM responses'),
+  'max_latency': ('latency_seconds_max', 'gauge', 'Longest time spent waiting for a LLM response'),
+}
+
+
+def new_usage():
+  """
+  Starts recording the usage of a new request in the current context
+  Returns:
+      dict: the usage of the request, filled by record_usage (the retries are counted by get_throttled_translation)
+  """
+  usage = {'prompt_tokens': 0, 'completion_tokens': 0, 'cached_tokens': 0, 'retries': 0}
+  _current_usage.set(usage)
+  return usage
+
+
+def record_usage(prompt_tokens=0, completion_tokens=0, cached_tokens=0):
+  """
+  Called by the clients with the token usage returned by the LLM for the current request
+  """
+  usage = _current_usage.get()
+  if usage is not None:
+    usage['prompt_tokens'] += prompt_tokens or 0
+    usage['completion_tokens'] += completion_tokens or 0
+    usage['cached_tokens'] += cached_tokens or 0
+
+
+class RequestStats:
+  """
+  Aggregated metrics of the requests sent to the LLM
+  """
+  def __init__(self):
+    self.requests = 0
+    self.errors = 0
+    self.retries = 0
+    self.prompt_tokens = 0
+    self.completion_tokens = 0
+    self.cached_tokens = 0
+    self.latency = 0.0
+    self.max_latency = 0.0
+
+  def add(self, usage, latency, error=False):
+    self.requests += 1
+    self.errors += 1 if error else 0
+    self.retries += usage['retries']
+    self.prompt_tokens += usage['prompt_tokens']
+    self.completion_tokens += usage['completion_tokens']
+    self.cached_tokens += usage['cached_tokens']
+    self.latency += latency
+    self.max_latency = max(self.max_latency, latency)
+
+  def merge(self, other):
+    for attr in PROMETHEUS_METRICS:
+      if attr == 'max_latency':
+        self.max_latency = max(self.max_latency, other.max_latency)
+      else:
+        setattr(self, attr, getattr(self, attr) + getattr(other, attr))
+
+  def as_dict(self):
+    return {
+      **{attr: getattr(self, attr) for attr in PROMETHEUS_METRICS},
+      'average_latency': self.latency / self.requests if self.requests else 0.0,
+    }
+
+
+class LLMMetrics:
+  """
+  Metrics of all the requests sent to the LLMs, aggregated by client, model, file and target language.
+  The object can be shared by several threads.
+  """
+  labels = ('client', 'model', 'file', 'language')
+
+  def __init__(self):
+    self.stats = {}
+    self.lock = threading.Lock()
+
+  def record(self, client, model, file, language, usage, latency, error=False):
+    """
+    Records a request
+    Args:
+        client, model, file, language (str): the labels of the request
+        usage (dict): the usage of the request, see new_usage
+        latency (float): the time spent waiting for the response, in seconds
+        error (bool): True if the request failed
+    """
+    key = (client or '', model or '', str(file or ''), language or '')
+    with self.lock:
+      self.stats.setdefault(key, RequestStats()).add(usage, latency, error)
+
+  def total(self):
+    total = RequestStats()
+    with self.lock:
+      for stats in self.stats.values():
+        total.merge(stats)
+    return total
+
+  def summary(self):
+    """
+    Returns:
+        dict: the total metrics and the metrics of each (client, model, file, language)
+    """
+    with self.lock:
+      details = [{**dict(zip(self.labels, key)), **stats.as_dict()} for key, stats in sorted(self.stats.items())]
+    return {'total': self.total().as_dict(), 'details': details}
+
+  def log_summary(self):
+    total = self.total()
+    logger.info(f"LLM usage: {total.requests} requests ({total.errors} errors, {total.retries} retries), "
+                f"{total.prompt_tokens} prompt tokens ({total.cached_tokens} cached), {total.completion_tokens} "
+                f"completion tokens, {total.latency:.1f}s waiting for the responses")
+
+  def to_prometheus(self):
+    """
+    Returns:
+        str: the metrics in the Prometheus text format
+    """
+    lines = []
+    with self.lock:
+      items = sorted(self.stats.items())
+    for attr, (name, metric_type, description) in PROMETHEUS_METRICS.items():
+      lines.append(f"# HELP {PROMETHEUS_PREFIX}_{name} {description}")
+      lines.append(f"# TYPE {PROMETHEUS_PREFIX}_{name} {metric_type}")
+      for key, stats in items:
+        labels = ','.join(f'{label}="{escape_label(value)}"' for label, value in zip(self.labels, key))
+        lines.append(f"{PROMETHEUS_PREFIX}_{name}{{{labels}}} {getattr(stats, attr)}")
+    return '\n'.join(lines) + '\n'
+
+  def save_json(self, path):
+    _write_atomically(path, json.dumps(self.summary(), indent=2))
+    logger.info(f"LLM metrics saved in {path}")
+
+  def save_prometheus(self, path):
+    # the Prometheus textfile collector may read the file at any time: it must never be half written
+    _write_atomically(path, self.to_prometheus())
+    logger.info(f"LLM metrics saved in Prometheus format in {path}")
+
+
+def escape_label(value):
+  return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _write_atomically(path, text):
+  path = Path(path)
+  fd, tmp_file = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp')
+  try:
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+      f.write(text)
+    os.replace(tmp_file, path)
+  except BaseException:
+    Path(tmp_file).unlink(missing_ok=True)
+    raise
+
+
+# the metrics of all the clients of the process
+llm_metrics = LLMMetrics()
+
+
+def export_metrics(params, metrics=llm_metrics):
+  """
+  Logs the metrics summary and saves it in the files given by the metrics_file and metrics_prometheus params
+  """
+  metrics.log_summary()
+  if getattr(params, 'metrics_file', None):
+    metrics.save_json(params.metrics_file)
+  if getattr(params, 'metrics_prometheus', None):
+    metrics.save_prometheus(params.metrics_prometheus)
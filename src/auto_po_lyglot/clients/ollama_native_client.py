@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import threading
+
+import ollama
+
+from .client_base import TRANSLATION_SCHEMA, AutoPoLyglotClient, PoLyglotException
+from .metrics import record_usage
+from .streaming import FirstLineReader
+
+logger = logging.getLogger(__name__)
+
+# big enough for the large system prompt and the batch prompts. It must be the same for all the requests, otherwise
+# Ollama reloads the model
+DEFAULT_NUM_CTX = 8192
+DEFAULT_KEEP_ALIVE = '30m'
+
+
+def get_native_host(base_url):
+  """
+  Returns the URL of the native API of an Ollama server from the URL of its OpenAI compatible API (OLLAMA_BASE_URL)
+  """
+  return base_url.rstrip('/').removesuffix('/v1')
+
+
+def get_keep_alive(keep_alive):
+  """
+  Returns the keep_alive of the requests from the ollama_keep_alive param. Ollama parses the strings as durations
+  with a unit (e.g. 10m), so a number of seconds (e.g. -1 to keep the model loaded for ever) is sent as a number.
+  """
+  if not keep_alive:
+    return DEFAULT_KEEP_ALIVE
+  if isinstance(keep_alive, str):
+    for number_type in (int, float):
+      try:
+        return number_type(keep_alive)
+      except ValueError:
+        pass
+  return keep_alive
+
+
+class OllamaNativeClient(AutoPoLyglotClient):
+  """
+  Ollama client using the native Ollama API instead of its OpenAI compatible API, to control how the model is run:
+  - the model is loaded before the first request and kept loaded between the requests and the files of the run
+    (ollama_keep_alive param),
+  - all the requests use the same context size (ollama_num_ctx param), so the model is never reloaded,
+  - each system prompt is evaluated once before the first request using it, the next requests reuse its KV cache
+    as it is the common prefix of their prompts,
+  - the requests are sent concurrently up to the number of requests the server processes in parallel
+    (ollama_num_parallel param, OLLAMA_NUM_PARALLEL like the server setting).
+  """
+  use_large_system_prompt = True  # ollama tokens are free
+
+  def __init__(self, params, target_language=None):
+    params.model = params.model or "qwen2.5:3b"  # default model if not provided, the most translation capable small model
+    params.ollama_base_url = params.ollama_base_url or 'http://localhost:11434/v1'  # default Ollama local server URL
+    super().__init__(params, target_language)
+    self.host = get_native_host(params.ollama_base_url)
+    self.client = ollama.Client(host=self.host)
+    # the system prompts already evaluated by the server, shared with the copies of this client (see for_language)
+    self._preloaded = set()
+    self._preload_lock = threading.Lock()
+
+  def create_async_client(self):
+    return ollama.AsyncClient(host=self.host)
+
+  def get_workers(self):
+    return getattr(self.params, 'ollama_num_parallel', None) or super().get_workers()
+
+  def get_options(self):
+    options = {
+      "temperature": self.params.temperature,
+      "num_ctx": getattr(self.params, 'ollama_num_ctx', None) or DEFAULT_NUM_CTX,
+    }
+    num_predict = getattr(self.params, 'ollama_num_predict', None)
+    if num_predict:
+      options["num_predict"] = num_predict
+    return options
+
+  def get_chat_request(self, messages, structured=False, **options):
+    request = {
+      "model": self.params.model,
+      "messages": messages,
+      "options": {**self.get_options(), **options},
+      "keep_alive": get_keep_alive(getattr(self.params, 'ollama_keep_alive', None)),
+    }
+    if structured:
+      # the answer is constrained to the JSON schema by the server
+      request["format"] = TRANSLATION_SCHEMA
+    return request
+
+  def preload(self, system_prompt):
+    """
+    Loads the model if needed and evaluates the system prompt, once per system prompt. The other requests wait
+    for the end of the preload to reuse its KV cache.
+    """
+    with self._preload_lock:
+      if system_prompt in self._preloaded:
+        return
+      try:
+        response = self.client.chat(**self.get_chat_request([{"role": "system", "content": system_prompt}],
+                                                            num_predict=1))
+      except Exception as e:
+        raise PoLyglotException(str(e)) from e
+      self._preloaded.add(system_prompt)
+      logger.info(f"Ollama model {self.params.model} ready (loaded in {(response.load_duration or 0) / 1e9:.1f}s), "
+                  f"system prompt of {response.prompt_eval_count} tokens evaluated in "
+                  f"{(response.prompt_eval_duration or 0) / 1e9:.1f}s")
+
+  def get_messages(self, system_prompt, user_prompt):
+    return [
+      {"role": "system", "content": system_prompt},
+      {"role": "user", "content": user_prompt},
+    ]
+
+  def process_response(self, response):
+    # prompt_eval_count doesn't include the tokens of the prefix found in the KV cache
+    record_usage(response.prompt_eval_count, response.eval_count)
+    return response.message.content.strip()
+
+  def get_translation(self, system_prompt, user_prompt, structured=False):
+    self.preload(system_prompt)
+    try:
+      response = self.client.chat(**self.get_chat_request(self.get_messages(system_prompt, user_prompt), structured))
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+    return self.process_response(response)
+
+  def get_structured_translation(self, system_prompt, user_prompt):
+    return self.get_translation(system_prompt, user_prompt, structured=True)
+
+  async def async_get_translation(self, system_prompt, user_prompt, structured=False):
+    await asyncio.to_thread(self.preload, system_prompt)
+    try:
+      response = await self.async_client.chat(**self.get_chat_request(self.get_messages(system_prompt, user_prompt),
+                                                                      structured))
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+    return self.process_response(response)
+
+  async def async_get_structured_translation(self, system_prompt, user_prompt):
+    return await self.async_get_translation(system_prompt, user_prompt, structured=True)
+
+  def get_first_line_request(self, system_prompt, user_prompt, max_tokens):
+    return {**self.get_chat_request(self.get_messages(system_prompt, user_prompt), num_predict=max_tokens),
+            "stream": True}
+
+  def get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    """
+    Streams the answer and stops the request as soon as the translation line is complete: the server stops the
+    generation when the connection is closed, the model is then free for the next request
+    """
+    self.preload(system_prompt)
+    reader = FirstLineReader()
+    try:
+      stream = self.client.chat(**self.get_first_line_request(system_prompt, user_prompt, max_tokens))
+      try:
+        for chunk in stream:
+          if reader.add(chunk.message.content):
+            break
+      finally:
+        stream.close()
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+    # the token counts are only sent at the end of the stream, they are estimated (about one token per chunk)
+    record_usage(self.estimate_tokens(system_prompt, user_prompt), reader.nb_chunks)
+    return reader.line
+
+  async def async_get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    await asyncio.to_thread(self.preload, system_prompt)
+    reader = FirstLineReader()
+    try:
+      stream = await self.async_client.chat(**self.get_first_line_request(system_prompt, user_prompt, max_tokens))
+      try:
+        async for chunk in stream:
+          if reader.add(chunk.message.content):
+            break
+      finally:
+        await stream.aclose()
+    except Exception as e:
+      raise PoLyglotException(str(e)) from e
+    record_usage(self.estimate_tokens(system_prompt, user_prompt), reader.nb_chunks)
+    return reader.line
@@ -1,8 +1,49 @@
-from .client_base import AutoPoLyglotClient, PoLyglotException
-from openai import OpenAI
+import json
+import logging
+from time import sleep
+from .client_base import TRANSLATION_SCHEMA, AutoPoLyglotClient, PoLyglotException
+from .metrics import new_usage, record_usage
+from .streaming import FirstLineReader
+from openai import OpenAI, AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+
+def record_openai_usage(usage):
+    """
+    Records the token usage of an OpenAI API response (an object or, in batch results, a dict)
+    """
+    if not usage:
+        return
+    if isinstance(usage, dict):
+        record_usage(usage.get('prompt_tokens'), usage.get('completion_tokens'),
+                     (usage.get('prompt_tokens_details') or {}).get('cached_tokens'))
+    else:
+        record_usage(usage.prompt_tokens, usage.completion_tokens,
+                     getattr(getattr(usage, 'prompt_tokens_details', None), 'cached_tokens', 0))
 
 
 class OpenAIAPICompatibleClient(AutoPoLyglotClient):
+  def get_completion_request(self, system_prompt, user_prompt, structured=False):
+    request = {
+        "model": self.params.model,
+        "messages": [
+          {"role": "system", "content": system_prompt},
+          {"role": "user", "content": user_prompt},
+        ],
+        # "max_tokens": 2000,
+        "temperature": self.params.temperature,
+        "stream": False
+    }
+    if structured:
+      # strict mode requires all the properties and no additional ones
+      request["response_format"] = {
+        "type": "json_schema",
+        "json_schema": {"name": "translation", "strict": True,
+                        "schema": {**TRANSLATION_SCHEMA, "additionalProperties": False}},
+      }
+    return request
+
   def get_translation(self, system_prompt, user_prompt):
     """
     Retrieves a translation from any OpenAI API compatible client based on the provided system and user prompts.
@@ -17,29 +58,185 @@ class OpenAIAPICompatibleClient(AutoPoLyglotClient):
     Raises TranspoException with an error message if the translation fails.
     """
 
+    return self.create_completion(self.get_completion_request(system_prompt, user_prompt))
+
+  def get_structured_translation(self, system_prompt, user_prompt):
+    # the JSON schema of the answer is enforced by the API
+    return self.create_completion(self.get_completion_request(system_prompt, user_prompt, structured=True))
+
+  def create_completion(self, request):
     try:
-        response = self.client.chat.completions.create(
-            model=self.params.model,
-            messages=[
-              {"role": "system", "content": system_prompt},
-              {"role": "user", "content": user_prompt},
-            ],
-            # max_tokens=2000,
-            temperature=self.params.temperature,
-            stream=False
-        )
+        response = self.client.chat.completions.create(**request)
+        record_openai_usage(response.usage)
         return response.choices[0].message.content.strip()
     except Exception as e:
-        raise PoLyglotException(str(e))
+        raise PoLyglotException(str(e)) from e
+
+  def get_first_line_request(self, system_prompt, user_prompt, max_tokens):
+    return {**self.get_completion_request(system_prompt, user_prompt), "stream": True, "max_tokens": max_tokens}
+
+  def get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    """
+    Streams the answer and stops the request as soon as the translation line is complete
+    """
+    reader = FirstLineReader()
+    try:
+        stream = self.client.chat.completions.create(**self.get_first_line_request(system_prompt, user_prompt, max_tokens))
+        try:
+            for chunk in stream:
+                if chunk.choices and reader.add(chunk.choices[0].delta.content):
+                    break
+        finally:
+            stream.close()  # closing the connection stops the generation
+    except Exception as e:
+        raise PoLyglotException(str(e)) from e
+    # the usage is only sent at the end of the stream, it is estimated (about one token per chunk)
+    record_usage(self.estimate_tokens(system_prompt, user_prompt), reader.nb_chunks)
+    return reader.line
+
+  async def async_get_translation(self, system_prompt, user_prompt):
+    """
+    Async version of get_translation, using the async OpenAI client
+    """
+    return await self.async_create_completion(self.get_completion_request(system_prompt, user_prompt))
+
+  async def async_get_structured_translation(self, system_prompt, user_prompt):
+    return await self.async_create_completion(self.get_completion_request(system_prompt, user_prompt, structured=True))
+
+  async def async_get_first_line_translation(self, system_prompt, user_prompt, max_tokens):
+    reader = FirstLineReader()
+    try:
+        stream = await self.async_client.chat.completions.create(
+            **self.get_first_line_request(system_prompt, user_prompt, max_tokens))
+        try:
+            async for chunk in stream:
+                if chunk.choices and reader.add(chunk.choices[0].delta.content):
+                    break
+        finally:
+            await stream.close()
+    except Exception as e:
+        raise PoLyglotException(str(e)) from e
+    record_usage(self.estimate_tokens(system_prompt, user_prompt), reader.nb_chunks)
+    return reader.line
+
+  async def async_create_completion(self, request):
+    try:
+        response = await self.async_client.chat.completions.create(**request)
+        record_openai_usage(response.usage)
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        raise PoLyglotException(str(e)) from e
 
 
 class OpenAIClient(OpenAIAPICompatibleClient):
     def __init__(self, params, target_language=None):
         params.model = params.model or "gpt-4o-latest"  # default model if not provided
         super().__init__(params, target_language)
-        self.client = OpenAI(api_key=params.openai_api_key) if hasattr(params, 'openai_api_key') else OpenAI()
+        # the requests are retried by get_throttled_translation, not by the SDK
+        api_key = params.openai_api_key if hasattr(params, 'openai_api_key') else None  # None: OPENAI_API_KEY env var
+        self.client = OpenAI(api_key=api_key, max_retries=0)
 
-# TODO: implement a batch openai client
+    def create_async_client(self):
+        api_key = self.params.openai_api_key if hasattr(self.params, 'openai_api_key') else None
+        return AsyncOpenAI(api_key=api_key, max_retries=0)
+
+
+class OpenAIBatchClient(OpenAIClient):
+    """
+    Client using the OpenAI Batch API: all the phrases of a po file which must be translated are sent in a single
+    batch job, then the client waits for the job to complete and maps the results back onto the entries.
+    Batch jobs are 50% cheaper than regular requests but can take up to 24h: use this client for offline bulk
+    translations only.
+    """
+    poll_interval = 30  # seconds between two checks of the batch job status
+    completion_window = '24h'
+    batch_endpoint = '/v1/chat/completions'
+
+    def translate_entries(self, entries, out_index=None):
+        # all the entries of the file are translated in a single batch job
+        yield from self.translate_entries_by_batch(entries, out_index, batch_size=float('inf'))
+
+    def get_batch_request(self, custom_id, system_prompt, user_prompt):
+        return {
+          "custom_id": custom_id,
+          "method": "POST",
+          "url": self.batch_endpoint,
+          "body": {
+            "model": self.params.model,
+            "messages": [
+              {"role": "system", "content": system_prompt},
+              {"role": "user", "content": user_prompt},
+            ],
+            "temperature": self.params.temperature,
+          }
+        }
+
+    def run_batch_job(self, requests):
+        """
+        Submits the requests in a batch job and waits for its completion.
+
+        Args:
+            requests (list(dict)): The requests, see get_batch_request
+
+        Returns:
+            dict: The raw result of each successful request by custom_id
+        """
+        jsonl = '\n'.join(json.dumps(request, ensure_ascii=False) for request in requests)
+        try:
+            batch_file = self.client.files.create(file=('auto_po_lyglot_batch.jsonl', jsonl.encode('utf-8')),
+                                                  purpose='batch')
+            batch = self.client.batches.create(input_file_id=batch_file.id, endpoint=self.batch_endpoint,
+                                               completion_window=self.completion_window)
+            logger.info(f"Submitted batch job {batch.id} with {len(requests)} requests")
+            while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+                sleep(self.poll_interval)
+                batch = self.client.batches.retrieve(batch.id)
+                logger.info(f"Batch job {batch.id} is {batch.status}: {batch.request_counts}")
+            if not batch.output_file_id:
+                logger.error(f"Batch job {batch.id} {batch.status} without results: {batch.errors}")
+                return {}
+            output = self.client.files.content(batch.output_file_id).text
+        except Exception as e:
+            raise PoLyglotException(str(e)) from e
+
+        results = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = json.loads(line)
+            response = result.get('response') or {}
+            # the requests of a batch job have no latency of their own
+            usage = new_usage()
+            record_openai_usage((response.get('body') or {}).get('usage'))
+            self.record_request(usage, 0.0, error=response.get('status_code') != 200)
+            if response.get('status_code') == 200:
+                results[result['custom_id']] = response['body']['choices'][0]['message']['content'].strip()
+            else:
+                logger.warning(f"Batch request {result.get('custom_id')} failed: {result.get('error') or response}")
+        return results
+
+    def translate_batch(self, phrases):
+        """
+        Translates the phrases in a batch job. The phrases which failed in the batch job are translated again
+        with regular requests.
+        """
+        if self.target_language is None:
+            raise PoLyglotException("Error:target_language must be set before trying to translate anything")
+        system_prompt = self.get_system_prompt()
+        memory_keys, translations = self.recall_translations(system_prompt, phrases)
+        to_translate = [i for i, translation in enumerate(translations) if translation is None]
+        requests = [self.get_batch_request(str(i), system_prompt, self.get_user_prompt(*phrases[i])) for i in to_translate]
+        results = self.run_batch_job(requests) if requests else {}
+        for i in to_translate:
+            if str(i) in results:
+                translations[i] = self.process_translation(results[str(i)])
+                self.memorize_translation(memory_keys[i], *translations[i])
+        missing = [i for i, translation in enumerate(translations) if translation is None]
+        if missing:
+            logger.warning(f"{len(missing)} translations missing in the batch job results, translating them one by one")
+        for i in missing:
+            translations[i] = self._translate_phrase(system_prompt, *phrases[i], memory_keys[i])
+        return translations
 
 
 class OllamaClient(OpenAIAPICompatibleClient):
@@ -49,4 +246,7 @@ class OllamaClient(OpenAIAPICompatibleClient):
         params.model = params.model or "qwen2.5:3b"  # default model if not provided, the most translation capable small model
         params.ollama_base_url = params.ollama_base_url or 'http://localhost:11434/v1'  # default Ollama local server URL
         super().__init__(params, target_language)
-        self.client = OpenAI(api_key='Ollama_Key_Unused_But_Required', base_url=self.params.ollama_base_url)
+        self.client = OpenAI(api_key='Ollama_Key_Unused_But_Required', base_url=self.params.ollama_base_url, max_retries=0)
+
+    def create_async_client(self):
+        return AsyncOpenAI(api_key='Ollama_Key_Unused_But_Required', base_url=self.params.ollama_base_url, max_retries=0)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import re
+import threading
+from time import monotonic, sleep
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_MARKERS = ['rate limit', 'rate_limit', 'too many requests', 'resource_exhausted']
+# the 429 status in the message of an error, not a part of a name or number (e.g. model-429 or 14290 tokens)
+RATE_LIMIT_STATUS_RE = re.compile(r'(?<![\w.-])429(?![\w-])')
+# the rate limit errors of the SDKs (openai, anthropic, google.api_core)
+RATE_LIMIT_ERROR_TYPES = ('RateLimitError', 'ResourceExhausted')
+RETRY_AFTER_RE = re.compile(r'retry[ _-]after[^0-9]*([0-9.]+)', re.IGNORECASE)
+
+
+def is_rate_limit_error(error):
+  """
+  Returns True if the given exception looks like a rate limit error returned by an LLM provider. The status code and
+  type of the errors of the SDKs are used first, the message only for the errors without status code
+  """
+  status_code = getattr(error, 'status_code', None) or getattr(error, 'code', None)
+  if isinstance(status_code, int):
+    return status_code == 429
+  if type(error).__name__ in RATE_LIMIT_ERROR_TYPES:
+    return True
+  message = str(error).lower()
+  return bool(RATE_LIMIT_STATUS_RE.search(message)) or any(marker in message for marker in RATE_LIMIT_MARKERS)
+
+
+def get_retry_after(error):
+  """Returns the delay in seconds requested by the provider in a rate limit error, or None if not provided"""
+  response = getattr(error, 'response', None)
+  headers = getattr(response, 'headers', None)
+  if headers and headers.get('retry-after'):
+    try:
+      return float(headers.get('retry-after'))
+    except ValueError:
+      pass
+  match = RETRY_AFTER_RE.search(str(error))
+  return float(match.group(1)) if match else None
+
+
+class RateLimiter:
+  """
+  Base rate limiter, does not limit anything. Used for clients without rate limits (like Ollama).
+  Sub classes must be thread safe as they are shared by all the workers of a client.
+  """
+  # True if acquire blocks the requests during the delay returned by backoff
+  blocks_on_backoff = False
+
+  def acquire(self, tokens=0):
+    """
+    Blocks until a request consuming the given number of tokens can be sent to the LLM
+    """
+    pass
+
+  async def async_acquire(self, tokens=0):
+    """
+    Same as acquire but does not block the event loop while waiting
+    """
+    pass
+
+  def success(self):
+    """
+    Called after each successful request
+    """
+    pass
+
+  def backoff(self, retry_after=None):
+    """
+    Called when the provider returned a rate limit error.
+    Args:
+        retry_after (float): the delay requested by the provider if any
+    Returns:
+        float: The delay, in seconds, during which no new request will be sent
+    """
+    return retry_after or 0
+
+
+class _Bucket:
+  def __init__(self, per_minute):
+    self.rate = per_minute / 60  # refill rate per second
+    # allow bursts of 10 seconds worth of requests or tokens
+    self.capacity = max(per_minute / 6, 1)
+    self.level = self.capacity
+    self.updated = monotonic()
+
+  def refill(self, now):
+    self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+    self.updated = now
+
+  def wait_time(self, amount):
+    # requests bigger than the bucket capacity are accepted when the bucket is full (the level will go negative)
+    missing = min(amount, self.capacity) - self.level
+    return missing / self.rate if missing > 0 else 0
+
+  def empty(self):
+    self.level = min(self.level, 0)
+
+
+class TokenBucketRateLimiter(RateLimiter):
+  """
+  Token bucket rate limiter over requests per minute and tokens per minute.
+  When the provider returns a rate limit error, all requests are suspended for an exponentially growing delay
+  (or the delay requested by the provider) and the buckets are emptied.
+  """
+  blocks_on_backoff = True
+
+  def __init__(self, requests_per_minute=None, tokens_per_minute=None, initial_backoff=1.0, max_backoff=60.0):
+    self.requests = _Bucket(requests_per_minute) if requests_per_minute else None
+    self.tokens = _Bucket(tokens_per_minute) if tokens_per_minute else None
+    self.initial_backoff = initial_backoff
+    self.max_backoff = max_backoff
+    self.next_backoff = initial_backoff
+    self.blocked_until = 0
+    self.lock = threading.Lock()
+
+  def _wait_time(self, tokens, now):
+    wait = self.blocked_until - now
+    if self.requests:
+      self.requests.refill(now)
+      wait = max(wait, self.requests.wait_time(1))
+    if self.tokens and tokens:
+      self.tokens.refill(now)
+      wait = max(wait, self.tokens.wait_time(tokens))
+    return wait
+
+  def _try_acquire(self, tokens):
+    """
+    Consumes a request and the given number of tokens if possible
+    Returns:
+        float: 0 if consumed, otherwise the time to wait before trying again
+    """
+    with self.lock:
+      wait = self._wait_time(tokens, monotonic())
+      if wait <= 0:
+        if self.requests:
+          self.requests.level -= 1
+        if self.tokens:
+          self.tokens.level -= tokens
+        return 0
+    logger.debug(f"Rate limiter: waiting {wait:.2f}s")
+    return wait
+
+  def acquire(self, tokens=0):
+    while wait := self._try_acquire(tokens):
+      sleep(wait)
+
+  async def async_acquire(self, tokens=0):
+    while wait := self._try_acquire(tokens):
+      await asyncio.sleep(wait)
+
+  def success(self):
+    with self.lock:
+      self.next_backoff = self.initial_backoff
+
+  def backoff(self, retry_after=None):
+    with self.lock:
+      delay = retry_after if retry_after is not None else self.next_backoff
+      delay = min(delay, self.max_backoff)
+      self.next_backoff = min(self.next_backoff * 2, self.max_backoff)
+      self.blocked_until = max(self.blocked_until, monotonic() + delay)
+      for bucket in (self.requests, self.tokens):
+        if bucket:
+          bucket.empty()
+    return delay
@@ -0,0 +1,128 @@
+import logging
+import random
+import re
+import threading
+
+from .rate_limiter import get_retry_after, is_rate_limit_error
+
+logger = logging.getLogger(__name__)
+
+# the HTTP status in the message of the errors of the SDKs, e.g. "Error code: 503 - ..." or "503 Service Unavailable"
+STATUS_CODE_RE = re.compile(r'(?:error code|status code|status)\W*(\d{3})\b|^(\d{3}) [A-Z]', re.IGNORECASE)
+TIMEOUT_MARKERS = ['timeout', 'timed out', 'deadline exceeded', 'deadline_exceeded']
+CONNECTION_MARKERS = ['connection error', 'connection reset', 'connection refused', 'connection aborted',
+                      'remote end closed', 'server disconnected']
+OVERLOADED_MARKERS = ['overloaded']
+
+
+def iter_errors(error):
+  """
+  Yields the error and the errors it was raised from (PoLyglotException wraps the errors of the SDKs)
+  """
+  seen = set()
+  while error is not None and id(error) not in seen:
+    seen.add(id(error))
+    yield error
+    error = error.__cause__ or error.__context__
+
+
+def get_status_code(error):
+  for e in iter_errors(error):
+    status_code = getattr(e, 'status_code', None) or getattr(e, 'code', None)
+    if isinstance(status_code, int):
+      return status_code
+    match = STATUS_CODE_RE.search(str(e))
+    if match:
+      return int(match.group(1) or match.group(2))
+  return None
+
+
+def classify_error(error):
+  """
+  Returns the class of a transient error returned by an LLM provider: 'rate_limit', 'overloaded', 'server_error',
+  'timeout' or 'connection', or None if the error is not transient (e.g. an invalid API key or model)
+  """
+  status_code = get_status_code(error)
+  # the message of the errors is only checked when they have no status code
+  if status_code == 429 or (status_code is None and any(is_rate_limit_error(e) for e in iter_errors(error))):
+    return 'rate_limit'
+  message = ' '.join(f'{type(e).__name__} {e}' for e in iter_errors(error)).lower()
+  if status_code == 529 or any(marker in message for marker in OVERLOADED_MARKERS):
+    return 'overloaded'
+  if status_code in (408, 504) or any(marker in message for marker in TIMEOUT_MARKERS):
+    return 'timeout'
+  if status_code and 500 <= status_code < 600:
+    return 'server_error'
+  if status_code is None and (any(isinstance(e, ConnectionError) for e in iter_errors(error)) or
+                              any(marker in message for marker in CONNECTION_MARKERS)):
+    return 'connection'
+  return None
+
+
+def get_error_retry_after(error):
+  for e in iter_errors(error):
+    retry_after = get_retry_after(e)
+    if retry_after is not None:
+      return retry_after
+  return None
+
+
+class RetryRule:
+  """
+  How a class of errors is retried: at most max_retries times, after an exponential delay starting at initial_delay
+  and capped to max_delay, with jitter. The delay requested by the provider (Retry-After) is used instead when given.
+  When use_rate_limiter is True, the backoff is delegated to the rate limiter of the client, which suspends all
+  its requests and not only the failed one.
+  """
+  def __init__(self, max_retries, initial_delay=1.0, max_delay=60.0, use_rate_limiter=False):
+    self.max_retries = max_retries
+    self.initial_delay = initial_delay
+    self.max_delay = max_delay
+    self.use_rate_limiter = use_rate_limiter
+
+  def get_delay(self, retries, retry_after=None):
+    if retry_after is not None:
+      return min(retry_after, self.max_delay)
+    delay = min(self.initial_delay * 2 ** retries, self.max_delay)
+    # "equal jitter": the concurrent requests failing together are not retried together
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+DEFAULT_RETRY_RULES = {
+  'rate_limit': RetryRule(8, use_rate_limiter=True),
+  'overloaded': RetryRule(5, initial_delay=2.0),
+  'server_error': RetryRule(3),
+  'timeout': RetryRule(3),
+  'connection': RetryRule(3),
+}
+
+
+class RetryBudget:
+  """
+  Limits the retries to a ratio of the requests (plus min_retries), so that a provider which is down fails the
+  requests quickly instead of multiplying them. A ratio of 0 disables the retries. The object can be shared by several
+  threads.
+  """
+  def __init__(self, ratio=0.2, min_retries=10):
+    self.ratio = ratio
+    self.balance = min_retries if ratio else 0
+    self.lock = threading.Lock()
+
+  def deposit(self):
+    """
+    Called for each new request
+    """
+    with self.lock:
+      self.balance += self.ratio
+
+  def withdraw(self):
+    """
+    Called before each retry
+    Returns:
+        bool: False if the budget is exhausted and the request must not be retried
+    """
+    with self.lock:
+      if self.balance < 1:
+        return False
+      self.balance -= 1
+      return True
@@ -0,0 +1,26 @@
+class FirstLineReader:
+  """
+  Reads the chunks of a streamed answer until its first line, the translation, is complete: the rest of the answer,
+  the explanation, is not needed when the explanations are disabled (no_explanation param), so the request can be
+  stopped (see AutoPoLyglotClient.get_first_line_translation).
+  """
+  def __init__(self):
+    self.text = ''
+    self.nb_chunks = 0
+
+  def add(self, chunk):
+    """
+    Adds a chunk of the answer
+    Returns:
+        bool: True if the first non empty line of the answer is complete
+    """
+    self.nb_chunks += 1
+    self.text += chunk or ''
+    return '\n' in self.text.lstrip()
+
+  @property
+  def line(self):
+    """
+    The first non empty line of the answer, or the whole answer if the stream ended before the end of the line
+    """
+    return self.text.strip().split('\n')[0]
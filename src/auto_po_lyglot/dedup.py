@@ -0,0 +1,125 @@
+import logging
+from pathlib import Path
+import threading
+
+import polib
+
+from .po_index import POIndex, entry_key
+from .scheduler import TranslationJob
+
+logger = logging.getLogger(__name__)
+
+
+def dedup_key(entry):
+  """
+  Returns the key of the entries which can share their translation: same msgctxt, msgid, msgid_plural and context
+  translation
+  """
+  return (*entry_key(entry), entry.msgstr, tuple(sorted(entry.msgstr_plural.items())))
+
+
+def _copy_for_translation(entry):
+  return polib.POEntry(msgid=entry.msgid, msgstr=entry.msgstr, msgid_plural=entry.msgid_plural,
+                       msgstr_plural=entry.msgstr_plural.copy(), msgctxt=entry.msgctxt)
+
+
+class SharedTranslations:
+  """
+  Translations shared by all the jobs of a run, by target language and dedup key. They are computed by a pre-pass
+  translating only once the entries which appear several times in the catalogs of the run (see
+  collect_duplicates and DeduplicationJob). The clients copy them instead of calling the LLM (see check_entry).
+  """
+  def __init__(self):
+    self.translations = {}
+    self.hits = 0
+    self.lock = threading.Lock()
+
+  def add(self, target_language, key, entry):
+    """
+    Adds a translated entry. The key must be computed before the translation as it contains the context translation.
+    """
+    with self.lock:
+      self.translations.setdefault(target_language, {})[key] = entry
+
+  def find(self, target_language, entry):
+    """
+    Returns the translated entry sharing its translation with the given entry, or None
+    """
+    translated = self.translations.get(target_language, {}).get(dedup_key(entry))
+    if translated is not None:
+      with self.lock:
+        self.hits += 1
+    return translated
+
+  @property
+  def saved_requests(self):
+    """
+    The number of requests saved: each shared translation was requested once for all the entries copying it
+    """
+    with self.lock:
+      return max(self.hits - sum(len(t) for t in self.translations.values()), 0)
+
+
+def collect_duplicates(params, po_list):
+  """
+  Pre-pass over all the catalogs returned by locate_django_translation_files, grouping the entries to be translated
+  by (msgid, msgctxt, context translation, target language).
+  Args:
+      params: the run params (force and fuzzy are used like in check_entry)
+      po_list (dict): the result of locate_django_translation_files
+  Returns:
+      tuple(dict, int): a po file by target language, containing one entry per group of at least 2 entries, and the
+                        number of requests saved by translating each of these groups only once
+  """
+  catalogs = {}
+  counts = {}
+  for input_file, output_files in po_list.items():
+    po = catalogs.setdefault(input_file, polib.pofile(input_file))
+    for tlg_output_file in output_files:
+      for target_language, output_file in tlg_output_file.items():
+        out_index = POIndex(polib.pofile(output_file)) if Path(output_file).exists() and not params.force else None
+        language_counts = counts.setdefault(target_language, {})
+        for entry in po:
+          if not entry.msgid or entry.obsolete or (entry.fuzzy and not params.fuzzy):
+            continue
+          out_entry = out_index.find(entry) if out_index else None
+          if out_entry and (out_entry.msgstr or (out_entry.msgid_plural and out_entry.msgstr_plural.get(0))):
+            continue  # already translated
+          key = dedup_key(entry)
+          if key in language_counts:
+            language_counts[key][1] += 1
+          else:
+            language_counts[key] = [entry, 1]
+  duplicates, saved_requests = {}, 0
+  for target_language, language_counts in counts.items():
+    po = polib.POFile()
+    for entry, count in language_counts.values():
+      if count > 1:
+        po.append(_copy_for_translation(entry))
+        saved_requests += count - 1
+    if po:
+      duplicates[target_language] = po
+  logger.info(f"Deduplication: {sum(len(po) for po in duplicates.values())} phrases appear several times, translating "
+              f"them only once saves {saved_requests} requests")
+  return duplicates, saved_requests
+
+
+class DeduplicationJob(TranslationJob):
+  """
+  Translates the entries collected by collect_duplicates for a target language and adds them to the shared
+  translations
+  """
+  def __init__(self, po, target_language, shared_translations, llm_client=None):
+    super().__init__(None, target_language, None, llm_client)
+    self.po = po
+    self.shared_translations = shared_translations
+
+  def __repr__(self):
+    return f"DeduplicationJob({len(self.po)} entries -> {self.target_language})"
+
+  def run(self, client):
+    # the translation replaces the context translation in the entries
+    keys = {id(entry): dedup_key(entry) for entry in self.po}
+    for res in client.translate_entries(self.po):
+      if res['status'] in ('Singular', 'Plural'):
+        self.shared_translations.add(self.target_language, keys[id(res['entry'])], res['entry'])
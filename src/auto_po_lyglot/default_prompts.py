@@ -101,6 +101,95 @@ your output:
 
 user_prompt = """{original_language} sentence: "{original_phrase}", {context_language} translation: "{context_translation}" """
 
+# Added at the end of the system prompt when several phrases are translated in the same request (batch mode).
+# It can use the original_language, context_language and target_language placeholders.
+batch_system_prompt = """
+Several sentences can also be sent in the same request. In this case, instead of the format above, the user input will be
+a JSON list of objects, each one containing an "id", the {original_language} sentence as "original" and its
+{context_language} translation as "context", e.g.:
+```
+[{{"id": 1, "original": "first {original_language} sentence", "context": "its {context_language} translation"}},
+ {{"id": 2, "original": "second {original_language} sentence", "context": "its {context_language} translation"}}]
+```
+and you must answer only with a JSON list containing, for each sentence, the same "id", your {target_language} translation
+as "translation" and, only if needed, your explanation as "explanation", e.g.:
+```
+[{{"id": 1, "translation": "{target_language} translation of the first sentence"}},
+ {{"id": 2, "translation": "{target_language} translation of the second sentence", "explanation": "why"}}]
+```
+The translations must not be surrounded by additional double quotes. Never omit a sentence and never merge several sentences.
+"""
+
+# Added at the end of the system prompt in structured output mode, where the answer is a JSON object instead of the
+# format above. It can use the original_language, context_language and target_language placeholders.
+structured_output_system_prompt = """
+Instead of the format above, you must answer only with a JSON object containing your {target_language} translation as
+"translation" and, only if needed, your explanation as "explanation" (an empty string otherwise), e.g.:
+```
+{{"translation": "{target_language} translation of the sentence", "explanation": ""}}
+```
+The translation must not be surrounded by additional double quotes. Never add anything before or after the JSON object.
+"""
+
+# Added at the end of the user prompt when the answer in structured output mode was not a valid JSON object
+structured_output_retry_prompt = """
+Your previous answer was not a valid JSON object. Answer only with a JSON object containing "translation" and "explanation"."""
+
+# Added at the end of the system prompt when an entry with plural forms is translated. It can use the original_language,
+# context_language and target_language placeholders.
+plural_system_prompt = """
+Some sentences have plural forms. In this case, instead of the format above, the user input will contain the singular and
+plural {original_language} sentences, the {context_language} translation of each of their plural forms, and the number of
+plural forms of {target_language} with the gettext rule which selects the form to use for a number n, e.g.:
+```
+{original_language} singular sentence: "One file", plural sentence: "%(n)s files", {context_language} plural forms: "form 0 translation", "form 1 translation"
+{target_language} has 2 plural forms, selected by the gettext rule: (n != 1)
+```
+and you must answer with exactly one line per {target_language} plural form, in the order of the forms (form 0 first), each
+line containing only the translation for this form surrounded by double quotes. If needed, the explanation must come only
+after all the forms, on a new line.
+"""  # noqa
+
+plural_user_prompt = """{original_language} singular sentence: "{original_phrase}", \
+plural sentence: "{original_plural_phrase}", {context_language} plural forms: {context_translations}
+{target_language} has {nplurals} plural forms, selected by the gettext rule: {plural_rule}"""
+
+# System prompt used when a phrase is translated into several target languages in a single request (multi language mode).
+# It can use the original_language, context_language, target_languages (comma separated list) and examples placeholders.
+# The examples placeholder is filled with the examples below (basic, po placeholder and html examples) formatted with
+# the multi_language_example template.
+multi_language_system_prompt = """
+You are a highly skilled translator with expertise in {original_language}, {context_language} and {target_languages}.
+Your task is to accurately translate the {original_language} text the user provides into each of these languages: {target_languages}.
+You must preserve the meaning, tone, and nuance of the original text.
+As the provided sentences can be short and ambiguous, the user will also provide an accurate {context_language} translation
+for this {original_language} sentence. Please, consider this {context_language} translation for desambiguating the meaning
+of the {original_language} sentence. Your translations must remain consistent with the {context_language} translation.
+Please maintain also proper grammar, spelling, and punctuation in the translated versions.
+The user input will have the following format:
+```
+{original_language} sentence: "original sentence to be translated", {context_language} translation: "context translation of this sentence"
+```
+Please respond only with one line per language, in this order: {target_languages}. Each line must contain the name of the
+language, a colon and your translation into this language surrounded by double quotes, with absolutely no other words and no
+explanation, as this will be used in a machine to machine environment.
+Also, sometimes, the sentence to be translated and its context translation will contain placheholders or HTML markers that you
+are not allowed to translate and must keep in the same place in your translation. The placeholders can be identified with the
+following Python regex: r'{{[^}}]*}}|%%[sd]|%%\\([^)]*\\)s' and the HTML markers with the following Python regex: r'<[^>]*>'.
+Here are some examples of user inputs and of your expected outputs:
+{examples}"""  # noqa
+
+multi_language_example = """
+user input:
+```
+{original_language} sentence: "{original_phrase}", {context_language} translation: "{context_translation}"
+```
+your output:
+```
+{target_translations}
+```
+"""
+
 ######################################################################################
 #            EXAMPLES OF TRANSLATIONS IN DIFFERENT LANGUAGES                         #
 ######################################################################################
@@ -0,0 +1,260 @@
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import threading
+
+import polib
+
+from .checkpoint import write_text_atomically
+from .default_prompts import system_prompt as default_system_prompt, user_prompt as default_user_prompt
+from .scheduler import TranslationJob, MultiLanguageTranslationJob
+from .translation_memory import hash_text
+
+logger = logging.getLogger(__name__)
+
+# name of the scan cache file in the Django project directory
+DEFAULT_SCAN_CACHE = '.auto_po_lyglot_scan.json'
+SCAN_CACHE_VERSION = 1
+
+
+def hash_file(path):
+  sha = hashlib.sha256()
+  with open(path, 'rb') as f:
+    for block in iter(lambda: f.read(1 << 20), b''):
+      sha.update(block)
+  return sha.hexdigest()
+
+
+def file_signature(path):
+  """
+  Returns:
+      list: the mtime and size of a file, or None if it doesn't exist
+  """
+  try:
+    stat = os.stat(path)
+  except OSError:
+    return None
+  return [stat.st_mtime_ns, stat.st_size]
+
+
+def get_plan_settings(params):
+  """
+  Returns a hash of the params changing the translations of a file, including the prompts: a file translated with
+  other settings is not considered unchanged
+  """
+  prompt_hash = hash_text(params.system_prompt or default_system_prompt, params.user_prompt or default_user_prompt)
+  return hash_text(params.llm_client, params.model, params.original_language, params.context_language,
+                   str(bool(params.fuzzy)), prompt_hash)
+
+
+class ScanCache:
+  """
+  Cache of a Django run, saved in a JSON file and reused by the next runs:
+  - the result of the scan of the project (see scan_translation_files), reused as long as the mtime of the scanned
+    directories has not changed (adding or removing a file or a directory changes the mtime of its parent),
+  - the sha256 of the input files, computed again only when their mtime or size has changed,
+  - for each output file completely translated, the hash of its input file and its own mtime and size at that time,
+    so that the unchanged files are not translated again (see plan_django_jobs).
+  The object can be shared by several threads.
+  """
+  def __init__(self, path):
+    self.path = Path(path)
+    self.data = self._load()
+    self.lock = threading.Lock()
+
+  def _load(self):
+    empty = {'version': SCAN_CACHE_VERSION, 'scans': {}, 'inputs': {}, 'outputs': {}}
+    try:
+      data = json.loads(self.path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+      return empty
+    if not isinstance(data, dict) or data.get('version') != SCAN_CACHE_VERSION:
+      logger.info(f"Ignoring the scan cache {self.path}, written by another version")
+      return empty
+    return data
+
+  @staticmethod
+  def _key(path):
+    return str(Path(path).resolve())
+
+  def get_scan(self, django_path, context_lang_code):
+    """
+    Returns:
+        list(Path): the context translation files found by the previous scan, or None if a directory has changed
+    """
+    root = Path(django_path)
+    scan = self.data['scans'].get(f"{self._key(root)}|{context_lang_code}")
+    if scan is None:
+      return None
+    for directory, mtime in scan['dirs'].items():
+      try:
+        if os.stat(root / directory).st_mtime_ns != mtime:
+          return None
+      except OSError:
+        return None
+    return [root / po_file for po_file in scan['files']]
+
+  def set_scan(self, django_path, context_lang_code, po_files, directories):
+    """
+    Records the result of a scan: the context translation files found and the scanned directories, whose current mtime
+    is recorded
+    """
+    root = Path(django_path)
+    # the paths are relative to the project so that the scan doesn't depend on the current directory
+    dirs = {str(Path(directory).relative_to(root)): os.stat(directory).st_mtime_ns for directory in directories}
+    with self.lock:
+      self.data['scans'][f"{self._key(root)}|{context_lang_code}"] = {
+        'files': [str(Path(po_file).relative_to(root)) for po_file in po_files],
+        'dirs': dirs,
+      }
+
+  def get_hash(self, input_file):
+    """
+    Returns the sha256 of an input file, computed only if the file has changed since the previous run
+    """
+    key, signature = self._key(input_file), file_signature(input_file)
+    with self.lock:
+      cached = self.data['inputs'].get(key)
+    if cached and cached['signature'] == signature:
+      return cached['sha256']
+    sha256 = hash_file(input_file)
+    with self.lock:
+      self.data['inputs'][key] = {'signature': signature, 'sha256': sha256}
+    return sha256
+
+  def is_unchanged(self, input_file, output_file, input_hash, settings):
+    """
+    Returns True if output_file was completely translated from the same input, with the same settings, and has not
+    changed since
+    """
+    with self.lock:
+      record = self.data['outputs'].get(self._key(output_file))
+    return (record is not None and record['input'] == self._key(input_file) and record['input_sha256'] == input_hash
+            and record['settings'] == settings and record['signature'] == file_signature(output_file))
+
+  def record(self, input_file, output_file, input_hash, settings):
+    """
+    Records an output file completely translated
+    """
+    with self.lock:
+      self.data['outputs'][self._key(output_file)] = {
+        'input': self._key(input_file),
+        'input_sha256': input_hash,
+        'settings': settings,
+        'signature': file_signature(output_file),
+      }
+
+  def save(self):
+    with self.lock:
+      text = json.dumps(self.data)
+    # a killed run must not leave a half written cache
+    write_text_atomically(text, self.path)
+    logger.info(f"Scan cache saved in {self.path}")
+
+
+def is_completely_translated(output_file, fuzzy=False):
+  """
+  Returns True if all the entries of output_file which would be translated by a new run are translated
+  """
+  return all(entry.translated() or not entry.msgid or entry.obsolete or (entry.fuzzy and not fuzzy)
+             for entry in polib.pofile(output_file))
+
+
+class WorkPlan:
+  """
+  The translation jobs of a Django run, computed by plan_django_jobs. The jobs are independent and can be run in
+  parallel by a JobScheduler.
+  """
+  def __init__(self, settings):
+    self.settings = settings
+    self.jobs = []
+    # (input file, target language, output file) of the output files not translated again
+    self.unchanged = []
+    self.input_hashes = {}
+
+  def pairs(self):
+    """
+    Yields:
+        tuple: the (input file, target language, output file) translated by the jobs of the plan
+    """
+    for job in self.jobs:
+      if isinstance(job, MultiLanguageTranslationJob):
+        for target_language, output_file in job.output_files.items():
+          yield job.input_file, target_language, output_file
+      else:
+        yield job.input_file, job.target_language, job.output_file
+
+  def po_list(self):
+    """
+    Returns:
+        dict: the files translated by the jobs, in the format of locate_django_translation_files
+    """
+    po_list = {}
+    for input_file, target_language, output_file in self.pairs():
+      po_list.setdefault(input_file, []).append({target_language: output_file})
+    return po_list
+
+  def describe(self):
+    """
+    Returns:
+        list(dict): the planned translations and the unchanged ones, e.g. to be printed as JSON
+    """
+    return ([{'input': str(i), 'language': language, 'output': str(o), 'action': 'translate'}
+             for i, language, o in self.pairs()] +
+            [{'input': str(i), 'language': language, 'output': str(o), 'action': 'unchanged'}
+             for i, language, o in self.unchanged])
+
+  def record_results(self, scan_cache, fuzzy=False):
+    """
+    Records in the scan cache the output files which are now completely translated, so that the next runs skip them
+    while their input doesn't change
+    """
+    def record(pair):
+      input_file, _, output_file = pair
+      if Path(output_file).exists() and is_completely_translated(output_file, fuzzy):
+        input_hash = self.input_hashes.get(input_file) or scan_cache.get_hash(input_file)
+        scan_cache.record(input_file, output_file, input_hash, self.settings)
+        return True
+      return False
+
+    with ThreadPoolExecutor(thread_name_prefix='auto_po_lyglot_scan') as executor:
+      nb_complete = sum(executor.map(record, list(self.pairs())))
+    logger.info(f"{nb_complete} translated files complete")
+
+
+def plan_django_jobs(params, po_list, scan_cache=None):
+  """
+  Plans the translation jobs of a Django run: one job per (input file, target language), or one job per input file
+  translating into all the target languages at once in multi language mode. With a scan cache (and unless forced),
+  the output files completely translated by a previous run from the same input file and not changed since are
+  skipped. The input files are hashed in parallel.
+  Args:
+      params: the run params
+      po_list (dict): the result of locate_django_translation_files
+      scan_cache (ScanCache): the cache of the previous runs
+  Returns:
+      WorkPlan: the plan
+  """
+  plan = WorkPlan(get_plan_settings(params))
+  use_cache = scan_cache is not None and not params.force
+  if use_cache:
+    with ThreadPoolExecutor(thread_name_prefix='auto_po_lyglot_scan') as executor:
+      plan.input_hashes = dict(zip(po_list, executor.map(scan_cache.get_hash, po_list)))
+  for input_file, output_files in po_list.items():
+    to_translate = {}
+    for tlg_output_file in output_files:
+      for target_language, output_file in tlg_output_file.items():
+        if use_cache and scan_cache.is_unchanged(input_file, output_file, plan.input_hashes[input_file], plan.settings):
+          plan.unchanged.append((input_file, target_language, output_file))
+        else:
+          to_translate[target_language] = output_file
+    if params.multi_language and len(to_translate) > 1:
+      plan.jobs.append(MultiLanguageTranslationJob(input_file, to_translate))
+      continue
+    for target_language, output_file in to_translate.items():
+      plan.jobs.append(TranslationJob(input_file, target_language, output_file))
+  logger.info(f"Work plan: {len(plan.jobs)} translation jobs, {len(plan.unchanged)} unchanged translated files skipped")
+  return plan
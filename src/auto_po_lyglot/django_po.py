@@ -1,11 +1,63 @@
 import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path, PurePath
-from auto_po_lyglot.getenv import get_language_code
+from auto_po_lyglot.language_codes import get_language_code
 
 logger = logging.getLogger(__name__)
 
+# directories never containing Django applications, not scanned (nor the hidden ones like .git or .venv)
+SKIPPED_DIRS = {'node_modules', '__pycache__', 'site-packages', 'static', 'media'}
 
-def locate_django_translation_files(django_path, context_language, target_languages):
+
+def _scan_dir(directory, context_lang_code):
+  """
+  Scans a single directory
+  Returns:
+      tuple(list(Path), list(Path), list(Path)): the context translation files of the locale directory of this
+      directory (if any), the scanned directories and the subdirectories to scan
+  """
+  po_files, scanned_dirs, subdirs = [], [Path(directory)], []
+  with os.scandir(directory) as entries:
+    for entry in entries:
+      if not entry.is_dir(follow_symlinks=False) or entry.name.startswith('.') or entry.name in SKIPPED_DIRS:
+        continue
+      if entry.name != 'locale':
+        subdirs.append(Path(entry.path))
+        continue
+      # the other languages of the locale directory are not scanned, but its mtime changes when one is added
+      lang_dir = Path(entry.path) / context_lang_code
+      messages_dir = lang_dir / 'LC_MESSAGES'
+      scanned_dirs.append(Path(entry.path))
+      if messages_dir.is_dir():
+        scanned_dirs.extend([lang_dir, messages_dir])
+        po_files.extend(p for p in messages_dir.glob('*.po') if p.is_file())
+  return po_files, scanned_dirs, subdirs
+
+
+def scan_translation_files(django_path, context_lang_code, workers=None):
+  """
+  Recursively scans a Django project for the translation files of the context language: the .po files of all the
+  <application>/locale/<context language code>/LC_MESSAGES directories, at any depth (nested packages, vendored
+  applications...). The directories of each level of the tree are scanned in parallel by workers threads.
+  Returns:
+      tuple(list(Path), list(Path)): the sorted context translation files and the scanned directories (see ScanCache)
+  """
+  po_files, scanned_dirs = [], []
+  level = [Path(django_path)]
+  with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='auto_po_lyglot_scan') as executor:
+    while level:
+      next_level = []
+      for dir_po_files, dirs, subdirs in executor.map(lambda d: _scan_dir(d, context_lang_code), level):
+        po_files.extend(dir_po_files)
+        scanned_dirs.extend(dirs)
+        next_level.extend(subdirs)
+      level = next_level
+  logger.info(f"Scanned {len(scanned_dirs)} directories of {django_path}, found {len(po_files)} translation files")
+  return sorted(po_files), scanned_dirs
+
+
+def locate_django_translation_files(django_path, context_language, target_languages, scan_cache=None):
   """
   Locates all the Django translation files for the context language in the given path and returns a list of their paths.
 
@@ -13,6 +65,8 @@ def locate_django_translation_files(django_path, context_language, target_langua
     django_path (str): The path to the Django project directory. If None, the current directory is used.
     context_language (str): The context language of the translations.
     target_languages (List[str]): The target languages of the translations.
+    scan_cache (ScanCache): If given, the result of the scan of the project is reused from the previous run when no
+      directory has changed since.
 
   Returns:
     List[str]: A dictionary of the form
@@ -32,23 +86,31 @@ def locate_django_translation_files(django_path, context_language, target_langua
 
   path = Path(django_path or '.')
   context_lang_code = get_language_code(context_language) or 'xx'
-  context_lang_path = Path('locale') / context_lang_code / 'LC_MESSAGES'
-  input_po_files = [p for p in path.glob(f'*/{context_lang_path}/*.po')]
+  input_po_files = scan_cache.get_scan(path, context_lang_code) if scan_cache else None
+  scanned_dirs = None
+  if input_po_files is None:
+    input_po_files, scanned_dirs = scan_translation_files(path, context_lang_code)
+  else:
+    logger.info(f"Reusing the scan of {path}: {len(input_po_files)} translation files")
   logger.debug(f"Input PO files: {input_po_files}")
+  # replace the context language code with the target language code in the file name
+  target_paths = {target_language: PurePath(get_language_code(target_language) or 'xx')
+                  for target_language in target_languages}
   translation_files = {}
+  output_dirs = set()
   for input_po_file in input_po_files:
     output_po_files = []
     outfile_parts = PurePath(input_po_file).parts
-    for target_language in target_languages:
-      # replace the context language code with the target language code in the file name
-      target_code = get_language_code(target_language) or 'xx'
-      target_path = PurePath(target_code)
+    for target_language, target_path in target_paths.items():
       outfile = Path(*outfile_parts[:-3]).joinpath(target_path, *outfile_parts[-2:])
-      # create the directory if it doesn't exist
-      dir = outfile.parent
-      dir.mkdir(parents=True, exist_ok=True)
-
+      output_dirs.add(outfile.parent)
       output_po_files.append({target_language: str(outfile)})
     translation_files[str(input_po_file)] = output_po_files
+  # create the directories which don't exist, once each
+  for output_dir in output_dirs:
+    output_dir.mkdir(parents=True, exist_ok=True)
+  if scan_cache and scanned_dirs is not None:
+    # after the creation of the output directories, which changes the mtime of the locale directories
+    scan_cache.set_scan(path, context_lang_code, input_po_files, scanned_dirs)
   logger.info(f"Translation files: {translation_files}")
   return translation_files
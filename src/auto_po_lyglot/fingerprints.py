@@ -0,0 +1,85 @@
+import json
+import logging
+from pathlib import Path
+import threading
+
+from .checkpoint import TRANSLATED_STATUSES, write_text_atomically
+from .po_index import entry_key
+from .translation_memory import hash_text
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINTS_VERSION = 1
+# the hashes are truncated to keep the sidecar files small, collisions are very unlikely with 64 bits in a catalog
+HASH_SIZE = 16
+
+
+def fingerprints_file_name(output_file):
+  """
+  Returns the name of the sidecar file of an output po file: <output file name without .po>.fingerprints.json
+  """
+  return Path(output_file).with_suffix('.fingerprints.json')
+
+
+def entry_fingerprint(model, prompt_hash, entry):
+  """
+  Returns the fingerprint of the source of the translation of an entry of the input po file: its msgid, msgctxt and
+  context translation(s), the model and the prompts
+  """
+  return hash_text(model, prompt_hash, *entry_key(entry), entry.msgstr,
+                   *(entry.msgstr_plural[i] for i in sorted(entry.msgstr_plural)))[:HASH_SIZE]
+
+
+class FingerprintStore:
+  """
+  The fingerprints of the entries translated in an output po file, saved in a JSON sidecar file next to it (see
+  fingerprints_file_name). The next run translates again the entries already translated whose fingerprint changed
+  (see check_entry), e.g. because their context translation was edited, instead of keeping or forcing all of them.
+  The entries translated before the fingerprints were tracked have no fingerprint: they are considered unchanged and
+  get one. The object can be shared by several threads.
+  """
+  def __init__(self, output_file):
+    self.path = fingerprints_file_name(output_file)
+    self.previous = self._load()
+    self.current = {}
+    self.lock = threading.Lock()
+
+  def _load(self):
+    try:
+      data = json.loads(self.path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+      return {}
+    if not isinstance(data, dict) or data.get('version') != FINGERPRINTS_VERSION:
+      logger.info(f"Ignoring the fingerprints {self.path}, written by another version")
+      return {}
+    return data.get('entries', {})
+
+  @staticmethod
+  def _key(entry):
+    return hash_text(*entry_key(entry))[:HASH_SIZE]
+
+  def is_changed(self, entry, fingerprint):
+    """
+    Returns True if the entry was translated from another source, according to its fingerprint in the sidecar file
+    """
+    previous = self.previous.get(self._key(entry))
+    return previous is not None and previous != fingerprint
+
+  def add(self, res):
+    """
+    Records the fingerprint of an entry translated in the output file (see check_entry)
+    """
+    if res['status'] in TRANSLATED_STATUSES and res.get('fingerprint'):
+      with self.lock:
+        self.current[self._key(res['entry'])] = res['fingerprint']
+
+  def save(self, complete=True):
+    """
+    Saves the fingerprints of the translated entries. When the translation was interrupted (complete=False), the
+    fingerprints of the entries not reached yet are kept.
+    """
+    with self.lock:
+      entries = self.current if complete else {**self.previous, **self.current}
+      text = json.dumps({'version': FINGERPRINTS_VERSION, 'entries': dict(sorted(entries.items()))}, indent=0)
+    write_text_atomically(text, self.path)
+    logger.info(f"Saved the fingerprints of {len(entries)} entries in {self.path}")
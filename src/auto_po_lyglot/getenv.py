@@ -7,7 +7,7 @@ from os import environ
 import argparse
 import sys
 
-import langcodes
+from .language_codes import get_language_code
 
 logger = logging.getLogger(__name__)
 
@@ -78,10 +78,12 @@ the context translation."""
                         help='show the prompts used for translation and exits')
     parser.add_argument('-l', '--llm',
                         type=str,
-                        help='Le type of LLM you want to use. Can be openai, ollama, claude or claude_cached. '
-                             'For openai or claude[_cached], you need to set the api key in the environment. '
-                             'Supersedes LLM_CLIENT in .env. Default is ollama',
-                        choices=['openai', 'ollama', 'claude', 'claude_cached', 'gemini', 'grok'])
+                        help='Le type of LLM you want to use. Can be openai, openai_batch, ollama, ollama_native, claude, '
+                             'claude_cached, gemini, gemini_cached or grok. For openai[_batch], claude[_cached] or '
+                             'gemini[_cached], you need to set the api key in the environment. Supersedes LLM_CLIENT in '
+                             '.env. Default is ollama',
+                        choices=['openai', 'openai_batch', 'ollama', 'ollama_native', 'claude', 'claude_cached', 'gemini',
+                                 'gemini_cached', 'grok'])
     parser.add_argument('-m', '--model',
                         type=str,
                         help='the name of the model to use. Supersedes LLM_MODEL in .env. If not provided at all, '
@@ -116,9 +118,37 @@ the context translation."""
                         action='store_true',
                         help='Overwrites the output po file if it already exists. Supersedes OVERWRITE_OUTPUT in .env. '
                              'Default is False')
+    parser.add_argument('--resume',
+                        action='store_true',
+                        help='Resumes an interrupted translation: the existing output po file is reused and only the '
+                             'entries not translated in it are translated. Supersedes RESUME in .env. Default is False')
+    parser.add_argument('--checkpoint-entries',
+                        type=int,
+                        help='Saves the entries translated so far in the output po file every N translated entries, '
+                             '0 to disable. Supersedes CHECKPOINT_ENTRIES in .env. Default is 0 (no checkpoint)')
+    parser.add_argument('--checkpoint-seconds',
+                        type=int,
+                        help='Saves the entries translated so far in the output po file every N seconds, 0 to disable. '
+                             'Supersedes CHECKPOINT_SECONDS in .env. Default is 0 (no checkpoint)')
+    parser.add_argument('--stream-po',
+                        action='store_true',
+                        help='Reads, translates and writes the po files by windows of entries instead of loading them '
+                             'in memory, for very large po files. Not used with --multi-language. Supersedes STREAM_PO '
+                             'in .env. Default is False')
+    parser.add_argument('--stream-window',
+                        type=int,
+                        help='Number of entries read and translated at a time with --stream-po. Supersedes '
+                             'STREAM_WINDOW in .env. Default is 1000')
     parser.add_argument('-f', '--force',
                         action='store_true',
                         help='Forces translating already translated entries. Supersedes FORCE in .env. Default is False')
+    parser.add_argument('--track-changes',
+                        action='store_true',
+                        help='Stores a fingerprint of each translated entry (its msgid, context translation, the model '
+                             'and the prompts) in a .fingerprints.json file named after the output po file (e.g. '
+                             'django.fingerprints.json next to django.po), so that the next runs translate again the '
+                             'already translated entries whose fingerprint changed. Supersedes TRACK_CHANGES in .env. '
+                             'Default is False')
     parser.add_argument('-c', '--compile',
                         action='store_true',
                         help='Compiles the output po file to an mo file. Supersedes COMPILE in .env. Default is False')
@@ -131,6 +161,96 @@ the context translation."""
     parser.add_argument('--owner_mail',
                         type=str,
                         help='Email of the owner. Supersersedes OWNER_MAIL in .env. Default is <OWNER EMAIL>')
+    parser.add_argument('-w', '--workers',
+                        type=int,
+                        help='Number of entries translated concurrently. Supersedes WORKERS in .env. Default is 1 '
+                             '(entries are translated one after the other)')
+    parser.add_argument('--async-requests',
+                        action='store_true',
+                        help='Sends the requests with the async API of the LLM client, with up to WORKERS requests in '
+                             'flight in a single thread. Supersedes ASYNC_REQUESTS in .env. Default is False')
+    parser.add_argument('-b', '--batch-size',
+                        type=int,
+                        help='Number of phrases translated in a single request to the LLM. Supersedes BATCH_SIZE in .env. '
+                             'Default is 1 (one request per phrase)')
+    parser.add_argument('--multi-language',
+                        action='store_true',
+                        help='Translates into all the target languages in a single request per phrase. Supersedes '
+                             'MULTI_LANGUAGE in .env. Default is False')
+    parser.add_argument('--no-explanation',
+                        action='store_true',
+                        help='Does not ask for the explanations of the translations: the answer of the LLM is streamed '
+                             'and the request stopped as soon as the translation line is complete, with a max number '
+                             'of tokens fitting the phrase. Supersedes NO_EXPLANATION in .env. Default is False')
+    parser.add_argument('--structured-output',
+                        action='store_true',
+                        help='Asks the LLM for a JSON object containing the translation and its explanation, with '
+                             'the JSON mode or tool calling of the provider, instead of parsing its raw text answer. An '
+                             'invalid answer is asked again once. Not used for batches, plurals and multi language '
+                             'requests. Supersedes STRUCTURED_OUTPUT in .env. Default is False')
+    parser.add_argument('-j', '--max-jobs',
+                        type=int,
+                        help='Maximum number of translation jobs (one per po file and target language) run in parallel. '
+                             'Supersedes MAX_JOBS in .env. Default is 1 (one job after the other)')
+    parser.add_argument('--max-jobs-per-provider',
+                        type=int,
+                        help='Maximum number of translation jobs run in parallel with the same LLM provider. Supersedes '
+                             'MAX_JOBS_PER_PROVIDER in .env. Default is the same as --max-jobs')
+    parser.add_argument('--requests-per-minute',
+                        type=int,
+                        help='Maximum number of requests per minute sent to the LLM, 0 for no limit. Supersedes '
+                             'REQUESTS_PER_MINUTE in .env. Default is no limit')
+    parser.add_argument('--tokens-per-minute',
+                        type=int,
+                        help='Maximum number of tokens per minute sent to the LLM, 0 for no limit. Supersedes '
+                             'TOKENS_PER_MINUTE in .env. Default is no limit')
+    parser.add_argument('--max-retries',
+                        type=int,
+                        help='Maximum number of times a request is sent again after a transient error of the LLM '
+                             '(rate limit, overloaded, server error, timeout, connection error), 0 to disable the '
+                             'retries. Supersedes MAX_RETRIES in .env. Default depends on the error (8 for rate limits, '
+                             '5 for overloaded errors, 3 for the others)')
+    parser.add_argument('--retry-budget',
+                        type=float,
+                        help='Maximum ratio of retries to requests (plus 10 retries), so that a provider which is down '
+                             'fails the requests quickly. 0 disables the retries. Supersedes RETRY_BUDGET in .env. '
+                             'Default is 0.2')
+    parser.add_argument('--translation-memory',
+                        type=str,
+                        help='Path of a SQLite file where translations are memorized and reused across runs, files and '
+                             'languages. Supersedes TRANSLATION_MEMORY in .env. Default is no translation memory')
+    parser.add_argument('--translation-memory-size',
+                        type=int,
+                        help='Maximum number of translations kept in the translation memory, the least recently used '
+                             'are evicted. Supersedes TRANSLATION_MEMORY_SIZE in .env. Default is 100000')
+    parser.add_argument('--metrics-file',
+                        type=str,
+                        help='JSON file where the metrics of the requests sent to the LLM (tokens, latency, retries, '
+                             'errors by file and language) are saved at the end of the run. Supersedes METRICS_FILE '
+                             'in .env. Default is None (the metrics are only logged)')
+    parser.add_argument('--metrics-prometheus',
+                        type=str,
+                        help='File where the same metrics are saved in the Prometheus text format, e.g. for the node '
+                             'exporter textfile collector. Supersedes METRICS_PROMETHEUS in .env. Default is None')
+    parser.add_argument('--ollama-keep-alive',
+                        type=str,
+                        help='With the ollama_native client, how long the model stays loaded after the last request '
+                             '(e.g. 10m, 1h, a number of seconds, -1 for ever). Supersedes OLLAMA_KEEP_ALIVE in .env. '
+                             'Default is 30m')
+    parser.add_argument('--ollama-num-ctx',
+                        type=int,
+                        help='With the ollama_native client, size of the context window of the model, the same for all '
+                             'the requests so that the model is never reloaded. Supersedes OLLAMA_NUM_CTX in .env. '
+                             'Default is 8192')
+    parser.add_argument('--ollama-num-predict',
+                        type=int,
+                        help='With the ollama_native client, maximum number of tokens generated per request. Supersedes '
+                             'OLLAMA_NUM_PREDICT in .env. Default is no limit')
+    parser.add_argument('--ollama-num-parallel',
+                        type=int,
+                        help='With the ollama_native client, number of requests sent concurrently, should be the '
+                             'OLLAMA_NUM_PARALLEL setting of the Ollama server. Supersedes --workers and '
+                             'OLLAMA_NUM_PARALLEL in .env. Default is --workers')
 
     parser.add_argument('-v', '--verbose', action='store_true', help='verbose mode. Equivalent to LOG_LEVEL=INFO in .env')
     parser.add_argument('-vv', '--debug', action='store_true', help='debug mode. Equivalent to LOG_LEVEL=DEBUG in .env')
@@ -173,6 +293,14 @@ the context translation."""
 
     # ollama base url if needed
     params.ollama_base_url = environ.get('OLLAMA_BASE_URL', 'http://localhost:11434/v1')
+    # ollama_native client settings, None means use the client defaults
+    params.ollama_keep_alive = (args and args.ollama_keep_alive) or environ.get('OLLAMA_KEEP_ALIVE', None)
+    params.ollama_num_ctx = (args and args.ollama_num_ctx) or \
+      (int(environ['OLLAMA_NUM_CTX']) if environ.get('OLLAMA_NUM_CTX') else None)
+    params.ollama_num_predict = (args and args.ollama_num_predict) or \
+      (int(environ['OLLAMA_NUM_PREDICT']) if environ.get('OLLAMA_NUM_PREDICT') else None)
+    params.ollama_num_parallel = (args and args.ollama_num_parallel) or \
+      (int(environ['OLLAMA_NUM_PARALLEL']) if environ.get('OLLAMA_NUM_PARALLEL') else None)
 
     # the target languages to test for translation
     params.target_languages = [args.target_language] if args and args.target_language else \
@@ -193,12 +321,46 @@ the context translation."""
 
     params.fuzzy = (args and args.fuzzy) or environ.get('FUZZY', False)
     params.force = (args and args.force) or environ.get('FORCE', False)
+    params.track_changes = (args and args.track_changes) or environ.get('TRACK_CHANGES', False)
     params.overwrite_output = (args and args.overwrite_output) or environ.get('OVERWRITE_OUTPUT', False)
     params.compile = (args and args.compile) or environ.get('COMPILE', False)
+    params.resume = (args and args.resume) or environ.get('RESUME', False)
+    params.checkpoint_entries = args.checkpoint_entries if args and args.checkpoint_entries is not None else \
+      int(environ.get('CHECKPOINT_ENTRIES', 0))
+    params.checkpoint_seconds = args.checkpoint_seconds if args and args.checkpoint_seconds is not None else \
+      int(environ.get('CHECKPOINT_SECONDS', 0))
+    params.stream_po = (args and args.stream_po) or environ.get('STREAM_PO', False)
+    params.stream_window = (args and args.stream_window) or int(environ.get('STREAM_WINDOW', 1000))
 
     params.owner = (args and args.owner) or environ.get('OWNER', '<OWNER>')
     params.owner_mail = (args and args.owner_mail) or environ.get('OWNER_MAIL', '<OWNER EMAIL>')
 
+    params.workers = (args and args.workers) or int(environ.get('WORKERS', 1))
+    params.async_requests = (args and args.async_requests) or environ.get('ASYNC_REQUESTS', False)
+    params.batch_size = (args and args.batch_size) or int(environ.get('BATCH_SIZE', 1))
+    params.no_explanation = (args and args.no_explanation) or environ.get('NO_EXPLANATION', False)
+    params.structured_output = (args and args.structured_output) or environ.get('STRUCTURED_OUTPUT', False)
+    params.multi_language = (args and args.multi_language) or environ.get('MULTI_LANGUAGE', False)
+    params.max_jobs = (args and args.max_jobs) or int(environ.get('MAX_JOBS', 1))
+    params.max_jobs_per_provider = (args and args.max_jobs_per_provider) or \
+      (int(environ['MAX_JOBS_PER_PROVIDER']) if environ.get('MAX_JOBS_PER_PROVIDER') else None)
+    # None means use the default limits of the client
+    params.requests_per_minute = args.requests_per_minute if args and args.requests_per_minute is not None else \
+      (int(environ['REQUESTS_PER_MINUTE']) if environ.get('REQUESTS_PER_MINUTE') else None)
+    params.tokens_per_minute = args.tokens_per_minute if args and args.tokens_per_minute is not None else \
+      (int(environ['TOKENS_PER_MINUTE']) if environ.get('TOKENS_PER_MINUTE') else None)
+    # None means use the default retry rules of the client
+    params.max_retries = args.max_retries if args and args.max_retries is not None else \
+      (int(environ['MAX_RETRIES']) if environ.get('MAX_RETRIES') else None)
+    params.retry_budget = args.retry_budget if args and args.retry_budget is not None else \
+      float(environ.get('RETRY_BUDGET', 0.2))
+
+    params.translation_memory = (args and args.translation_memory) or environ.get('TRANSLATION_MEMORY', None)
+    params.translation_memory_size = (args and args.translation_memory_size) or \
+      int(environ.get('TRANSLATION_MEMORY_SIZE', 100000))
+    params.metrics_file = (args and args.metrics_file) or environ.get('METRICS_FILE', None)
+    params.metrics_prometheus = (args and args.metrics_prometheus) or environ.get('METRICS_PROMETHEUS', None)
+
     params.show_prompts = False
     # generic processing of additional arguments
     if self.additional_args:
@@ -250,9 +412,15 @@ class ClientBuilder:
       match self.params.llm_client:
         case 'ollama':
           from .clients.openai_ollama_client import OllamaClient as LLMClient
+        case 'ollama_native':
+          # native Ollama API, keeps the model loaded and its KV cache warm
+          from .clients.ollama_native_client import OllamaNativeClient as LLMClient
         case 'openai':
           # uses OpenAI GPT-4o by default
           from .clients.openai_ollama_client import OpenAIClient as LLMClient
+        case 'openai_batch':
+          # OpenAI Batch API, for offline bulk translations
+          from .clients.openai_ollama_client import OpenAIBatchClient as LLMClient
         case 'claude':
           # uses Claude Sonnet 3.5 by default
           from .clients.claude_client import ClaudeClient as LLMClient
@@ -261,28 +429,22 @@ class ClientBuilder:
           from .clients.claude_client import CachedClaudeClient as LLMClient
         case 'gemini':
           from .clients.gemini_client import GeminiClient as LLMClient
+        case 'gemini_cached':
+          # Gemini with the system prompt in a context cache
+          from .clients.gemini_client import CachedGeminiClient as LLMClient
         case 'grok':
           from .clients.grok_client import GrokClient as LLMClient
         case _:
           raise Exception(
-            f"LLM_CLIENT must be one of 'ollama', 'openai', 'claude' or 'claude_cached', not '{self.params.llm_client}'"
+            f"LLM_CLIENT must be one of 'ollama', 'ollama_native', 'openai', 'openai_batch', 'claude', 'claude_cached', "
+            f"'gemini', 'gemini_cached' or 'grok', not '{self.params.llm_client}'"
             )
       self._client = LLMClient(self.params, self.params.target_language if hasattr(self.params, 'target_language') else "")
 
     return self._client
 
 
-def get_language_code(language_name):
-    try:
-        # Search language by name
-        lang = langcodes.find(language_name)
-        # Returns ISO 639-1 code (2 characters)
-        return lang.language
-    except LookupError:
-        return None
-
-
-def get_outfile_name(llm_client):
+def get_outfile_name(llm_client, input_file=None):
 
     """
     Compute the output file name based on the input file name and the target language code
@@ -290,19 +452,20 @@ def get_outfile_name(llm_client):
     the output file will be in a directory like .../locale/<target_lang_code>/LC_MESSAGES/file.po
     Otherwise, the output file name will be the input file name with the model name and the target language code appended.
     If the output file already exists and llm_client.params.overwrite_output is False, a number will be appended to the
-    filename to make it unique.
+    filename to make it unique, except in resume mode where the existing output file is reused.
 
     Parameters
     ----------
     llm_client (LLMClient) : ClientBase
         The llm client to use
+    input_file (str) : Path of the input file. Default is the input_po param
 
     Returns
     -------
     Path
         The output file name
     """
-    p = Path(llm_client.params.input_po)
+    p = Path(input_file or llm_client.params.input_po)
     parent = p.parent
     grandparent = parent.parent
     context_lang_code = get_language_code(llm_client.params.context_language) or 'xx'
@@ -319,7 +482,9 @@ def get_outfile_name(llm_client):
       outfile = p.with_suffix(f'.{model_name}.{target_code}.po')
 
     logger.info(f"Output file: {outfile}")
-    if outfile.exists() and not llm_client.params.overwrite_output:
+    if outfile.exists() and getattr(llm_client.params, 'resume', False):
+      logger.info("Output file already exists, resuming the translation.")
+    elif outfile.exists() and not llm_client.params.overwrite_output:
       logger.info("Output file already exists, won't overwrite.")
       i = 0
       i_outfile = outfile
@@ -0,0 +1,175 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+
+import polib
+
+from .clients.client_base import TranslationStats
+from .getenv import ClientBuilder, get_outfile_name
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('done', 'failed', 'cancelled')
+
+
+class BackgroundJob:
+  """
+  The translation of the content of a po file (e.g. uploaded in the UI) in a background thread. The UI follows
+  the job by polling its progress with its id.
+  """
+  def __init__(self, params, po_data, file_name):
+    self.id = uuid.uuid4().hex
+    self.params = params
+    self.po_data = po_data
+    self.file_name = file_name
+    self.status = 'queued'
+    self.nb_entries = 0
+    self.stats = TranslationStats()
+    self.results = []
+    self.error = None
+    self.output = None
+    self.output_file_name = None
+    self.finished_at = None
+    self._cancelled = threading.Event()
+    self._lock = threading.Lock()
+
+  @property
+  def finished(self):
+    return self.status in FINISHED_STATUSES
+
+  def cancel(self):
+    """
+    Stops the job after the entries being translated (a queued job is not started)
+    """
+    self._cancelled.set()
+
+  def add_result(self, res, context_translation):
+    """
+    Records the result of an entry (see AutoPoLyglotClient.translate_entry) and the context translation it had
+    before being translated
+    """
+    with self._lock:
+      self.stats.count(res)
+      if res['status'] in ('Singular', 'Plural', 'Failed'):  # the entries sent to the LLM
+        entry = res['entry']
+        self.results.append({
+          'original': entry.msgid,
+          'context': context_translation,
+          'translation': entry.msgstr or (entry.msgstr_plural[0] if entry.msgstr_plural else ''),
+          'explanation': res['error'] if res['status'] == 'Failed' else entry.comment,
+          'status': res['status'],
+        })
+
+  def finish(self, status, error=None):
+    with self._lock:
+      self.status, self.error = status, error
+      self.finished_at = monotonic()
+
+  def progress(self, since=0):
+    """
+    Returns a snapshot of the progress of the job
+    Args:
+        since (int): the number of results already known by the caller, only the next ones are returned
+    Returns:
+        dict: the status of the job, its counters, the results of the entries (from since) and the error if any
+    """
+    with self._lock:
+      nb_done = self.stats.nb_translations + len(self.stats.failed)
+      return {
+        'id': self.id,
+        'status': self.status,
+        'nb_entries': self.nb_entries,
+        'nb_done': nb_done,
+        'nb_failed': len(self.stats.failed),
+        'percent': round(nb_done / self.nb_entries * 100, 2) if self.nb_entries else 0,
+        'results': self.results[since:],
+        'error': self.error,
+      }
+
+
+class BackgroundJobPool:
+  """
+  Runs the BackgroundJobs in a pool of max_jobs threads, shared by all the users of the UI: the jobs submitted when
+  all the threads are busy are queued. The finished jobs are forgotten job_ttl seconds after their end.
+  """
+  def __init__(self, max_jobs=1, job_ttl=3600):
+    self.max_jobs = max_jobs or 1
+    self.job_ttl = job_ttl
+    self.jobs = {}
+    self._lock = threading.Lock()
+    self._executor = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix='auto_po_lyglot_ui_job')
+
+  def submit(self, params, po_data, file_name):
+    """
+    Queues the translation of po_data, the content of the po file file_name, with the given params
+    Returns:
+        str: the id of the job
+    """
+    job = BackgroundJob(params, po_data, file_name)
+    with self._lock:
+      self._purge()
+      self.jobs[job.id] = job
+    self._executor.submit(self.run_job, job)
+    logger.info(f"Job {job.id} submitted for {file_name}")
+    return job.id
+
+  def get(self, job_id):
+    """
+    Returns:
+        BackgroundJob: the job, or None if it does not exist (anymore)
+    """
+    with self._lock:
+      return self.jobs.get(job_id)
+
+  def cancel(self, job_id):
+    job = self.get(job_id)
+    if job:
+      job.cancel()
+
+  def _purge(self):
+    now = monotonic()
+    for job_id in [job_id for job_id, job in self.jobs.items()
+                   if job.finished_at is not None and now - job.finished_at > self.job_ttl]:
+      del self.jobs[job_id]
+
+  def build_client(self, job):
+    client = ClientBuilder(job.params).get_client()
+    client.target_language = job.params.target_language
+    return client
+
+  def run_job(self, job):
+    if job._cancelled.is_set():
+      job.finish('cancelled')
+      return
+    job.status = 'running'
+    try:
+      client = self.build_client(job)
+      po = polib.pofile(job.po_data)
+      job.nb_entries = len(po)
+      # the entries are translated in-place: their context translations are kept for the progress
+      contexts = {id(entry): entry.msgstr or entry.msgid for entry in po}
+      # fails before the first entry when the prompts can't be built, instead of failing every entry
+      client.get_system_prompt()
+      results = client.translate_entries(po)
+      try:
+        for res in results:
+          job.add_result(res, contexts[id(res['entry'])])
+          if job._cancelled.is_set():
+            break
+      finally:
+        results.close()  # the pending entries are not started
+      job.output = po.__unicode__()
+      job.output_file_name = get_outfile_name(client, job.file_name).name
+    except Exception as e:
+      logger.error(f"Error in job {job.id}: {e}")
+      job.finish('failed', str(e))
+      return
+    job.finish('cancelled' if job._cancelled.is_set() else 'done')
+    logger.info(f"Job {job.id} {job.status}")
+
+  def shutdown(self):
+    for job in list(self.jobs.values()):
+      job.cancel()
+    self._executor.shutdown(wait=True)
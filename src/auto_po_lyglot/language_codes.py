@@ -0,0 +1,172 @@
+from functools import lru_cache
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Codes of the most common languages and regional variants, by lower case name, so that they are resolved without
+# loading the langcodes name database. The codes use the format of the gettext and Django locale directories:
+# ISO 639 language code, optionally followed by _<territory> or _<script>.
+LANGUAGE_CODES = {
+  'afrikaans': 'af',
+  'arabic': 'ar',
+  'basque': 'eu',
+  'belarusian': 'be',
+  'bengali': 'bn',
+  'bosnian': 'bs',
+  'bulgarian': 'bg',
+  'catalan': 'ca',
+  'chinese': 'zh',
+  'croatian': 'hr',
+  'czech': 'cs',
+  'danish': 'da',
+  'dutch': 'nl',
+  'english': 'en',
+  'esperanto': 'eo',
+  'estonian': 'et',
+  'finnish': 'fi',
+  'french': 'fr',
+  'galician': 'gl',
+  'georgian': 'ka',
+  'german': 'de',
+  'greek': 'el',
+  'hebrew': 'he',
+  'hindi': 'hi',
+  'hungarian': 'hu',
+  'icelandic': 'is',
+  'indonesian': 'id',
+  'irish': 'ga',
+  'italian': 'it',
+  'japanese': 'ja',
+  'kazakh': 'kk',
+  'korean': 'ko',
+  'latvian': 'lv',
+  'lithuanian': 'lt',
+  'macedonian': 'mk',
+  'malay': 'ms',
+  'norwegian': 'no',
+  'norwegian bokmål': 'nb',
+  'norwegian nynorsk': 'nn',
+  'persian': 'fa',
+  'polish': 'pl',
+  'portuguese': 'pt',
+  'romanian': 'ro',
+  'russian': 'ru',
+  'serbian': 'sr',
+  'slovak': 'sk',
+  'slovenian': 'sl',
+  'spanish': 'es',
+  'swahili': 'sw',
+  'swedish': 'sv',
+  'tamil': 'ta',
+  'thai': 'th',
+  'turkish': 'tr',
+  'ukrainian': 'uk',
+  'urdu': 'ur',
+  'vietnamese': 'vi',
+  'welsh': 'cy',
+  # regional variants
+  'american english': 'en_US',
+  'british english': 'en_GB',
+  'english (united kingdom)': 'en_GB',
+  'english (united states)': 'en_US',
+  'brazilian portuguese': 'pt_BR',
+  'portuguese (brazil)': 'pt_BR',
+  'european portuguese': 'pt_PT',
+  'portuguese (portugal)': 'pt_PT',
+  'canadian french': 'fr_CA',
+  'french (canada)': 'fr_CA',
+  'mexican spanish': 'es_MX',
+  'spanish (mexico)': 'es_MX',
+  'latin american spanish': 'es_419',
+  'spanish (latin america)': 'es_419',
+  'simplified chinese': 'zh_Hans',
+  'chinese (simplified)': 'zh_Hans',
+  'traditional chinese': 'zh_Hant',
+  'chinese (traditional)': 'zh_Hant',
+  'serbian (latin)': 'sr_Latn',
+}
+KNOWN_CODES = frozenset(LANGUAGE_CODES.values())
+# a language given by its code, e.g. fr, pt_BR, pt-br, zh-Hant or es-419
+LANGUAGE_CODE_RE = re.compile(r'^([a-z]{2,3})(?:[-_]([a-z]{4}|[a-z]{2}|[0-9]{3}))?$', re.IGNORECASE)
+
+
+def format_language_code(language, script=None, territory=None):
+  """
+  Returns a language code in the format of the gettext and Django locale directories, e.g. pt_BR or zh_Hant
+  """
+  if script:
+    return f"{language.lower()}_{script.capitalize()}"
+  if territory:
+    return f"{language.lower()}_{territory.upper()}"
+  return language.lower()
+
+
+def parse_language_code(code):
+  """
+  Returns a language code given in any case and with - or _ as separator in the locale directory format, or None
+  if it is not a language code
+  """
+  match = LANGUAGE_CODE_RE.match(code)
+  if not match:
+    return None
+  language, subtag = match.group(1), match.group(2)
+  if subtag and len(subtag) == 4:
+    return format_language_code(language, script=subtag)
+  return format_language_code(language, territory=subtag)
+
+
+def standardize_language_code(code):
+  """
+  Returns a language code in the locale directory format (see parse_language_code) in its standard form if langcodes
+  recognizes it (e.g. the ISO 639-2 code "ewe" -> "ee"), or None if it is not a valid language code
+  """
+  import langcodes
+  tag = code.replace('_', '-')
+  if not langcodes.tag_is_valid(tag):
+    return None
+  language = langcodes.Language.get(tag)
+  if language.language in (None, 'und'):
+    return None
+  return format_language_code(language.language, language.script, language.territory)
+
+
+@lru_cache(maxsize=None)
+def get_language_code(language_name):
+  """
+  Returns the code of a language given by its English name (e.g. "French" -> "fr", "Brazilian Portuguese" -> "pt_BR",
+  "Traditional Chinese" -> "zh_Hant") or by its code (e.g. "pt-br" -> "pt_BR"), in the format of the gettext and
+  Django locale directories. Common languages are resolved with a precomputed table, the other ones with langcodes.
+  The results are memoized.
+  Returns None if the language is unknown.
+  """
+  if not language_name:
+    return None
+  name = language_name.strip()
+  code = LANGUAGE_CODES.get(name.lower())
+  if code:
+    return code
+  # lower case codes only, to not take 2 or 3 letter language names like "Ewe" for codes
+  if name[:2].islower() or '_' in name or '-' in name:
+    code = parse_language_code(name)
+    if code in KNOWN_CODES:
+      return code
+    if code:
+      code = standardize_language_code(code)
+      if code:
+        return code
+  import langcodes  # imported only when needed as it is slow to import and to search
+  try:
+    language = langcodes.find(name)
+  except LookupError:
+    logger.warning(f"Unknown language: {language_name}")
+    return None
+  return format_language_code(language.language, language.script, language.territory)
+
+
+def get_base_language_code(language_name):
+  """
+  Returns the code of a language without its territory or script (e.g. "Brazilian Portuguese" -> "pt")
+  """
+  code = get_language_code(language_name)
+  return code.split('_')[0] if code else None
@@ -0,0 +1,56 @@
+import re
+
+from auto_po_lyglot.language_codes import get_base_language_code, get_language_code
+
+# gettext Plural-Forms of the languages which don't use the default 'one' and 'other' forms
+DEFAULT_PLURAL_FORMS = 'nplurals=2; plural=(n != 1);'
+SLAVIC_PLURAL_FORMS = 'nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);'
+NO_PLURAL_FORMS = 'nplurals=1; plural=0;'
+PLURAL_FORMS = {
+  'ar': 'nplurals=6; plural=(n==0 ? 0 : n==1 ? 1 : n==2 ? 2 : n%100>=3 && n%100<=10 ? 3 : n%100>=11 ? 4 : 5);',
+  'be': SLAVIC_PLURAL_FORMS,
+  'bs': SLAVIC_PLURAL_FORMS,
+  'cs': 'nplurals=3; plural=(n==1 ? 0 : n>=2 && n<=4 ? 1 : 2);',
+  'cy': 'nplurals=4; plural=(n==1 ? 0 : n==2 ? 1 : n!=8 && n!=11 ? 2 : 3);',
+  'fr': 'nplurals=2; plural=(n > 1);',
+  'ga': 'nplurals=5; plural=(n==1 ? 0 : n==2 ? 1 : n<7 ? 2 : n<11 ? 3 : 4);',
+  'hr': SLAVIC_PLURAL_FORMS,
+  'id': NO_PLURAL_FORMS,
+  'ja': NO_PLURAL_FORMS,
+  'ko': NO_PLURAL_FORMS,
+  'lt': 'nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 : n%10>=2 && (n%100<10 || n%100>=20) ? 1 : 2);',
+  'lv': 'nplurals=3; plural=(n%10==1 && n%100!=11 ? 0 : n != 0 ? 1 : 2);',
+  'ms': NO_PLURAL_FORMS,
+  'pl': 'nplurals=3; plural=(n==1 ? 0 : n%10>=2 && n%10<=4 && (n%100<10 || n%100>=20) ? 1 : 2);',
+  'pt_BR': 'nplurals=2; plural=(n > 1);',
+  'ro': 'nplurals=3; plural=(n==1 ? 0 : (n==0 || (n%100 > 0 && n%100 < 20)) ? 1 : 2);',
+  'ru': SLAVIC_PLURAL_FORMS,
+  'sk': 'nplurals=3; plural=(n==1 ? 0 : n>=2 && n<=4 ? 1 : 2);',
+  'sl': 'nplurals=4; plural=(n%100==1 ? 0 : n%100==2 ? 1 : n%100==3 || n%100==4 ? 2 : 3);',
+  'sr': SLAVIC_PLURAL_FORMS,
+  'th': NO_PLURAL_FORMS,
+  'tr': 'nplurals=2; plural=(n > 1);',
+  'uk': SLAVIC_PLURAL_FORMS,
+  'vi': NO_PLURAL_FORMS,
+  'zh': NO_PLURAL_FORMS,
+}
+NPLURALS_RE = re.compile(r'nplurals\s*=\s*(\d+)')
+PLURAL_RE = re.compile(r'plural\s*=\s*(.*?);?\s*$')
+
+
+def get_plural_forms(language):
+  """
+  Returns the gettext Plural-Forms header value of the given language (by name)
+  """
+  # regional variants (e.g. pt_BR) have their own plural forms only when they differ from the language ones
+  plural_forms = PLURAL_FORMS.get(get_language_code(language))
+  return plural_forms or PLURAL_FORMS.get(get_base_language_code(language), DEFAULT_PLURAL_FORMS)
+
+
+def parse_plural_forms(plural_forms):
+  """
+  Returns the number of plural forms and the plural rule of a Plural-Forms header value
+  """
+  nplurals = NPLURALS_RE.search(plural_forms)
+  plural = PLURAL_RE.search(plural_forms.split(';', 1)[1]) if ';' in plural_forms else None
+  return int(nplurals.group(1)) if nplurals else 2, plural.group(1).strip() if plural else '(n != 1)'
@@ -2,9 +2,15 @@
 
 # pyright: reportAttributeAccessIssue=false
 
+import json
 import logging
+from pathlib import Path
 
-from . import ClientBuilder, ParamsLoader, system_prompt, user_prompt, locate_django_translation_files
+from . import ParamsLoader, system_prompt, user_prompt, locate_django_translation_files
+from .clients.metrics import export_metrics
+from .dedup import SharedTranslations, DeduplicationJob, collect_duplicates
+from .django_plan import DEFAULT_SCAN_CACHE, ScanCache, plan_django_jobs
+from .scheduler import JobScheduler
 
 logger = logging.getLogger(__name__)
 
@@ -31,22 +37,61 @@ def main():
        'help': 'Path to the Django project directory. Default is the current directory',
        'env': 'PATH',
        'default': '.'},
+      {'arg': '--no-dedup',
+       'action': 'store_true',
+       'help': 'Translates each po file independently instead of translating only once the entries which appear in '
+               'several po files (same msgid, msgctxt, context translation and target language). Default is False',
+       'env': 'NO_DEDUP',
+       'default': False},
+      {'arg': '--scan-cache',
+       'type': str,
+       'help': f'File where the scan of the project and the state of the translated files are cached, so that the next '
+               f'runs don\'t scan the project again if it has not changed and skip the translated files whose input '
+               f'has not changed. Default is {DEFAULT_SCAN_CACHE} in the Django project directory',
+       'env': 'SCAN_CACHE'},
+      {'arg': '--no-scan-cache',
+       'action': 'store_true',
+       'help': 'Scans the whole project and translates all the files at each run. Default is False',
+       'env': 'NO_SCAN_CACHE',
+       'default': False},
+      {'arg': '--plan',
+       'action': 'store_true',
+       'help': 'Prints the work plan (the files to translate and the unchanged ones) as JSON and exits',
+       'env': 'PLAN_ONLY',
+       'default': False},
     ]).load()
 
     if params.show_prompts:
         print(f">>>>>>>>>>System prompt:\n{system_prompt}\n\n>>>>>>>>>>>>User prompt:\n{user_prompt}")
         exit(0)
 
-    client = ClientBuilder(params).get_client()
-
-    logger.info(f"Using model {client.params.model} to translate Django project located at {params.path} "
+    logger.info(f"Using {params.model or 'the default'} model to translate Django project located at {params.path} "
                 f"from {params.original_language} -> {params.context_language} -> {params.target_languages} "
                 f"with an {params.llm_client} client")
-    po_list = locate_django_translation_files(params.path, params.context_language, params.target_languages)
-    for input_file, output_files in po_list.items():
-      for tlg_output_file in output_files:
-        client.target_language, output_file = list(tlg_output_file.items())[0]
-        client.translate_pofile(input_file, output_file)
+    scan_cache = None if params.no_scan_cache else \
+      ScanCache(params.scan_cache or Path(params.path or '.') / DEFAULT_SCAN_CACHE)
+    po_list = locate_django_translation_files(params.path, params.context_language, params.target_languages, scan_cache)
+    plan = plan_django_jobs(params, po_list, scan_cache)
+    if params.plan:
+      print(json.dumps(plan.describe(), indent=2))
+      if scan_cache:
+        scan_cache.save()
+      exit(0)
+    shared_translations = None
+    if not params.no_dedup:
+      # pre-pass translating only once the entries repeated in several po files
+      duplicates, _ = collect_duplicates(params, plan.po_list())
+      shared_translations = SharedTranslations()
+      JobScheduler(params).run([DeduplicationJob(po, target_language, shared_translations)
+                                for target_language, po in duplicates.items()])
+    JobScheduler(params, shared_translations=shared_translations).run(plan.jobs)
+    if scan_cache:
+      plan.record_results(scan_cache, params.fuzzy)
+      scan_cache.save()
+    if shared_translations:
+      logger.info(f"Deduplication: {shared_translations.hits} entries copied from a shared translation, "
+                  f"{shared_translations.saved_requests} requests saved")
+    export_metrics(params)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,30 @@
+def entry_key(entry):
+  """
+  Returns the key identifying a po entry in a catalog: (msgctxt, msgid, msgid_plural)
+  """
+  return (entry.msgctxt, entry.msgid, entry.msgid_plural)
+
+
+class POIndex:
+  """
+  Index of the entries of a po file by (msgctxt, msgid, msgid_plural).
+  Unlike polib's POFile.find which scans the whole file, lookups are done in constant time and entries
+  that only differ by their context (msgctxt) are distinguished.
+  Obsolete entries are not indexed.
+  """
+  def __init__(self, po):
+    self.entries = {}
+    for entry in po:
+      if entry.obsolete:
+        continue
+      # like polib's find, keep the first matching entry
+      self.entries.setdefault(entry_key(entry), entry)
+
+  def find(self, entry):
+    """
+    Returns the indexed entry with the same msgctxt, msgid and msgid_plural as the given entry, or None
+    """
+    return self.entries.get(entry_key(entry))
+
+  def __len__(self):
+    return len(self.entries)
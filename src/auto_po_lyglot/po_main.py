@@ -4,7 +4,9 @@
 import logging
 from pathlib import Path
 
-from . import ClientBuilder, ParamsLoader, get_outfile_name, system_prompt, user_prompt
+from . import ParamsLoader, system_prompt, user_prompt
+from .clients.metrics import export_metrics
+from .scheduler import JobScheduler, TranslationJob, MultiLanguageTranslationJob
 
 logger = logging.getLogger(__name__)
 
@@ -31,17 +33,23 @@ def main():
         print(f">>>>>>>>>>System prompt:\n{system_prompt}\n\n>>>>>>>>>>>>User prompt:\n{user_prompt}")
         exit(0)
 
-    client = ClientBuilder(params).get_client()
-
-    logger.info(f"Using model {client.params.model} to translate {params.input_po} from {params.original_language} -> "
-                f"{params.context_language} -> {params.target_languages} with an {params.llm_client} client")
-    for target_language in params.target_languages:
-      client.target_language = target_language
-      output_file = params.output_po or get_outfile_name(client)
-      # Load input .po file
-      assert params.input_po, "Input .po file not provided"
-      assert Path(params.input_po).exists(), f"Input .po file {params.input_po} does not exist"
-      client.translate_pofile(params.input_po, output_file)
+    # Check input .po file
+    assert params.input_po, "Input .po file not provided"
+    assert Path(params.input_po).exists(), f"Input .po file {params.input_po} does not exist"
+
+    logger.info(f"Using {params.model or 'the default'} model to translate {params.input_po} from "
+                f"{params.original_language} -> {params.context_language} -> {params.target_languages} "
+                f"with an {params.llm_client} client")
+    if params.multi_language and len(params.target_languages) > 1:
+      # a single job translating into all the target languages at once
+      jobs = [MultiLanguageTranslationJob(params.input_po, {target_language: params.output_po
+                                                            for target_language in params.target_languages})]
+    else:
+      # one job per target language, each with its own client
+      jobs = [TranslationJob(params.input_po, target_language, params.output_po)
+              for target_language in params.target_languages]
+    JobScheduler(params).run(jobs)
+    export_metrics(params)
 
     logger.info("Done!")
 
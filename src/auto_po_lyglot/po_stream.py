@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+from pathlib import Path
+import pickle
+import sqlite3
+import threading
+
+import polib
+
+from .po_index import entry_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SIZE = 1000
+# polib takes the first entry of a file with an empty msgid as its metadata: each chunk is parsed after this one
+METADATA_STUB = 'msgid ""\nmsgstr ""\n\n'
+
+
+def partial_file_name(output_file):
+  """
+  Returns the name of the file written while streaming to output_file. It is renamed to output_file at the end of
+  the translation and left in place if the process is killed, so that the next run can resume from it.
+  """
+  output_path = Path(output_file)
+  return output_path.with_name(f'.{output_path.name}.partial')
+
+
+def iter_po_blocks(po_file, encoding):
+  """
+  Yields the text of each entry of a po file (the entries are separated by blank lines), one after the other
+  """
+  with open(po_file, encoding=encoding) as f:
+    block = []
+    for line in f:
+      if line.strip():
+        block.append(line)
+      elif block:
+        yield ''.join(block)
+        block = []
+    if block:
+      yield ''.join(block)
+
+
+def is_comment_block(block):
+  """
+  Returns True if a block of a po file only contains comments, e.g. the beginning of the header of a file separated
+  from its metadata by a blank line (the comments of obsolete entries, #~, are entries)
+  """
+  return all(line.startswith('#') and not line.startswith('#~') for line in block.splitlines())
+
+
+def is_metadata_entry(entry):
+  return entry.msgid == '' and not entry.msgctxt
+
+
+def parse_po_blocks(blocks, encoding):
+  """
+  Returns the list of the entries parsed from the given entry texts. The metadata entries (empty msgid) found after
+  the header of the file are dropped, polib would take them for ordinary entries.
+  """
+  return [entry for entry in polib.pofile(METADATA_STUB + '\n'.join(blocks), encoding=encoding)
+          if not is_metadata_entry(entry)]
+
+
+class POStreamReader:
+  """
+  Reads a po file incrementally. The header attribute is a POFile with the header and metadata of the file but without
+  entries, and windows() yields the entries by lists of at most window_size entries, so that only one window of
+  entries is in memory at a time.
+  """
+  def __init__(self, po_file, window_size=DEFAULT_WINDOW_SIZE):
+    self.po_file = po_file
+    self.window_size = window_size or DEFAULT_WINDOW_SIZE
+    self.encoding = polib.detect_encoding(str(po_file))
+    self._blocks = iter_po_blocks(po_file, self.encoding)
+    # the header is made of the comment blocks at the beginning of the file and of the metadata entry
+    comment_blocks = []
+    self._first_block = next(self._blocks, None)
+    while self._first_block is not None and is_comment_block(self._first_block):
+      comment_blocks.append(self._first_block)
+      self._first_block = next(self._blocks, None)
+    header_blocks = comment_blocks + ([self._first_block] if self._first_block else [])
+    self.header = polib.pofile('\n'.join(header_blocks) or METADATA_STUB, encoding=self.encoding)
+    if len(self.header):  # no metadata in this file, the first block is an entry
+      self.header = polib.pofile('\n'.join(comment_blocks) or METADATA_STUB, encoding=self.encoding)
+    else:
+      self._first_block = None
+
+  def windows(self):
+    blocks = [self._first_block] if self._first_block else []
+    for block in self._blocks:
+      blocks.append(block)
+      if len(blocks) >= self.window_size:
+        yield parse_po_blocks(blocks, self.encoding)
+        blocks = []
+    if blocks:
+      yield parse_po_blocks(blocks, self.encoding)
+
+  def close(self):
+    self._blocks.close()
+
+
+class POStreamWriter:
+  """
+  Writes a po file entry by entry. The entries are appended to the partial file of output_file (see
+  partial_file_name) which is renamed to output_file by commit(), so that output_file is never left half written.
+  """
+  def __init__(self, output_file, header):
+    self.output_file = output_file
+    self.partial_file = partial_file_name(output_file)
+    self.wrapwidth = header.wrapwidth
+    self.nb_entries = 0
+    self.file = open(self.partial_file, 'w', encoding=header.encoding)
+    self.file.write(header.__unicode__())
+
+  def write(self, entries):
+    for entry in entries:
+      self.file.write('\n' + entry.__unicode__(self.wrapwidth))
+      self.nb_entries += 1
+    # the partial file contains all the entries written so far if the process is killed
+    self.file.flush()
+
+  def commit(self):
+    self.file.close()
+    os.replace(self.partial_file, self.output_file)
+
+
+class StreamedPOIndex:
+  """
+  Index of the entries of po files like POIndex, but built by reading the files incrementally and stored in a
+  temporary SQLite database instead of memory. When several files are given, the entries of the first files take
+  precedence. The entries are stored pickled, which is much faster to load than parsing them again.
+  The object can be shared by several threads.
+  """
+  def __init__(self, *po_files, window_size=DEFAULT_WINDOW_SIZE):
+    self.lock = threading.Lock()
+    # an empty name creates a temporary database, deleted when closed
+    self.connection = sqlite3.connect('', check_same_thread=False)
+    with self.connection:
+      self.connection.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, entry BLOB NOT NULL)")
+      for po_file in po_files:
+        self._index(po_file, window_size)
+    self.size = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    logger.debug(f"Indexed {self.size} entries of {', '.join(str(po_file) for po_file in po_files)}")
+
+  def _index(self, po_file, window_size):
+    for window in POStreamReader(po_file, window_size).windows():
+      # like polib's find, keep the first matching entry
+      self.connection.executemany("INSERT OR IGNORE INTO entries (key, entry) VALUES (?, ?)",
+                                  ((json.dumps(entry_key(entry)), pickle.dumps(entry))
+                                   for entry in window if not entry.obsolete))
+
+  def find(self, entry):
+    """
+    Returns the indexed entry with the same msgctxt, msgid and msgid_plural as the given entry, or None
+    """
+    with self.lock:
+      row = self.connection.execute("SELECT entry FROM entries WHERE key = ?", (json.dumps(entry_key(entry)),)).fetchone()
+    return pickle.loads(row[0]) if row else None
+
+  def __len__(self):
+    return self.size
+
+  def close(self):
+    with self.lock:
+      self.connection.close()
@@ -2,23 +2,24 @@
 from io import StringIO
 import logging
 import os
-from time import sleep
-import polib
 import streamlit as st
-from auto_po_lyglot import ClientBuilder, ParamsLoader, system_prompt, user_prompt, get_outfile_name
+from auto_po_lyglot import ParamsLoader, system_prompt, user_prompt
+from auto_po_lyglot.job_pool import BackgroundJobPool
 
 logger = logging.getLogger(__name__)
 
-supported_llms = ["openai", "ollama", "claude", "claude_cached", "gemini", "grok"]
-MODELS_PER_LLM = """ollama|llama3.1:8b,phi3,gemma2:2b;
+supported_llms = ["openai", "ollama", "ollama_native", "claude", "claude_cached", "gemini", "gemini_cached", "grok"]
+MODELS_PER_LLM = """ollama|ollama_native|llama3.1:8b,phi3,gemma2:2b;
   openai|gpt-4o-mini,chatgpt-4o-latest,gpt-4o,gpt-4-turbo,gpt-4-turbo-preview,gpt-4,gpt-3.5-turbo;
   claude|claude_cached|claude-3-5-sonnet-20240620,claude-3-opus-20240229,claude-3-sonnet-20240229,claude-3-haiku-20240307;
-  gemini|gemini-1b,gemini-1.5b,gemini-2b,gemini-6b,gemini-12b;
+  gemini|gemini_cached|gemini-1b,gemini-1.5b,gemini-2b,gemini-6b,gemini-12b;
   grok|grok-1b,grok-1.5b,grok-2b,grok-6b,grok-12b"""
 
 # The right order is important. The first one is the original language, the second one is the context
 # language supported in examples
 supported_languages = ["English", "French", "Spanish", "Italian", "Portuguese", "German"]
+# seconds between two refreshes of the progress of a translation job
+POLL_INTERVAL = 1.0
 
 
 class StParams:
@@ -154,6 +155,12 @@ def build_ui(params):
   return st_params
 
 
+@st.cache_resource
+def get_job_pool(max_jobs):
+  """The pool running the translation jobs of all the users, MAX_JOBS at a time"""
+  return BackgroundJobPool(max_jobs)
+
+
 def streamlit_main():
     params = get_params()
 
@@ -161,57 +168,77 @@ def streamlit_main():
 
     # build ui form to allow changing or filling in missing params
     st_params = build_ui(params)
+    pool = get_job_pool(params.max_jobs)
 
     if st_params.submitted:
       if not st_params.input_po:
         st.error("No .po file provided!", icon="🔥")
       else:
-        client, data = run_llm(st_params)
-        output_file = get_outfile_name(client)
-        st.download_button(label="Download translated .po", data=data, file_name=output_file.name, mime="text/plain")
-
-
-def run_llm(st_params):
-    client = ClientBuilder(st_params).get_client()
-    st.info(f"> Using model `{st_params.model}` to translate `{st_params.input_po.name}` "
+        submit_job(pool, st_params)
+
+    # the job id is kept in the URL so that the job can be followed again after a page reload
+    job_id = st.query_params.get('job')
+    if job_id:
+      show_job(pool, job_id)
+
+
+def submit_job(pool, st_params):
+    """
+    Queues the translation of the uploaded file in the job pool. The translation runs in the background so it is
+    not interrupted by the next reruns of the script.
+    """
+    po_data = StringIO(st_params.input_po.getvalue().decode("utf-8")).read()
+    file_name = st_params.input_po.name
+    st_params.input_po = file_name  # the job must not keep the uploaded file, which is tied to this script run
+    st.query_params['job'] = pool.submit(st_params, po_data, file_name)
+    st.info(f"> Using model `{st_params.model}` to translate `{file_name}` "
             f"from `{st_params.original_language}` -> `{st_params.context_language}` -> "
             f"`{st_params.target_language}` with an `{st_params.llm_client}` client...")
-    percent_translated = 0
-    with st.status("# Start of translation...") as status:
-      # read and decode .po file content
-      po_data = StringIO(st_params.input_po.getvalue().decode("utf-8")).read()
-      # create a POfile instance
-      po = polib.pofile(po_data)
-      nb_translations = 0
-      try:
-        for entry in po:
-          if entry.msgid and not entry.fuzzy:
-            context_translation = entry.msgstr if entry.msgstr else entry.msgid
-            original_phrase = entry.msgid
-            status.update(label=f"{percent_translated}%: translating '{original_phrase}' ...")
-            translation, explanation = client.translate(original_phrase, context_translation)
-            # Add explanation to comment
-            if explanation:
-              entry.comment = explanation
-            # Update translation
-            entry.msgstr = translation
-            st.divider()
-            st.write(f'{st_params.original_language}: `{original_phrase}`')
-            st.write(f'{st_params.context_language}: `{context_translation}`')
-            st.write(f'{st_params.target_language}: `{translation}`')
-            if explanation:
-              st.write(f'{explanation}')  # some llms generate explanation in MD so no backquotes
-
-            sleep(1.0)  # Sleep for 1 second to avoid rate limiting
-            nb_translations += 1
-            percent_translated = round(nb_translations / len(po) * 100, 2)
-      except Exception as e:
-        st.error(f"> Error: {e}", icon="🚨")
-
-      status.update(label=f"Translated `{nb_translations}` entries out "
-                          f"of `{len(po)}` entries (`{percent_translated}%`)")
-
-    return client, po.__unicode__()
+
+
+def show_job(pool, job_id):
+    job = pool.get(job_id)
+    if job is None:
+      st.warning(f"Translation job `{job_id}` not found, it may have expired.")
+    elif job.finished:
+      render_job(job)
+    else:
+      poll_job(pool, job_id)
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def poll_job(pool, job_id):
+    """
+    Renders the progress of a running job. Only this fragment is rerun at each poll, not the whole script.
+    """
+    job = pool.get(job_id)
+    if job is None or job.finished:
+      st.rerun()  # renders the final state once, without polling
+    render_job(job)
+    if st.button("Cancel", key=f"cancel_{job_id}"):
+      pool.cancel(job_id)
+
+
+def render_job(job):
+    progress = job.progress()
+    if progress['status'] == 'queued':
+      st.progress(0, text="Waiting for a free translation worker...")
+    else:
+      st.progress(progress['percent'] / 100,
+                  text=f"{progress['status'].capitalize()}: translated `{progress['nb_done']}` entries out of "
+                       f"`{progress['nb_entries']}` entries (`{progress['percent']}%`)")
+    if progress['results']:
+      # a single table updated in one go instead of several elements per entry
+      st.dataframe(progress['results'], hide_index=True,
+                   column_config={'original': job.params.original_language, 'context': job.params.context_language,
+                                  'translation': job.params.target_language})
+    if progress['nb_failed']:
+      st.warning(f"{progress['nb_failed']} entries could not be translated and were left untranslated", icon="⚠️")
+    if progress['error']:
+      st.error(f"> Error: {progress['error']}", icon="🚨")
+    if job.output is not None:
+      st.download_button(label="Download translated .po", data=job.output, file_name=job.output_file_name,
+                         mime="text/plain")
 
 
 if __name__ == "__main__":
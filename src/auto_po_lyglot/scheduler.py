@@ -0,0 +1,144 @@
+from collections import deque
+import copy
+import logging
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .getenv import ClientBuilder, get_outfile_name
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationJob:
+  """
+  A po file to be translated into a target language.
+  If output_file is not given, it is computed with get_outfile_name. If llm_client is not given, the llm_client
+  param is used.
+  """
+  def __init__(self, input_file, target_language, output_file=None, llm_client=None):
+    self.input_file = input_file
+    self.target_language = target_language
+    self.output_file = output_file
+    self.llm_client = llm_client
+
+  def __repr__(self):
+    return f"TranslationJob({self.input_file} -> {self.target_language})"
+
+  def run(self, client):
+    output_file = self.output_file or get_outfile_name(client, self.input_file)
+    return client.translate_pofile(self.input_file, output_file)
+
+
+class MultiLanguageTranslationJob(TranslationJob):
+  """
+  A po file to be translated into several target languages at once, each request to the LLM returning the
+  translations in all the target languages. output_files gives the output file by target language, None values
+  are computed with get_outfile_name.
+  """
+  def __init__(self, input_file, output_files, llm_client=None):
+    super().__init__(input_file, None, None, llm_client)
+    self.output_files = output_files
+
+  def __repr__(self):
+    return f"MultiLanguageTranslationJob({self.input_file} -> {', '.join(self.output_files)})"
+
+  def run(self, client):
+    output_files = {language: output_file or get_outfile_name(client.for_language(language), self.input_file)
+                    for language, output_file in self.output_files.items()}
+    return client.translate_pofile_multi(self.input_file, output_files)
+
+
+class JobScheduler:
+  """
+  Runs translation jobs in a pool of threads. A single client is built for each LLM provider, and each job gets a
+  copy of it for its target language (see AutoPoLyglotClient.for_language): the target language is never shared
+  between jobs, while the rate limiter, retry budget, translation memory and prompt caches of the provider are.
+  The number of jobs running at the same time is limited globally by max_jobs and for each LLM provider by
+  max_jobs_per_provider: the jobs wait in a queue per provider and are only given to the pool when their provider
+  has a free slot, so that a job waiting for a busy provider never holds a thread of the pool needed by the jobs of
+  another provider. If given, shared_translations (see dedup.py) are used by all the clients.
+  """
+  def __init__(self, params, max_jobs=None, max_jobs_per_provider=None, shared_translations=None):
+    self.params = params
+    self.shared_translations = shared_translations
+    self.max_jobs = max_jobs or getattr(params, 'max_jobs', 1) or 1
+    self.max_jobs_per_provider = max_jobs_per_provider or getattr(params, 'max_jobs_per_provider', None)
+    self._clients = {}
+    self._lock = threading.Lock()
+
+  def new_client(self, params):
+    return ClientBuilder(params).get_client()
+
+  def get_provider_client(self, llm_client):
+    """
+    Returns the client of an LLM provider, built on first use
+    """
+    with self._lock:
+      if llm_client not in self._clients:
+        params = self.params
+        if llm_client != params.llm_client:
+          params = copy.copy(params)
+          params.llm_client = llm_client
+        client = self.new_client(params)
+        client.shared_translations = self.shared_translations
+        self._clients[llm_client] = client
+      return self._clients[llm_client]
+
+  def get_provider(self, job):
+    return job.llm_client or self.params.llm_client
+
+  def build_client(self, job):
+    return self.get_provider_client(self.get_provider(job)).for_language(job.target_language)
+
+  def run_job(self, job):
+    """
+    Runs a single job and returns the result of translate_pofile (or translate_pofile_multi)
+    """
+    return job.run(self.build_client(job))
+
+  def _run_job_safely(self, job):
+    try:
+      return self.run_job(job)
+    except Exception as e:
+      # a failing job must not stop the other ones
+      logger.error(f"Error in {job}: {e}")
+      return None
+
+  def run(self, jobs):
+    """
+    Runs all the jobs
+    Returns:
+        list: the result of each job, in the jobs order (None for failed jobs)
+    """
+    jobs = list(jobs)
+    if self.max_jobs <= 1 or len(jobs) <= 1:
+      return [self._run_job_safely(job) for job in jobs]
+    logger.info(f"Running {len(jobs)} translation jobs, {self.max_jobs} at a time")
+    max_jobs_per_provider = self.max_jobs_per_provider or self.max_jobs
+    queues = {}  # the indexes of the jobs waiting, by provider
+    for i, job in enumerate(jobs):
+      queues.setdefault(self.get_provider(job), deque()).append(i)
+    running = {provider: 0 for provider in queues}
+    results, pending = [None] * len(jobs), {}
+    with ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix='auto_po_lyglot_job') as executor:
+      while queues or pending:
+        # one job per provider with a free slot at a time, so that the providers share the pool
+        admitted = True
+        while admitted and len(pending) < self.max_jobs:
+          admitted = False
+          for provider, queue in list(queues.items()):
+            if len(pending) >= self.max_jobs:
+              break
+            if running[provider] < max_jobs_per_provider:
+              i = queue.popleft()
+              if not queue:
+                del queues[provider]
+              pending[executor.submit(self._run_job_safely, jobs[i])] = (i, provider)
+              running[provider] += 1
+              admitted = True
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+          i, provider = pending.pop(future)
+          running[provider] -= 1
+          results[i] = future.result()
+    return results
@@ -0,0 +1,94 @@
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+import threading
+from time import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 100000
+
+
+def hash_text(*texts):
+  """Returns a sha256 hex digest of the given texts"""
+  sha = hashlib.sha256()
+  for text in texts:
+    sha.update((text or '').encode('utf-8'))
+    sha.update(b'\0')
+  return sha.hexdigest()
+
+
+class TranslationMemory:
+  """
+  On-disk translation memory stored in a SQLite database, shared across runs, files and languages.
+  Translations are stored by a key built from the model, the languages, the phrase, its context translation, the
+  hash of the prompts and whether the explanations are wanted. When the memory contains more than max_entries
+  translations, the least recently used ones are evicted. The object can be shared by several threads.
+  """
+  def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+    self.path = str(Path(path).expanduser())
+    self.max_entries = max_entries or DEFAULT_MAX_ENTRIES
+    self.hits = 0
+    self.misses = 0
+    self.lock = threading.Lock()
+    self.connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+    with self.connection:
+      self.connection.execute("""CREATE TABLE IF NOT EXISTS translations (
+                                  key TEXT PRIMARY KEY,
+                                  translation TEXT NOT NULL,
+                                  explanation TEXT,
+                                  last_used REAL NOT NULL)""")
+      self.connection.execute("CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)")
+    self.size = self.connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+    logger.info(f"Translation memory {self.path} opened with {self.size} translations")
+
+  @staticmethod
+  def make_key(model, original_language, context_language, target_language, phrase, context_translation, prompt_hash,
+               explanations=True):
+    """
+    Returns the key of a translation. The translations made without explanation (explanations=False) have their own
+    keys, so that they are not reused when the explanations are wanted.
+    """
+    texts = [model, original_language, context_language, target_language, phrase, context_translation, prompt_hash]
+    if not explanations:
+      texts.append('no explanation')
+    return hash_text(*texts)
+
+  def get(self, key):
+    """
+    Returns the (translation, explanation) tuple stored for this key or None if not found
+    """
+    with self.lock:
+      row = self.connection.execute("SELECT translation, explanation FROM translations WHERE key = ?", (key,)).fetchone()
+      if row is None:
+        self.misses += 1
+        return None
+      self.hits += 1
+      with self.connection:
+        self.connection.execute("UPDATE translations SET last_used = ? WHERE key = ?", (time(), key))
+      return row[0], row[1]
+
+  def put(self, key, translation, explanation):
+    with self.lock:
+      with self.connection:
+        cursor = self.connection.execute("UPDATE translations SET translation = ?, explanation = ?, last_used = ? "
+                                         "WHERE key = ?", (translation, explanation, time(), key))
+        if cursor.rowcount == 0:
+          self.connection.execute("INSERT INTO translations (key, translation, explanation, last_used) "
+                                  "VALUES (?, ?, ?, ?)", (key, translation, explanation, time()))
+          self.size += 1
+        if self.size > self.max_entries:
+          self._evict()
+
+  def _evict(self):
+    # evict 10% more than needed to not evict at each new translation
+    nb_evicted = self.size - self.max_entries + self.max_entries // 10
+    self.connection.execute("DELETE FROM translations WHERE key IN "
+                            "(SELECT key FROM translations ORDER BY last_used LIMIT ?)", (nb_evicted,))
+    self.size = self.connection.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+    logger.debug(f"Translation memory: evicted least recently used translations, {self.size} remaining")
+
+  def close(self):
+    with self.lock:
+      self.connection.close()
@@ -0,0 +1,73 @@
+# A fake LLM client used by the tests which don't need a real LLM server
+import json
+import re
+import threading
+
+from auto_po_lyglot.clients.client_base import AutoPoLyglotClient
+from auto_po_lyglot.getenv import Params
+
+USER_PROMPT_RE = re.compile(r'sentence: "(?P<phrase>.*)", \w+ translation: "(?P<context>.*)"', re.DOTALL)
+PLURAL_USER_PROMPT_RE = re.compile(r'plural forms: (?P<contexts>.*)\n.* has (?P<nplurals>\d+) plural forms')
+MULTI_LANGUAGE_RE = re.compile(r'into each of these languages: (?P<languages>[^.]*)\.')
+
+
+def fake_params(**kwargs):
+  params = Params()
+  params.original_language = 'English'
+  params.context_language = 'French'
+  params.target_language = 'Italian'
+  params.llm_client = 'fake'
+  params.model = 'fake-model'
+  params.system_prompt = None
+  params.user_prompt = None
+  params.temperature = 0.0
+  params.fuzzy = False
+  params.force = False
+  params.compile = False
+  params.overwrite_output = True
+  params.owner = '<OWNER>'
+  params.owner_mail = '<OWNER EMAIL>'
+  params.workers = 1
+  for key, value in kwargs.items():
+    setattr(params, key, value)
+  return params
+
+
+class FakeClient(AutoPoLyglotClient):
+  """
+  Fake client: the "translation" is the context translation prefixed by the target language.
+  It counts the number of calls made to the "LLM" (including by its copies for other languages).
+  """
+  def __init__(self, params, target_language=None):
+    super().__init__(params, target_language)
+    self._calls = [0]
+    self._calls_lock = threading.Lock()
+
+  @property
+  def calls(self):
+    return self._calls[0]
+
+  @calls.setter
+  def calls(self, value):
+    self._calls[0] = value
+
+  def fake_translation(self, context_translation):
+    return f"[{self.target_language}] {context_translation}"
+
+  def get_translation(self, system_prompt, user_prompt):
+    with self._calls_lock:
+      self._calls[0] += 1
+    if user_prompt.startswith('['):  # batch
+      return json.dumps([{"id": item["id"], "translation": self.fake_translation(item["context"])}
+                         for item in json.loads(user_prompt)])
+    plural = PLURAL_USER_PROMPT_RE.search(user_prompt)
+    if plural:  # one line per plural form, reusing the last context form for the extra forms
+      contexts = re.findall(r'"([^"]*)"', plural.group('contexts'))
+      return '\n'.join(f'"{self.fake_translation(contexts[min(i, len(contexts) - 1)])}"'
+                       for i in range(int(plural.group('nplurals'))))
+    match = USER_PROMPT_RE.search(user_prompt)
+    multi_language = MULTI_LANGUAGE_RE.search(system_prompt)
+    if multi_language:
+      return '\n'.join(f'{language}: "[{language}] {match.group("context")}"'
+                       for language in multi_language.group('languages').split(', '))
+    return f'"{self.fake_translation(match.group("context"))}"'
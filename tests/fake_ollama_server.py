@@ -0,0 +1,113 @@
+# A minimal local fake of the native Ollama chat API, used to test the native Ollama client
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .fake_client import USER_PROMPT_RE
+
+
+# added to the streamed answers, which the client should not need to read
+EXPLANATION = "\nThe explanation of the translation, " + "long and useless " * 20
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+  """
+  Answers each chat request with the context translation prefixed by [Fake], after delay seconds. The first
+  nb_failures requests get a 503 error instead. The received requests are kept in requests, and the maximum number
+  of requests processed at the same time in max_in_flight.
+  """
+  def __init__(self, nb_failures=0, delay=0.0):
+    super().__init__(('127.0.0.1', 0), FakeOllamaHandler)
+    self.nb_failures = nb_failures
+    self.delay = delay
+    self.requests = []
+    self.in_flight = 0
+    self.max_in_flight = 0
+    self.lock = threading.Lock()
+    self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+  @property
+  def base_url(self):
+    # the OpenAI compatible URL, as in OLLAMA_BASE_URL
+    return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+  def __enter__(self):
+    self.thread.start()
+    return self
+
+  def __exit__(self, *args):
+    self.shutdown()
+    self.server_close()
+
+  @property
+  def chat_requests(self):
+    """The requests translating a phrase (not the preloads)"""
+    return [request for request in self.requests if request['messages'][-1]['role'] == 'user']
+
+  def answer(self, body):
+    if body['messages'][-1]['role'] != 'user':  # preload
+      return ''
+    match = USER_PROMPT_RE.search(body['messages'][-1]['content'])
+    if body.get('format'):  # structured output
+      return json.dumps({"translation": f'[Fake] {match.group("context")}', "explanation": ""})
+    return f'"[Fake] {match.group("context")}"'
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+
+  def log_message(self, format, *args):
+    pass
+
+  def send_json(self, data, status=200):
+    content = json.dumps(data).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+  def send_stream(self, body, answer):
+    # one NDJSON chunk per word, the client can stop reading at any time
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/x-ndjson')
+    self.end_headers()
+    chunks = [{"model": body['model'], "created_at": "2024-01-01T00:00:00Z", "done": False,
+               "message": {"role": "assistant", "content": word}} for word in re.findall(r'\s*\S+', answer)]
+    chunks.append({"model": body['model'], "created_at": "2024-01-01T00:00:00Z", "done": True,
+                   "message": {"role": "assistant", "content": ""}, "eval_count": len(chunks)})
+    try:
+      for chunk in chunks:
+        self.wfile.write(json.dumps(chunk).encode('utf-8') + b'\n')
+        self.wfile.flush()
+    except (BrokenPipeError, ConnectionResetError):
+      pass
+
+  def do_POST(self):
+    if self.path != '/api/chat':
+      self.send_error(404)
+      return
+    body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+    server = self.server
+    with server.lock:
+      server.requests.append(body)
+      failing = len(server.requests) <= server.nb_failures
+      server.in_flight += 1
+      server.max_in_flight = max(server.max_in_flight, server.in_flight)
+    try:
+      time.sleep(server.delay)
+      if failing:
+        self.send_json({"error": "server busy, please try again"}, status=503)
+        return
+      prompt_tokens = sum(len(message['content'].split()) for message in body['messages'])
+      if body.get('stream'):
+        self.send_stream(body, server.answer(body) + EXPLANATION)
+        return
+      self.send_json({"model": body['model'], "created_at": "2024-01-01T00:00:00Z", "done": True,
+                      "message": {"role": "assistant", "content": server.answer(body)},
+                      "load_duration": 1000000, "prompt_eval_count": prompt_tokens, "prompt_eval_duration": 1000000,
+                      "eval_count": 5, "eval_duration": 1000000})
+    finally:
+      with server.lock:
+        server.in_flight -= 1
@@ -0,0 +1,151 @@
+# A minimal local fake of the OpenAI files and batches API, used to test the OpenAI batch client
+import email
+import email.policy
+import json
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+
+from .fake_client import USER_PROMPT_RE
+from .fake_ollama_server import EXPLANATION
+
+
+# the token usage of every fake response
+USAGE = {"prompt_tokens": 20, "completion_tokens": 5, "total_tokens": 25, "prompt_tokens_details": {"cached_tokens": 8}}
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+  """
+  Stores the uploaded files and completes the batch jobs immediately. Each request of the batch is answered with the
+  context translation prefixed by [Fake]. The custom_ids given in failing_ids get an error instead.
+  """
+  def __init__(self, failing_ids=()):
+    super().__init__(('127.0.0.1', 0), FakeOpenAIHandler)
+    self.files = {}
+    self.batches = {}
+    self.ids = count(1)
+    self.failing_ids = set(failing_ids)
+    self.batch_requests = 0
+    self.chat_requests = 0
+    self.last_request = None
+    self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+  @property
+  def base_url(self):
+    return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+  def __enter__(self):
+    self.thread.start()
+    return self
+
+  def __exit__(self, *args):
+    self.shutdown()
+    self.server_close()
+
+  def answer(self, body):
+    match = USER_PROMPT_RE.search(body['messages'][-1]['content'])
+    if body.get('response_format'):  # structured output
+      return json.dumps({"translation": f'[Fake] {match.group("context")}', "explanation": ""})
+    return f'"[Fake] {match.group("context")}"'
+
+  def run_batch(self, input_file_id):
+    self.batch_requests += 1
+    output = []
+    for line in self.files[input_file_id].splitlines():
+      request = json.loads(line)
+      if request['custom_id'] in self.failing_ids:
+        output.append({"custom_id": request['custom_id'], "response": None,
+                       "error": {"code": "server_error", "message": "fake failure"}})
+        continue
+      body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": self.answer(request['body'])}}],
+              "usage": USAGE}
+      output.append({"custom_id": request['custom_id'], "response": {"status_code": 200, "body": body}, "error": None})
+    return self.add_file('\n'.join(json.dumps(line) for line in output))
+
+  def add_file(self, content):
+    file_id = f"file-{next(self.ids)}"
+    self.files[file_id] = content
+    return file_id
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+
+  def log_message(self, format, *args):
+    pass
+
+  def send_json(self, data):
+    content = json.dumps(data).encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(content)))
+    self.end_headers()
+    self.wfile.write(content)
+
+  def batch_object(self, batch_id):
+    return {"id": batch_id, "object": "batch", "endpoint": "/v1/chat/completions", "completion_window": "24h",
+            "created_at": 0, **self.server.batches[batch_id]}
+
+  def send_stream(self, answer):
+    # one server-sent event per word, the client can stop reading at any time
+    self.send_response(200)
+    self.send_header('Content-Type', 'text/event-stream')
+    self.end_headers()
+    events = [{"id": "chat", "object": "chat.completion.chunk", "created": 0, "model": "fake",
+               "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]}
+              for word in re.findall(r'\s*\S+', answer)]
+    try:
+      for event in events:
+        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+      self.wfile.write(b"data: [DONE]\n\n")
+    except (BrokenPipeError, ConnectionResetError):
+      pass
+
+  def do_POST(self):
+    body = self.rfile.read(int(self.headers['Content-Length']))
+    if self.path == '/v1/files':
+      message = email.message_from_bytes(f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body,
+                                         policy=email.policy.HTTP)
+      content = next(part.get_content() for part in message.iter_parts() if part.get_filename())
+      content = content.decode('utf-8') if isinstance(content, bytes) else content
+      file_id = self.server.add_file(content)
+      self.send_json({"id": file_id, "object": "file", "bytes": len(content), "created_at": 0,
+                      "filename": "batch.jsonl", "purpose": "batch", "status": "processed"})
+    elif self.path == '/v1/batches':
+      request = json.loads(body)
+      batch_id = f"batch-{next(self.server.ids)}"
+      # the job is not completed at creation, it will be when polled
+      self.server.batches[batch_id] = {"input_file_id": request['input_file_id'], "status": "validating"}
+      self.send_json(self.batch_object(batch_id))
+    elif self.path == '/v1/chat/completions':
+      self.server.chat_requests += 1
+      request = json.loads(body)
+      self.server.last_request = request
+      answer = self.server.answer(request)
+      if request.get('stream'):
+        self.send_stream(answer + EXPLANATION)
+        return
+      self.send_json({"id": "chat", "object": "chat.completion", "created": 0, "model": "fake",
+                      "choices": [{"index": 0, "finish_reason": "stop",
+                                   "message": {"role": "assistant", "content": answer}}],
+                      "usage": USAGE})
+    else:
+      self.send_error(404)
+
+  def do_GET(self):
+    if match := re.fullmatch(r'/v1/batches/([\w-]+)', self.path):
+      batch = self.server.batches[match.group(1)]
+      if batch['status'] != 'completed':
+        batch['status'] = 'completed'
+        batch['output_file_id'] = self.server.run_batch(batch['input_file_id'])
+      self.send_json(self.batch_object(match.group(1)))
+    elif match := re.fullmatch(r'/v1/files/([\w-]+)/content', self.path):
+      content = self.server.files[match.group(1)].encode('utf-8')
+      self.send_response(200)
+      self.send_header('Content-Type', 'application/octet-stream')
+      self.send_header('Content-Length', str(len(content)))
+      self.end_headers()
+      self.wfile.write(content)
+    else:
+      self.send_error(404)
@@ -0,0 +1,55 @@
+import asyncio
+
+import polib
+
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class AsyncFakeClient(FakeClient):
+  """Fake client with a native async API, counting the requests in flight"""
+  def __init__(self, params, target_language=None):
+    super().__init__(params, target_language)
+    self.in_flight = self.max_in_flight = 0
+
+  async def async_get_translation(self, system_prompt, user_prompt):
+    self.in_flight += 1
+    self.max_in_flight = max(self.max_in_flight, self.in_flight)
+    await asyncio.sleep(0.01)
+    self.in_flight -= 1
+    return self.get_translation(system_prompt, user_prompt)
+
+
+def translations(po_file):
+  return [(e.msgid, e.msgstr, e.msgstr_plural) for e in polib.pofile(po_file)]
+
+
+class TestAsync:
+
+  def test_same_result_as_sync(self, tmp_path):
+    sync_client = FakeClient(fake_params(), 'Italian')
+    sync_stats = sync_client.translate_pofile(INPUT_PO, tmp_path / 'sync.po')
+    async_client = AsyncFakeClient(fake_params(async_requests=True, workers=8), 'Italian')
+    async_stats = async_client.translate_pofile(INPUT_PO, tmp_path / 'async.po')
+    assert async_stats == sync_stats
+    assert async_client.calls == sync_client.calls
+    assert translations(tmp_path / 'async.po') == translations(tmp_path / 'sync.po')
+    assert 1 < async_client.max_in_flight <= 8
+
+  def test_default_async_api_runs_get_translation(self, tmp_path):
+    client = FakeClient(fake_params(async_requests=True, workers=4), 'Italian')
+    client.translate_pofile(INPUT_PO, tmp_path / 'async.po')
+    sync_client = FakeClient(fake_params(), 'Italian')
+    sync_client.translate_pofile(INPUT_PO, tmp_path / 'sync.po')
+    assert translations(tmp_path / 'async.po') == translations(tmp_path / 'sync.po')
+
+  def test_async_translate_in_own_event_loop(self):
+    client = AsyncFakeClient(fake_params(), 'Italian')
+
+    async def translate_all():
+      return await asyncio.gather(*(client.async_translate(f"Hello {i}", f"Bonjour {i}") for i in range(20)))
+
+    results = asyncio.run(translate_all())
+    assert results == [(f"[Italian] Bonjour {i}", None) for i in range(20)]
+    assert client.max_in_flight == 20
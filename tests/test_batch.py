@@ -0,0 +1,46 @@
+import json
+
+import polib
+
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class ForgetfulClient(FakeClient):
+  """Forgets the last translation of each batch"""
+  def get_translation(self, system_prompt, user_prompt):
+    result = super().get_translation(system_prompt, user_prompt)
+    if user_prompt.startswith('['):
+      return json.dumps(json.loads(result)[:-1])
+    return result
+
+
+def translated_entries(po_file):
+  return [(e.msgid, e.msgstr, e.msgstr_plural) for e in polib.pofile(po_file)]
+
+
+class TestBatch:
+
+  def test_same_result_with_less_requests(self, tmp_path):
+    single = FakeClient(fake_params(), 'Italian')
+    single_stats = single.translate_pofile(INPUT_PO, tmp_path / 'single.po')
+    batched = FakeClient(fake_params(batch_size=10, workers=2), 'Italian')
+    batched_stats = batched.translate_pofile(INPUT_PO, tmp_path / 'batched.po')
+
+    assert batched_stats == single_stats
+    assert batched.calls <= single.calls / 10 + 2
+    assert translated_entries(tmp_path / 'batched.po') == translated_entries(tmp_path / 'single.po')
+
+  def test_fallback_to_single_requests(self):
+    client = ForgetfulClient(fake_params(batch_size=3), 'Italian')
+    translations = client.translate_batch([("Hello", "Bonjour"), ("Goodbye", "Au revoir"), ("Yes", "Oui")])
+    assert translations == [("[Italian] Bonjour", None), ("[Italian] Au revoir", None), ("[Italian] Oui", None)]
+    assert client.calls == 2
+
+  def test_invalid_response(self):
+    client = FakeClient(fake_params(batch_size=3), 'Italian')
+    phrases = [("Hello", "Bonjour"), ("Goodbye", "Au revoir")]
+    assert client.process_batch_translation('Here is the translation: "Ciao"', len(phrases)) == {}
+    assert client.process_batch_translation('Sure!\n[{"id": 2, "translation": "Arrivederci"}, {"id": 7, "translation": "x"}]',
+                                            len(phrases)) == {1: ("Arrivederci", None)}
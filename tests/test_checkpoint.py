@@ -0,0 +1,99 @@
+import polib
+import pytest
+
+from auto_po_lyglot.checkpoint import save_pofile_atomically
+from auto_po_lyglot.clients.client_base import PoLyglotException
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class Killed(BaseException):
+  """Simulates the process being killed: not caught by translate_pofile"""
+
+
+class CrashingClient(FakeClient):
+  """Raises the given exception at the given call number"""
+  def __init__(self, params, target_language, crash_at, exception):
+    super().__init__(params, target_language)
+    self.crash_at, self.exception = crash_at, exception
+
+  def get_translation(self, system_prompt, user_prompt):
+    if self.calls + 1 == self.crash_at:
+      raise self.exception
+    return super().get_translation(system_prompt, user_prompt)
+
+
+class FailingClient(FakeClient):
+  """Fails to translate the phrases containing 'Cousins', like the real clients do on provider errors"""
+  def get_translation(self, system_prompt, user_prompt):
+    if 'Cousins' in user_prompt:
+      raise PoLyglotException("Internal server error")
+    return super().get_translation(system_prompt, user_prompt)
+
+
+def translations(po_file):
+  return {(e.msgctxt, e.msgid): e.msgstr for e in polib.pofile(po_file) if e.msgstr}
+
+
+class TestCheckpoint:
+
+  def test_atomic_save(self, tmp_path):
+    po = polib.pofile(INPUT_PO)
+    save_pofile_atomically(po, tmp_path / 'out.po')
+    assert [f.name for f in tmp_path.iterdir()] == ['out.po']
+    assert len(polib.pofile(tmp_path / 'out.po')) == len(po)
+
+  def test_periodic_checkpoint(self, tmp_path):
+    client = CrashingClient(fake_params(checkpoint_entries=5), 'Italian', 13, Killed())
+    with pytest.raises(Killed):
+      client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    # the 12 first translations were done but only the 10 first ones were checkpointed
+    saved = translations(tmp_path / 'it.po')
+    assert len(saved) == 10
+    assert all(msgstr.startswith('[Italian] ') for msgstr in saved.values())
+
+  def test_interrupted_rerun_keeps_existing_translations(self, tmp_path):
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    complete = translations(tmp_path / 'it.po')
+    client = CrashingClient(fake_params(force=True, checkpoint_entries=5), 'Italian', 11, Killed())
+    with pytest.raises(Killed):
+      client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert translations(tmp_path / 'it.po').keys() == complete.keys()
+    # the prompts can't be built for a language without examples: the run stops without losing anything
+    FakeClient(fake_params(force=True), 'Japanese').translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert translations(tmp_path / 'it.po') == complete
+
+  def test_prompts_are_built_only_when_needed(self, tmp_path):
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    complete = translations(tmp_path / 'it.po')
+    # nothing to translate: the prompts, which can't be built for Japanese, are not needed
+    client = FakeClient(fake_params(), 'Japanese')
+    assert client.translate_pofile(INPUT_PO, tmp_path / 'it.po')[1] == 100
+    assert client.calls == 0 and translations(tmp_path / 'it.po') == complete
+
+  def test_resume_after_interruption(self, tmp_path):
+    reference = FakeClient(fake_params(), 'Italian')
+    reference.translate_pofile(INPUT_PO, tmp_path / 'reference.po')
+
+    client = CrashingClient(fake_params(), 'Italian', 8, KeyboardInterrupt())
+    with pytest.raises(KeyboardInterrupt):
+      client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert len(translations(tmp_path / 'it.po')) == 7
+
+    resumed = FakeClient(fake_params(resume=True), 'Italian')
+    resumed.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert client.calls + resumed.calls == reference.calls
+    assert translations(tmp_path / 'it.po') == translations(tmp_path / 'reference.po')
+
+  @pytest.mark.parametrize('batch_size', [1, 10])
+  def test_failed_entries_are_skipped(self, tmp_path, batch_size):
+    client = FailingClient(fake_params(batch_size=batch_size), 'Italian')
+    nb_translations = client.translate_pofile(INPUT_PO, tmp_path / 'it.po')[0]
+    out_po = polib.pofile(tmp_path / 'it.po')
+    failed = [entry for entry in out_po if 'Cousins' in entry.msgid]
+    assert failed and all(entry.msgstr == '' for entry in failed)
+    assert nb_translations == len(out_po) - len(failed)
+    # the failed entries are translated by the next run
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert all(entry.msgstr for entry in polib.pofile(tmp_path / 'it.po') if 'Cousins' in entry.msgid)
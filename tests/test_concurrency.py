@@ -0,0 +1,37 @@
+import polib
+import pytest
+
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+@pytest.fixture
+def output_files(tmp_path):
+  return tmp_path / 'sequential.po', tmp_path / 'concurrent.po'
+
+
+class TestConcurrentTranslation:
+
+  def test_same_result_as_sequential(self, output_files):
+    sequential_file, concurrent_file = output_files
+    sequential = FakeClient(fake_params(workers=1), 'Italian')
+    sequential_stats = sequential.translate_pofile(INPUT_PO, sequential_file)
+    concurrent = FakeClient(fake_params(workers=8), 'Italian')
+    concurrent_stats = concurrent.translate_pofile(INPUT_PO, concurrent_file)
+
+    assert concurrent_stats == sequential_stats
+    assert concurrent.calls == sequential.calls
+    sequential_po = polib.pofile(sequential_file)
+    concurrent_po = polib.pofile(concurrent_file)
+    assert [(e.msgid, e.msgstr, e.msgstr_plural) for e in concurrent_po] == \
+           [(e.msgid, e.msgstr, e.msgstr_plural) for e in sequential_po]
+
+  def test_already_translated_stats(self, output_files):
+    output_file, _ = output_files
+    FakeClient(fake_params(workers=4), 'Italian').translate_pofile(INPUT_PO, output_file)
+    client = FakeClient(fake_params(workers=4), 'Italian')
+    _, _, already_translated, forced, _ = client.translate_pofile(INPUT_PO, output_file)
+    assert already_translated > 0
+    assert forced == 0
+    assert client.calls == 0
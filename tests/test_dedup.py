@@ -0,0 +1,77 @@
+import polib
+
+from auto_po_lyglot.dedup import SharedTranslations, DeduplicationJob, collect_duplicates
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+def make_catalogs(tmp_path):
+  """Two app catalogs, the second one sharing its 10 first entries with the first one"""
+  po = polib.pofile(INPUT_PO)
+  app1, app2 = tmp_path / 'app1.po', tmp_path / 'app2.po'
+  po.save(app1)
+  po2 = polib.POFile()
+  po2.metadata = po.metadata
+  for entry in list(po)[:10]:
+    po2.append(entry)
+  po2.append(polib.POEntry(msgid='Only in app2', msgstr='Seulement dans app2'))
+  po2.save(app2)
+  return {str(app): [{'Italian': str(tmp_path / f'{app.stem}.it.po')}, {'Spanish': str(tmp_path / f'{app.stem}.es.po')}]
+          for app in (app1, app2)}
+
+
+def translate_all(params, po_list, shared_translations=None):
+  client = FakeClient(params)
+  for input_file, output_files in po_list.items():
+    for tlg_output_file in output_files:
+      for target_language, output_file in tlg_output_file.items():
+        language_client = client.for_language(target_language)
+        language_client.shared_translations = shared_translations
+        language_client.translate_pofile(input_file, output_file)
+  return client.calls
+
+
+def translations(po_list):
+  return {output_file: [(e.msgid, e.msgstr) for e in polib.pofile(output_file)]
+          for output_files in po_list.values() for tlg_output_file in output_files
+          for output_file in tlg_output_file.values()}
+
+
+class TestDedup:
+
+  def test_collect_duplicates(self, tmp_path):
+    po_list = make_catalogs(tmp_path)
+    duplicates, saved_requests = collect_duplicates(fake_params(), po_list)
+    assert sorted(duplicates) == ['Italian', 'Spanish']
+    nb_duplicates = len(duplicates['Italian'])
+    assert 0 < nb_duplicates <= 10
+    assert 'Only in app2' not in [e.msgid for e in duplicates['Italian']]
+    assert saved_requests == 2 * nb_duplicates
+
+  def test_already_translated_entries_are_not_collected(self, tmp_path):
+    po_list = make_catalogs(tmp_path)
+    translate_all(fake_params(), po_list)
+    duplicates, saved_requests = collect_duplicates(fake_params(), po_list)
+    assert duplicates == {} and saved_requests == 0
+
+  def test_dedup_saves_requests(self, tmp_path):
+    (tmp_path / 'reference').mkdir()
+    po_list = make_catalogs(tmp_path / 'reference')
+    calls_without_dedup = translate_all(fake_params(), po_list)
+    reference = translations(po_list)
+
+    dedup_path = tmp_path / 'dedup'
+    dedup_path.mkdir()
+    po_list = make_catalogs(dedup_path)
+    params = fake_params()
+    duplicates, saved_requests = collect_duplicates(params, po_list)
+    shared_translations = SharedTranslations()
+    client = FakeClient(params)
+    for target_language, po in duplicates.items():
+      DeduplicationJob(po, target_language, shared_translations).run(client.for_language(target_language))
+    calls = client.calls + translate_all(params, po_list, shared_translations)
+
+    assert calls == calls_without_dedup - saved_requests
+    assert shared_translations.saved_requests == saved_requests
+    assert list(translations(po_list).values()) == list(reference.values())
@@ -0,0 +1,131 @@
+import json
+import shutil
+
+import pytest
+
+from auto_po_lyglot import django_po
+from auto_po_lyglot.django_plan import ScanCache, plan_django_jobs
+from auto_po_lyglot.django_po import locate_django_translation_files
+from auto_po_lyglot.scheduler import MultiLanguageTranslationJob
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test-small.po'
+LANGUAGES = ['Italian', 'Spanish']
+
+
+def add_app(root, app_path):
+  messages_dir = root / app_path / 'locale' / 'fr' / 'LC_MESSAGES'
+  messages_dir.mkdir(parents=True)
+  shutil.copyfile(INPUT_PO, messages_dir / 'django.po')
+  return str(messages_dir / 'django.po')
+
+
+@pytest.fixture
+def project(tmp_path):
+  """A Django project with applications at several depths, and directories which must not be scanned"""
+  root = tmp_path / 'project'
+  apps = [add_app(root, path) for path in ('app1', 'src/pkg/app2', 'vendor/lib/app3', '')]
+  for path in ('.git/app', 'node_modules/app', 'venv/lib/python3.12/site-packages/django/conf'):
+    add_app(root, path)
+  return root, sorted(apps)
+
+
+def run_plan(plan, params):
+  client = FakeClient(params)
+  for job in plan.jobs:
+    job.run(client.for_language(job.target_language) if job.target_language else client)
+  return client.calls
+
+
+class TestDjangoPlan:
+
+  def test_recursive_scan(self, project):
+    root, apps = project
+    po_list = locate_django_translation_files(root, 'French', LANGUAGES)
+    assert sorted(po_list) == apps
+    for input_file, output_files in po_list.items():
+      assert output_files == [{'Italian': input_file.replace('/fr/', '/it/')},
+                              {'Spanish': input_file.replace('/fr/', '/es/')}]
+      assert all((root / output_file).parent.is_dir() for tlg in output_files for output_file in tlg.values())
+
+  def test_scan_cache(self, project, tmp_path, monkeypatch):
+    root, apps = project
+    cache_file = tmp_path / 'scan.json'
+    scan_cache = ScanCache(cache_file)
+    po_list = locate_django_translation_files(root, 'French', LANGUAGES, scan_cache)
+    scan_cache.save()
+
+    def no_scan(*args):
+      raise AssertionError("the project should not be scanned again")
+    monkeypatch.setattr(django_po, 'scan_translation_files', no_scan)
+    assert locate_django_translation_files(root, 'French', LANGUAGES, ScanCache(cache_file)) == po_list
+    monkeypatch.undo()
+    # a new application is found, even nested in an existing directory
+    new_app = add_app(root, 'src/pkg/app4')
+    assert sorted(locate_django_translation_files(root, 'French', LANGUAGES, ScanCache(cache_file))) == \
+      sorted(apps + [new_app])
+
+  def test_unchanged_files_are_skipped(self, project, tmp_path):
+    root, apps = project
+    params = fake_params(multi_language=False)
+    scan_cache = ScanCache(tmp_path / 'scan.json')
+    po_list = locate_django_translation_files(root, 'French', LANGUAGES, scan_cache)
+    plan = plan_django_jobs(params, po_list, scan_cache)
+    assert len(plan.jobs) == len(apps) * len(LANGUAGES) and not plan.unchanged
+    assert run_plan(plan, params) > 0
+    plan.record_results(scan_cache)
+    scan_cache.save()
+
+    scan_cache = ScanCache(tmp_path / 'scan.json')
+    plan = plan_django_jobs(params, po_list, scan_cache)
+    assert plan.jobs == [] and len(plan.unchanged) == len(apps) * len(LANGUAGES)
+    # a changed input is translated again into all the languages, a changed output only into its language
+    with open(apps[0], 'a', encoding='utf-8') as f:
+      f.write('\nmsgid "New phrase"\nmsgstr "Nouvelle phrase"\n')
+    output_file = po_list[apps[1]][1]['Spanish']
+    with open(output_file, 'a', encoding='utf-8') as f:
+      f.write('\nmsgid "Added by hand"\nmsgstr ""\n')
+    plan = plan_django_jobs(params, po_list, scan_cache)
+    assert sorted((str(job.input_file), job.target_language) for job in plan.jobs) == \
+      [(apps[0], 'Italian'), (apps[0], 'Spanish'), (apps[1], 'Spanish')]
+    assert plan.po_list() == {apps[0]: po_list[apps[0]], apps[1]: [po_list[apps[1]][1]]}
+    # unless forced
+    assert len(plan_django_jobs(fake_params(multi_language=False, force=True), po_list, scan_cache).jobs) == \
+      len(apps) * len(LANGUAGES)
+
+  def test_prompt_change(self, project, tmp_path):
+    root, apps = project
+    params = fake_params(multi_language=False)
+    scan_cache = ScanCache(tmp_path / 'scan.json')
+    po_list = locate_django_translation_files(root, 'French', LANGUAGES, scan_cache)
+    plan = plan_django_jobs(params, po_list, scan_cache)
+    run_plan(plan, params)
+    plan.record_results(scan_cache)
+    assert plan_django_jobs(params, po_list, scan_cache).jobs == []
+    # the files translated with other prompts are translated again
+    for prompt_param in ('system_prompt', 'user_prompt'):
+      changed_params = fake_params(multi_language=False, **{prompt_param: 'Translate {original_phrase}'})
+      assert len(plan_django_jobs(changed_params, po_list, scan_cache).jobs) == len(apps) * len(LANGUAGES)
+
+  def test_incomplete_files_are_not_skipped(self, project, tmp_path):
+    root, apps = project
+    params = fake_params(multi_language=False)
+    scan_cache = ScanCache(tmp_path / 'scan.json')
+    po_list = locate_django_translation_files(root, 'French', LANGUAGES, scan_cache)
+    plan = plan_django_jobs(params, po_list, scan_cache)
+    plan.jobs = plan.jobs[:1]  # the other files are not translated
+    run_plan(plan, params)
+    plan.record_results(scan_cache)
+    assert len(plan_django_jobs(params, po_list, scan_cache).unchanged) == 1
+
+  def test_multi_language_plan(self, project, tmp_path):
+    root, apps = project
+    params = fake_params(multi_language=True)
+    po_list = locate_django_translation_files(root, 'French', LANGUAGES)
+    plan = plan_django_jobs(params, po_list)
+    assert len(plan.jobs) == len(apps)
+    assert all(isinstance(job, MultiLanguageTranslationJob) for job in plan.jobs)
+    described = plan.describe()
+    assert json.loads(json.dumps(described)) == described
+    assert {(d['input'], d['language'], d['action']) for d in described} == \
+      {(app, language, 'translate') for app in apps for language in LANGUAGES}
@@ -0,0 +1,69 @@
+import json
+import shutil
+
+import polib
+
+from auto_po_lyglot.fingerprints import fingerprints_file_name
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+CHANGED_MSGID = 'Cousins Matter!'
+
+
+def translate(input_file, output_file, language='Italian', **kwargs):
+  client = FakeClient(fake_params(track_changes=True, **kwargs), language)
+  client.translate_pofile(input_file, output_file)
+  return client.calls
+
+
+def edit_context_translation(input_file, msgid, msgstr):
+  po = polib.pofile(input_file)
+  po.find(msgid).msgstr = msgstr
+  po.save()
+
+
+class TestFingerprints:
+
+  def test_only_changed_entries_are_translated(self, tmp_path):
+    input_file, output_file = tmp_path / 'fr.po', tmp_path / 'it.po'
+    shutil.copyfile(INPUT_PO, input_file)
+    assert translate(input_file, output_file) > 0
+    sidecar = json.loads(fingerprints_file_name(output_file).read_text(encoding='utf-8'))
+    assert len(sidecar['entries']) == len([e for e in polib.pofile(output_file) if e.translated()])
+    # nothing changed
+    assert translate(input_file, output_file) == 0
+    # the context translation of an entry is edited
+    edit_context_translation(input_file, CHANGED_MSGID, 'Les cousins comptent !')
+    assert translate(input_file, output_file) == 1
+    assert polib.pofile(output_file).find(CHANGED_MSGID).msgstr == '[Italian] Les cousins comptent !'
+    assert translate(input_file, output_file) == 0
+
+  def test_model_change(self, tmp_path):
+    output_file = tmp_path / 'it.po'
+    nb_calls = translate(INPUT_PO, output_file)
+    assert translate(INPUT_PO, output_file, model='other-model') == nb_calls
+
+  def test_untracked_translations_are_kept(self, tmp_path):
+    output_file = tmp_path / 'it.po'
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, output_file)
+    assert not fingerprints_file_name(output_file).exists()
+    assert translate(INPUT_PO, output_file) == 0
+    assert fingerprints_file_name(output_file).exists()
+
+  def test_multi_language(self, tmp_path):
+    input_file = tmp_path / 'fr.po'
+    shutil.copyfile(INPUT_PO, input_file)
+    output_files = {language: tmp_path / f'{language}.po' for language in ('Italian', 'Spanish')}
+
+    def translate_multi():
+      client = FakeClient(fake_params(track_changes=True), None)
+      client.translate_pofile_multi(input_file, output_files)
+      return client.calls
+
+    assert translate_multi() > 0
+    assert all(fingerprints_file_name(output_file).exists() for output_file in output_files.values())
+    assert translate_multi() == 0
+    edit_context_translation(input_file, CHANGED_MSGID, 'Les cousins comptent !')
+    assert translate_multi() == 1  # a single request for both languages
+    for language, output_file in output_files.items():
+      assert polib.pofile(output_file).find(CHANGED_MSGID).msgstr == f'[{language}] Les cousins comptent !'
@@ -0,0 +1,201 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from auto_po_lyglot.clients import gemini_client
+from auto_po_lyglot.clients.gemini_client import CachedGeminiClient, GeminiClient, GeminiModels
+from auto_po_lyglot.clients.metrics import LLMMetrics
+from .fake_client import USER_PROMPT_RE, fake_params
+from .fake_ollama_server import EXPLANATION
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class FakeStream:
+  """Fake of a streamed GenerateContentResponse, its iterator being the gRPC call"""
+  def __init__(self, chunks):
+    self.chunks = chunks
+    self._iterator = self
+    self.cancelled = False
+
+  def __iter__(self):
+    return iter(self.chunks)
+
+  def cancel(self):
+    self.cancelled = True
+
+
+class FakeAsyncStream:
+  """Fake of a streamed AsyncGenerateContentResponse, its iterator being an async generator over the gRPC call"""
+  def __init__(self, chunks):
+    self.closed = False
+    self._iterator = self.iterate(chunks)
+
+  async def iterate(self, chunks):
+    try:
+      for chunk in chunks:
+        yield chunk
+    finally:
+      self.closed = True
+
+  def __aiter__(self):
+    return self._iterator
+
+
+class FakeGenerativeModel:
+  """Fake of genai.GenerativeModel, answering with the context translation prefixed by [Fake]"""
+  created = []
+
+  def __init__(self, model, system_instruction=None, cached_content=None):
+    self.system_instruction, self.cached_content = system_instruction, cached_content
+    self.generation_configs = []
+    self.streams = []
+    self.created.append(self)
+
+  @classmethod
+  def from_cached_content(cls, cached_content):
+    return cls(cached_content.model, cached_content=cached_content)
+
+  def answer(self, user_prompt, generation_config):
+    prompt_tokens = 100 if self.cached_content else 10
+    usage = SimpleNamespace(prompt_token_count=prompt_tokens, candidates_token_count=2,
+                            cached_content_token_count=90 if self.cached_content else 0)
+    translation = f'[Fake] {USER_PROMPT_RE.search(user_prompt).group("context")}'
+    if generation_config and generation_config.get('response_schema'):  # structured output
+      return SimpleNamespace(text=json.dumps({"translation": translation, "explanation": ""}), usage_metadata=usage)
+    return SimpleNamespace(text=f'"{translation}"', usage_metadata=usage)
+
+  def stream(self, user_prompt, generation_config):
+    """The answer followed by an explanation, one chunk per word"""
+    answer = self.answer(user_prompt, generation_config)
+    return [SimpleNamespace(text=word, usage_metadata=answer.usage_metadata)
+            for word in re.findall(r'\s*\S+', answer.text + EXPLANATION)]
+
+  def generate_content(self, user_prompt, generation_config=None, stream=False):
+    self.generation_configs.append(generation_config)
+    if stream:
+      self.streams.append(FakeStream(self.stream(user_prompt, generation_config)))
+      return self.streams[-1]
+    return self.answer(user_prompt, generation_config)
+
+  async def generate_content_async(self, user_prompt, generation_config=None, stream=False):
+    self.generation_configs.append(generation_config)
+    if stream:
+      self.streams.append(FakeAsyncStream(self.stream(user_prompt, generation_config)))
+      return self.streams[-1]
+    return self.answer(user_prompt, generation_config)
+
+
+class FakeCachedContent:
+  """Fake of caching.CachedContent, the system prompts shorter than min_tokens words cannot be cached"""
+  created = []
+  min_tokens = 0
+
+  def __init__(self, model, system_instruction, ttl):
+    self.name = f'cachedContents/{len(self.created)}'
+    self.model, self.system_instruction, self.ttl = model, system_instruction, ttl
+    self.usage_metadata = SimpleNamespace(total_token_count=len(system_instruction.split()))
+    self.updates = 0
+    self.expired = False
+
+  @classmethod
+  def create(cls, model, system_instruction, ttl):
+    if len(system_instruction.split()) < cls.min_tokens:
+      raise Exception("400 Cached content is too small")
+    cached_content = cls(model, system_instruction, ttl)
+    cls.created.append(cached_content)
+    return cached_content
+
+  def update(self, ttl):
+    if self.expired:
+      raise Exception(f"403 {self.name} not found or permission denied")
+    self.updates += 1
+
+
+@pytest.fixture
+def fake_genai(monkeypatch):
+  monkeypatch.setattr(gemini_client.genai, 'GenerativeModel', FakeGenerativeModel)
+  monkeypatch.setattr(gemini_client.caching, 'CachedContent', FakeCachedContent)
+  monkeypatch.setattr(FakeGenerativeModel, 'created', [])
+  monkeypatch.setattr(FakeCachedContent, 'created', [])
+
+
+def new_client(client_class, **kwargs):
+  params = fake_params(llm_client='gemini', model='gemini-1.5-flash-002', gemini_api_key='fake-key',
+                       requests_per_minute=0, **kwargs)
+  client = client_class(params, 'Italian')
+  client.metrics = LLMMetrics()
+  return client
+
+
+class TestGeminiClient:
+
+  def test_models_lru(self):
+    models = GeminiModels(lambda system_prompt: object(), max_size=2)
+    first, second = models.get('first'), models.get('second')
+    assert models.get('first') is first
+    models.get('third')  # evicts second, the least recently used
+    assert models.get('first') is first
+    assert models.get('second') is not second
+
+  def test_interleaved_languages(self, fake_genai):
+    client = new_client(GeminiClient)
+    clients = [client, client.for_language('Spanish'), client.for_language('German')]
+    for _ in range(3):
+      for language_client in clients:
+        assert language_client.translate("Hello", "Bonjour")[0] == "[Fake] Bonjour"
+    # one model handle per target language, shared by the copies of the client
+    assert len(FakeGenerativeModel.created) == 3
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_context_cache(self, fake_genai, tmp_path, async_requests):
+    client = new_client(CachedGeminiClient, async_requests=async_requests, workers=4)
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    client.for_language('Spanish').translate_pofile(INPUT_PO, tmp_path / 'es.po')
+    # one cache per system prompt (i.e. per target language), used by all the requests
+    assert [c.system_instruction for c in FakeCachedContent.created] == \
+      [client.get_system_prompt(), client.for_language('Spanish').get_system_prompt()]
+    assert all(model.cached_content for model in FakeGenerativeModel.created)
+    total = client.metrics.total()
+    assert total.cached_tokens == 90 * total.requests
+
+  def test_context_cache_refresh(self, fake_genai):
+    client = new_client(CachedGeminiClient)
+    client.translate("Hello", "Bonjour")
+    cached_content = FakeCachedContent.created[0]
+    client.translate("Hello", "Bonjour")
+    assert cached_content.updates == 0
+    system_prompt, (_, refreshed) = next(iter(client._cached_contents.items()))
+    client._cached_contents[system_prompt] = (cached_content, refreshed - client.cache_ttl.total_seconds())
+    client.translate("Hello", "Bonjour")
+    assert cached_content.updates == 1 and len(FakeCachedContent.created) == 1
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_expired_context_cache(self, fake_genai, async_requests):
+    client = new_client(CachedGeminiClient, async_requests=async_requests)
+    translate = client.translate if not async_requests else \
+      lambda *phrase: asyncio.run(client.async_translate(*phrase))
+    translate("Hello", "Bonjour")
+    expired = FakeCachedContent.created[0]
+    # the system prompt was not used for longer than the ttl
+    expired.expired = True
+    system_prompt, (_, refreshed) = next(iter(client._cached_contents.items()))
+    client._cached_contents[system_prompt] = (expired, refreshed - 2 * client.cache_ttl.total_seconds())
+    assert translate("Hello", "Bonjour")[0] == "[Fake] Bonjour"
+    # the model handle bound to the expired cache was replaced
+    assert len(FakeCachedContent.created) == 2
+    assert FakeGenerativeModel.created[-1].cached_content is FakeCachedContent.created[1]
+    translate("Goodbye", "Au revoir")
+    assert len(FakeCachedContent.created) == 2
+    assert FakeGenerativeModel.created[-1].cached_content is FakeCachedContent.created[1]
+
+  def test_system_prompt_too_small(self, fake_genai, monkeypatch):
+    monkeypatch.setattr(FakeCachedContent, 'min_tokens', 1000000)
+    client = new_client(CachedGeminiClient)
+    assert client.translate("Hello", "Bonjour")[0] == "[Fake] Bonjour"
+    assert client.translate("Goodbye", "Au revoir")[0] == "[Fake] Au revoir"
+    # the system prompt is sent with the requests
+    assert [model.system_instruction for model in FakeGenerativeModel.created] == [client.get_system_prompt()]
@@ -0,0 +1,109 @@
+import threading
+from time import sleep
+
+import polib
+
+from auto_po_lyglot.job_pool import BackgroundJobPool
+from .fake_client import FakeClient, fake_params
+from .test_checkpoint import FailingClient
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class BlockingClient(FakeClient):
+  """Waits for the release event before each translation"""
+  release = None
+
+  def get_translation(self, system_prompt, user_prompt):
+    self.release.wait(5)
+    return super().get_translation(system_prompt, user_prompt)
+
+
+class FakeJobPool(BackgroundJobPool):
+  client_class = FakeClient
+
+  def build_client(self, job):
+    return self.client_class(job.params, job.params.target_language)
+
+
+def read_input():
+  with open(INPUT_PO, encoding='utf-8') as f:
+    return f.read()
+
+
+def wait_for(pool, job_id, timeout=10):
+  for _ in range(int(timeout / 0.01)):
+    if pool.get(job_id).finished:
+      return pool.get(job_id)
+    sleep(0.01)
+  raise TimeoutError(f"job {job_id} not finished")
+
+
+class TestBackgroundJobPool:
+
+  def test_job(self):
+    pool = FakeJobPool(max_jobs=2)
+    job_id = pool.submit(fake_params(), read_input(), 'test.po')
+    job = wait_for(pool, job_id)
+    progress = job.progress()
+    assert progress['status'] == 'done' and progress['percent'] == 100
+    assert progress['nb_done'] == progress['nb_entries'] == len(polib.pofile(INPUT_PO))
+    output = polib.pofile(job.output)
+    assert all(entry.msgstr.startswith('[Italian] ') for entry in output if entry.msgid and not entry.fuzzy)
+    assert job.output_file_name == 'test.fake-model.it.po'
+    result = progress['results'][0]
+    assert result['translation'] == f"[Italian] {result['context']}"
+    # only the new results are returned
+    assert job.progress(since=len(progress['results']))['results'] == []
+    pool.shutdown()
+
+  def test_jobs_are_queued(self):
+    BlockingClient.release = threading.Event()
+    pool = FakeJobPool(max_jobs=1)
+    pool.client_class = BlockingClient
+    first, second = (pool.submit(fake_params(), read_input(), 'test.po') for _ in range(2))
+    sleep(0.1)
+    assert pool.get(first).status == 'running' and pool.get(second).status == 'queued'
+    assert 0 < pool.get(first).progress()['nb_entries']
+    BlockingClient.release.set()
+    assert wait_for(pool, first).status == 'done' and wait_for(pool, second).status == 'done'
+    pool.shutdown()
+
+  def test_cancel(self):
+    BlockingClient.release = threading.Event()
+    pool = FakeJobPool(max_jobs=1)
+    pool.client_class = BlockingClient
+    running, queued = (pool.submit(fake_params(), read_input(), 'test.po') for _ in range(2))
+    sleep(0.1)
+    pool.cancel(running)
+    pool.cancel(queued)
+    BlockingClient.release.set()
+    job = wait_for(pool, running)
+    assert job.status == 'cancelled' and job.progress()['nb_done'] < job.progress()['nb_entries']
+    assert job.output is not None  # what was translated can still be downloaded
+    assert wait_for(pool, queued).status == 'cancelled'
+    pool.shutdown()
+
+  def test_failed_entries(self):
+    pool = FakeJobPool()
+    pool.client_class = FailingClient
+    job = wait_for(pool, pool.submit(fake_params(), read_input(), 'test.po'))
+    progress = job.progress()
+    assert progress['status'] == 'done' and progress['nb_failed'] > 0
+    assert any(result['status'] == 'Failed' for result in progress['results'])
+    pool.shutdown()
+
+  def test_failed_job(self):
+    pool = FakeJobPool()
+    job = wait_for(pool, pool.submit(fake_params(), 'not a po file', 'test.po'))
+    assert job.status == 'failed' and job.progress()['error']
+    pool.shutdown()
+
+  def test_finished_jobs_expire(self):
+    pool = FakeJobPool(job_ttl=0)
+    job_id = pool.submit(fake_params(), read_input(), 'test.po')
+    wait_for(pool, job_id)
+    sleep(0.01)
+    pool.submit(fake_params(), read_input(), 'test.po')
+    assert pool.get(job_id) is None
+    pool.shutdown()
@@ -0,0 +1,54 @@
+import langcodes
+import polib
+import pytest
+
+from auto_po_lyglot.language_codes import LANGUAGE_CODES, format_language_code, get_language_code
+from auto_po_lyglot.plural_forms import get_plural_forms
+from .fake_client import FakeClient, fake_params
+
+
+class TestLanguageCodes:
+
+  @pytest.mark.parametrize('name', [name for name in LANGUAGE_CODES if '(' not in name])
+  def test_table_matches_langcodes(self, name):
+    language = langcodes.find(name)
+    assert LANGUAGE_CODES[name] == format_language_code(language.language, language.script, language.territory)
+
+  @pytest.mark.parametrize('name, code', [
+    ('French', 'fr'),
+    ('  italian ', 'it'),
+    ('Brazilian Portuguese', 'pt_BR'),
+    ('Portuguese (Brazil)', 'pt_BR'),
+    ('Traditional Chinese', 'zh_Hant'),
+    ('pt-br', 'pt_BR'),
+    ('zh_hant', 'zh_Hant'),
+    ('es-419', 'es_419'),
+    ('de', 'de'),
+    ('Ewe', 'ee'),  # not in the table and not taken for a code
+    ('ewe', 'ee'),  # the ISO 639-2 code or the lower case name
+    ('fre', 'fr'),
+    ('xyz', None),  # not a valid code, nor a language name
+    ('Klingon', 'tlh'),
+    ('Not a language', None),
+  ])
+  def test_get_language_code(self, name, code):
+    assert get_language_code(name) == code
+
+  def test_memoized(self):
+    get_language_code.cache_clear()
+    for _ in range(10):
+      get_language_code('Occitan')
+    assert get_language_code.cache_info().hits == 9
+
+  def test_regional_plural_forms(self):
+    assert get_plural_forms('Brazilian Portuguese') == 'nplurals=2; plural=(n > 1);'
+    assert get_plural_forms('European Portuguese') == get_plural_forms('Portuguese') == 'nplurals=2; plural=(n != 1);'
+    assert get_plural_forms('Traditional Chinese') == 'nplurals=1; plural=0;'
+
+  @pytest.mark.parametrize('language, code', [
+    ('French', 'fr'), ('Brazilian Portuguese', 'pt_BR'), ('Traditional Chinese', 'zh_Hant'), ('Not a language', ''),
+  ])
+  def test_language_header(self, language, code):
+    po = polib.POFile()
+    FakeClient(fake_params(), language).set_po_header_and_metadata(po, 'tests/input/test.po')
+    assert po.metadata['Language'] == code
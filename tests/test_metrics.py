@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+from types import SimpleNamespace
+
+from auto_po_lyglot.clients.client_base import PoLyglotException
+from auto_po_lyglot.clients.grok_client import GrokClient
+from auto_po_lyglot.clients.metrics import LLMMetrics, record_usage
+from .fake_client import FakeClient, fake_params
+from .test_checkpoint import FailingClient
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class UsageClient(FakeClient):
+  """Reports 10 prompt tokens (4 of them cached) and 2 completion tokens per request, and a rate limit error first"""
+  def __init__(self, params, target_language=None):
+    super().__init__(params, target_language)
+    self.metrics = LLMMetrics()
+    self.rate_limited = True
+
+  def get_translation(self, system_prompt, user_prompt):
+    if self.rate_limited:
+      self.rate_limited = False
+      raise PoLyglotException("Error code: 429 - Rate limit reached, please retry after 0s")
+    record_usage(10, 2, 4)
+    return super().get_translation(system_prompt, user_prompt)
+
+
+class FakeXaiClient:
+  """Answers the translation requests like the xai_sdk client, with the token usage of the response"""
+  def __init__(self):
+    self.chat = self
+
+  def create_conversation(self):
+    return self
+
+  async def add_response_no_stream(self, prompt):
+    usage = SimpleNamespace(prompt_tokens=10, completion_tokens=2, cached_prompt_text_tokens=4)
+    return SimpleNamespace(message='"Ciao"', usage=usage)
+
+
+class FakeGrokClient(GrokClient):
+  def create_async_client(self):
+    return FakeXaiClient()
+
+
+class TestMetrics:
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_requests_are_recorded(self, tmp_path, async_requests):
+    client = UsageClient(fake_params(async_requests=async_requests, workers=4), 'Italian')
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    summary = client.metrics.summary()
+    total = summary['total']
+    # the rate limited request was retried: it is counted once, with a retry
+    assert total['requests'] == client.calls
+    assert total['retries'] == 1 and total['errors'] == 0
+    assert total['prompt_tokens'] == 10 * total['requests']
+    assert total['completion_tokens'] == 2 * total['requests']
+    assert total['cached_tokens'] == 4 * total['requests']
+    assert total['latency'] >= total['max_latency'] > 0
+    assert [(d['client'], d['model'], d['file'], d['language']) for d in summary['details']] == \
+      [('fake', 'fake-model', INPUT_PO, 'Italian')]
+
+  def test_metrics_by_file_and_language(self, tmp_path):
+    client = FakeClient(fake_params(), 'Italian')
+    client.metrics = LLMMetrics()
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    client.for_language('Spanish').translate_pofile(INPUT_PO, tmp_path / 'es.po')
+    details = client.metrics.summary()['details']
+    assert [d['language'] for d in details] == ['Italian', 'Spanish']
+    assert sum(d['requests'] for d in details) == client.calls
+
+  def test_errors_are_recorded(self, tmp_path):
+    client = FailingClient(fake_params(), 'Italian')
+    client.metrics = LLMMetrics()
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    total = client.metrics.summary()['total']
+    assert total['errors'] > 0 and total['requests'] == client.calls + total['errors']
+
+  def test_export(self, tmp_path):
+    client = UsageClient(fake_params(), 'Italian')
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    client.metrics.save_json(tmp_path / 'metrics.json')
+    client.metrics.save_prometheus(tmp_path / 'metrics.prom')
+    assert json.loads((tmp_path / 'metrics.json').read_text()) == client.metrics.summary()
+    prometheus = (tmp_path / 'metrics.prom').read_text()
+    requests = client.metrics.summary()['total']['requests']
+    assert '# TYPE auto_po_lyglot_llm_requests_total counter' in prometheus
+    assert (f'auto_po_lyglot_llm_requests_total{{client="fake",model="fake-model",file="{INPUT_PO}",'
+            f'language="Italian"}} {requests}') in prometheus
+    assert sorted(f.name for f in tmp_path.iterdir()) == ['it.po', 'metrics.json', 'metrics.prom']
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_grok_usage(self, tmp_path, async_requests):
+    client = FakeGrokClient(fake_params(llm_client='grok', async_requests=async_requests), 'Italian')
+    client.metrics = LLMMetrics()
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    total = client.metrics.summary()['total']
+    assert total['requests'] > 0
+    assert total['prompt_tokens'] == 10 * total['requests']
+    assert total['completion_tokens'] == 2 * total['requests']
+    assert total['cached_tokens'] == 4 * total['requests']
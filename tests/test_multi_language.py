@@ -0,0 +1,46 @@
+import polib
+
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+LANGUAGES = ['Italian', 'Spanish', 'German']
+
+
+class ItalianOnlyClient(FakeClient):
+  """Answers only the Italian translation in multi language mode"""
+  def get_translation(self, system_prompt, user_prompt):
+    return super().get_translation(system_prompt, user_prompt).split('\n')[0]
+
+
+class TestMultiLanguage:
+
+  def test_same_result_with_less_requests(self, tmp_path):
+    single_calls = 0
+    for language in LANGUAGES:
+      client = FakeClient(fake_params(), language)
+      client.translate_pofile(INPUT_PO, tmp_path / f'single_{language}.po')
+      single_calls += client.calls
+
+    client = FakeClient(fake_params(workers=4), None)
+    results = client.translate_pofile_multi(INPUT_PO, {language: tmp_path / f'multi_{language}.po'
+                                                       for language in LANGUAGES})
+    assert client.calls == single_calls / len(LANGUAGES)
+    assert list(results) == LANGUAGES
+    for language in LANGUAGES:
+      single_po, multi_po = polib.pofile(tmp_path / f'single_{language}.po'), polib.pofile(tmp_path / f'multi_{language}.po')
+      assert [(e.msgid, e.msgstr, e.msgstr_plural) for e in multi_po] == \
+             [(e.msgid, e.msgstr, e.msgstr_plural) for e in single_po]
+      assert multi_po.metadata['Language'] == single_po.metadata['Language']
+
+  def test_missing_languages_translated_one_by_one(self):
+    client = ItalianOnlyClient(fake_params(), None)
+    translations = client.translate_multi("Hello", "Bonjour", LANGUAGES)
+    assert translations == {language: (f"[{language}] Bonjour", None) for language in LANGUAGES}
+    assert client.calls == 3  # 1 multi language request + 2 single requests
+
+  def test_already_translated_languages(self, tmp_path):
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, tmp_path / 'Italian.po')
+    client = FakeClient(fake_params(), None)
+    results = client.translate_pofile_multi(INPUT_PO, {language: tmp_path / f'{language}.po' for language in LANGUAGES})
+    assert results['Italian'][2] > 0  # already translated
+    assert results['Spanish'][2] == 0
@@ -0,0 +1,87 @@
+import polib
+import pytest
+
+from auto_po_lyglot import ClientBuilder
+from auto_po_lyglot.clients.metrics import LLMMetrics
+from auto_po_lyglot.clients.ollama_native_client import get_keep_alive, get_native_host
+from auto_po_lyglot.clients.retry import RetryRule
+from .fake_client import fake_params
+from .fake_ollama_server import FakeOllamaServer
+
+INPUT_PO = 'tests/input/test.po'
+
+
+def native_client(server, **kwargs):
+  params = fake_params(llm_client='ollama_native', model='qwen2.5:3b', ollama_base_url=server.base_url, **kwargs)
+  client = ClientBuilder(params).get_client()
+  client.target_language = 'Italian'
+  client.metrics = LLMMetrics()
+  # no need to wait in the tests
+  client.retry_rules = {error_class: RetryRule(rule.max_retries, initial_delay=0.001, max_delay=0.01)
+                        for error_class, rule in client.retry_rules.items()}
+  return client
+
+
+class TestOllamaNativeClient:
+
+  def test_native_host(self):
+    assert get_native_host('http://localhost:11434/v1') == 'http://localhost:11434'
+    assert get_native_host('http://localhost:11434/v1/') == 'http://localhost:11434'
+    assert get_native_host('http://ollama:11434') == 'http://ollama:11434'
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_translate_pofile(self, tmp_path, async_requests):
+    with FakeOllamaServer() as server:
+      client = native_client(server, async_requests=async_requests, ollama_num_parallel=4)
+      output_file = tmp_path / 'output.po'
+      client.translate_pofile(INPUT_PO, output_file)
+
+    in_po, out_po = polib.pofile(INPUT_PO), polib.pofile(output_file)
+    for in_entry, out_entry in zip(in_po, out_po):
+      if in_entry.msgid and not in_entry.fuzzy:
+        assert out_entry.msgstr.startswith("[Fake] ")
+    # the system prompt is evaluated once, before any translation
+    assert [request['messages'][-1]['role'] for request in server.requests].count('system') == 1
+    assert server.requests[0]['messages'][-1]['role'] == 'system'
+    assert server.requests[0]['options']['num_predict'] == 1
+    # the same context size and keep alive for all the requests, so that the model stays loaded
+    assert {request['options']['num_ctx'] for request in server.requests} == {8192}
+    assert {request['keep_alive'] for request in server.requests} == {'30m'}
+
+  def test_settings(self, tmp_path):
+    with FakeOllamaServer() as server:
+      client = native_client(server, ollama_keep_alive='-1', ollama_num_ctx=4096, ollama_num_predict=200)
+      client.translate("Hello", "Bonjour")
+    assert server.chat_requests[0]['options'] == {'temperature': 0.0, 'num_ctx': 4096, 'num_predict': 200}
+    # a number of seconds is sent as a number, Ollama rejects durations without unit
+    assert {request['keep_alive'] for request in server.requests} == {-1}
+
+  @pytest.mark.parametrize('keep_alive, expected', [
+    (None, '30m'), ('10m', '10m'), ('-1', -1), ('3600', 3600), ('1.5', 1.5), (-1, -1),
+  ])
+  def test_keep_alive(self, keep_alive, expected):
+    assert get_keep_alive(keep_alive) == expected
+
+  def test_parallel_requests(self, tmp_path):
+    with FakeOllamaServer(delay=0.05) as server:
+      client = native_client(server, ollama_num_parallel=4)
+      assert client.get_workers() == 4
+      client.translate_pofile(INPUT_PO, tmp_path / 'output.po')
+    assert server.max_in_flight > 1
+    assert native_client(server, workers=3).get_workers() == 3
+
+  def test_metrics(self, tmp_path):
+    with FakeOllamaServer() as server:
+      client = native_client(server)
+      client.translate_pofile(INPUT_PO, tmp_path / 'output.po')
+    total = client.metrics.total()
+    assert total.requests == len(server.chat_requests)
+    assert total.completion_tokens == 5 * total.requests
+    assert total.prompt_tokens > 0
+
+  def test_server_errors_are_retried(self):
+    # the preload and the translation fail first
+    with FakeOllamaServer(nb_failures=2) as server:
+      client = native_client(server)
+      assert client.translate("Hello", "Bonjour")[0] == "[Fake] Bonjour"
+    assert client.metrics.total().retries == 2 and client.metrics.total().errors == 0
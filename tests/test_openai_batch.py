@@ -0,0 +1,62 @@
+import polib
+import pytest
+
+from auto_po_lyglot import ClientBuilder
+from auto_po_lyglot.clients.metrics import LLMMetrics
+from .fake_client import fake_params
+from .fake_openai_server import FakeOpenAIServer
+
+INPUT_PO = 'tests/input/test.po'
+
+
+@pytest.fixture
+def openai_env(monkeypatch):
+  monkeypatch.setenv('OPENAI_API_KEY', 'fake-key')
+
+  def start_server(**kwargs):
+    server = FakeOpenAIServer(**kwargs)
+    monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+    return server
+  return start_server
+
+
+def batch_client():
+  client = ClientBuilder(fake_params(llm_client='openai_batch', model='gpt-4o-mini')).get_client()
+  client.target_language = 'Italian'
+  client.poll_interval = 0.01
+  client.metrics = LLMMetrics()
+  return client
+
+
+class TestOpenAIBatchClient:
+
+  def test_translate_pofile(self, openai_env, tmp_path):
+    with openai_env() as server:
+      output_file = tmp_path / 'output.po'
+      nb_translations, _, _, _, _ = batch_client().translate_pofile(INPUT_PO, output_file)
+      assert server.batch_requests == 1
+      assert server.chat_requests == 0
+
+    in_po, out_po = polib.pofile(INPUT_PO), polib.pofile(output_file)
+    assert nb_translations == len(in_po)
+    for in_entry, out_entry in zip(in_po, out_po):
+      assert out_entry.msgid == in_entry.msgid
+      if in_entry.msgid and not in_entry.fuzzy and not in_entry.msgid_plural:
+        assert out_entry.msgstr.startswith("[Fake] ")
+
+  def test_failed_requests_translated_again(self, openai_env):
+    with openai_env(failing_ids={'1'}) as server:
+      translations = batch_client().translate_batch([("Hello", "Bonjour"), ("Goodbye", "Au revoir")])
+      assert server.batch_requests == 1
+      assert server.chat_requests == 1
+    assert translations == [("[Fake] Bonjour", None), ("[Fake] Au revoir", None)]
+
+  def test_metrics(self, openai_env):
+    with openai_env(failing_ids={'1'}):
+      client = batch_client()
+      client.translate_batch([("Hello", "Bonjour"), ("Goodbye", "Au revoir")])
+    total = client.metrics.summary()['total']
+    # 2 requests in the batch job, one of them failed and was sent again as a regular request
+    assert total['requests'] == 3 and total['errors'] == 1
+    assert (total['prompt_tokens'], total['completion_tokens'], total['cached_tokens']) == (40, 10, 16)
+    assert total['max_latency'] > 0
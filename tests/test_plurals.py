@@ -0,0 +1,71 @@
+import polib
+
+from auto_po_lyglot.plural_forms import get_plural_forms, parse_plural_forms
+from .fake_client import FakeClient, fake_params
+
+
+class NoExamplesClient(FakeClient):
+  """The prompt examples are not available for all the languages with more than 2 plural forms"""
+  def get_system_prompt(self):
+    return "Translate"
+
+
+class WrongPluralFormsClient(NoExamplesClient):
+  """Always answers a single plural form"""
+  def get_translation(self, system_prompt, user_prompt):
+    return super().get_translation(system_prompt, user_prompt).split('\n')[0]
+
+
+def write_plural_po(path):
+  po = polib.POFile()
+  po.metadata = {'Content-Type': 'text/plain; charset=UTF-8', 'Plural-Forms': 'nplurals=2; plural=(n > 1);'}
+  po.append(polib.POEntry(msgid="Hello", msgstr="Bonjour"))
+  po.append(polib.POEntry(msgid="One file", msgid_plural="%(n)s files",
+                          msgstr_plural={0: "Un fichier", 1: "%(n)s fichiers"}))
+  po.save(path)
+  return path
+
+
+class TestPlurals:
+
+  def test_plural_forms(self):
+    assert parse_plural_forms(get_plural_forms('Italian')) == (2, '(n != 1)')
+    assert parse_plural_forms(get_plural_forms('Polish'))[0] == 3
+    assert parse_plural_forms(get_plural_forms('Japanese')) == (1, '0')
+    assert parse_plural_forms('nplurals=4; plural=(n%100==1 ? 0 : n%100==2 ? 1 : 2);') == \
+      (4, '(n%100==1 ? 0 : n%100==2 ? 1 : 2)')
+
+  def test_process_plural_translation(self):
+    client = NoExamplesClient(fake_params(), 'Polish')
+    forms, explanation = client.process_plural_translation('"plik"\nform 1: "pliki"\n"plików"\n\nWhy', 3)
+    assert forms == ['plik', 'pliki', 'plików']
+    assert explanation == 'Why'
+    assert client.process_plural_translation('"plik"\n"pliki"', 3) == (None, None)
+
+  def test_all_plural_forms_in_one_request(self, tmp_path):
+    input_file = write_plural_po(tmp_path / 'input.po')
+    client = NoExamplesClient(fake_params(), 'Polish')
+    client.translate_pofile(input_file, tmp_path / 'pl.po')
+    out_po = polib.pofile(tmp_path / 'pl.po')
+    assert client.calls == 2  # 1 for the singular entry, 1 for all the plural forms
+    assert out_po.metadata['Plural-Forms'] == get_plural_forms('Polish')
+    assert out_po[1].msgstr_plural == {0: "[Polish] Un fichier", 1: "[Polish] %(n)s fichiers",
+                                       2: "[Polish] %(n)s fichiers"}
+
+  def test_plural_entries_in_batch_and_multi_language_modes(self, tmp_path):
+    input_file = write_plural_po(tmp_path / 'input.po')
+    client = NoExamplesClient(fake_params(batch_size=10), 'Japanese')
+    client.translate_pofile(input_file, tmp_path / 'ja.po')
+    assert polib.pofile(tmp_path / 'ja.po')[1].msgstr_plural == {0: "[Japanese] Un fichier"}
+    client = FakeClient(fake_params(), None)
+    client.translate_pofile_multi(input_file, {'Italian': tmp_path / 'it.po', 'Spanish': tmp_path / 'es.po'})
+    assert client.calls == 3  # 1 multi language request for the singular entry, 1 plural request by language
+    assert polib.pofile(tmp_path / 'es.po')[1].msgstr_plural == {0: "[Spanish] Un fichier", 1: "[Spanish] %(n)s fichiers"}
+
+  def test_fallback_to_separate_requests(self, tmp_path):
+    input_file = write_plural_po(tmp_path / 'input.po')
+    client = WrongPluralFormsClient(fake_params(), 'Polish')
+    client.translate_pofile(input_file, tmp_path / 'pl.po')
+    assert client.calls == 4  # singular entry, plural request, then singular and plural phrases
+    assert polib.pofile(tmp_path / 'pl.po')[1].msgstr_plural == {0: "[Polish] Un fichier", 1: "[Polish] %(n)s fichiers",
+                                                                 2: "[Polish] %(n)s fichiers"}
@@ -0,0 +1,21 @@
+import polib
+
+from auto_po_lyglot.po_index import POIndex
+
+
+class TestPOIndex:
+
+  def test_find_by_context(self):
+    po = polib.POFile()
+    po.append(polib.POEntry(msgid="May", msgstr="Mai"))
+    po.append(polib.POEntry(msgctxt="verb", msgid="May", msgstr="Pouvoir"))
+    po.append(polib.POEntry(msgid="apple", msgid_plural="apples", msgstr_plural={0: "pomme", 1: "pommes"}))
+    po.append(polib.POEntry(msgid="Old", msgstr="Vieux", obsolete=True))
+    index = POIndex(po)
+
+    assert index.find(polib.POEntry(msgid="May")).msgstr == "Mai"
+    assert index.find(polib.POEntry(msgctxt="verb", msgid="May")).msgstr == "Pouvoir"
+    assert index.find(polib.POEntry(msgctxt="month", msgid="May")) is None
+    assert index.find(polib.POEntry(msgid="apple", msgid_plural="apples")).msgstr_plural[1] == "pommes"
+    assert index.find(polib.POEntry(msgid="apple")) is None
+    assert index.find(polib.POEntry(msgid="Old")) is None
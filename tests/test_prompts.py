@@ -0,0 +1,30 @@
+from .fake_client import FakeClient, fake_params
+
+
+class TestSystemPromptCache:
+
+  def test_prompt_built_once_per_language(self, monkeypatch):
+    client = FakeClient(fake_params(), 'Italian')
+    builds = []
+    build_system_prompt = client._build_system_prompt
+    monkeypatch.setattr(client, '_build_system_prompt', lambda template: builds.append(template) or
+                        build_system_prompt(template))
+
+    italian_prompt = client.get_system_prompt()
+    assert client.get_system_prompt() is italian_prompt
+    assert len(builds) == 1
+    assert 'Italian' in italian_prompt
+
+    client.target_language = 'Spanish'
+    spanish_prompt = client.get_system_prompt()
+    assert 'Spanish' in spanish_prompt and 'Italian' not in spanish_prompt
+    assert len(builds) == 2
+
+    client.params.system_prompt = "Translate from {original_language} to {target_language}"
+    assert client.get_system_prompt() == "Translate from English to Spanish"
+    assert len(builds) == 3
+
+    client.params.system_prompt = None
+    client.target_language = 'Italian'
+    assert client.get_system_prompt() is italian_prompt
+    assert len(builds) == 3
@@ -0,0 +1,65 @@
+from time import monotonic
+
+from auto_po_lyglot.clients.claude_client import ClaudeClient
+from auto_po_lyglot.clients.client_base import PoLyglotException
+from auto_po_lyglot.clients.gemini_client import GeminiClient
+from auto_po_lyglot.clients.openai_ollama_client import OpenAIClient
+from auto_po_lyglot.clients.rate_limiter import RateLimiter, TokenBucketRateLimiter, is_rate_limit_error
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class RateLimitedClient(FakeClient):
+  """Fails with a rate limit error on the first request"""
+  def get_translation(self, system_prompt, user_prompt):
+    if self.calls == 0:
+      self.calls += 1
+      raise PoLyglotException("Error code: 429 - Rate limit reached, please retry after 0.1s")
+    return super().get_translation(system_prompt, user_prompt)
+
+
+class TestRateLimiter:
+
+  def test_requests_per_minute(self):
+    # bursts of 10 seconds worth of requests are allowed, then 1 request every 0.1s
+    limiter = TokenBucketRateLimiter(requests_per_minute=600)
+    start = monotonic()
+    for _ in range(105):
+      limiter.acquire()
+    assert 0.4 < monotonic() - start < 1.5
+
+  def test_big_request_accepted(self):
+    limiter = TokenBucketRateLimiter(tokens_per_minute=60)
+    start = monotonic()
+    limiter.acquire(1000)  # bigger than the capacity of the bucket
+    assert monotonic() - start < 0.1
+
+  def test_rate_limit_error_detection(self):
+    assert is_rate_limit_error(PoLyglotException("Error code: 429 - {'error': 'Too many requests'}"))
+    assert not is_rate_limit_error(PoLyglotException("Error code: 401 - Invalid API key"))
+
+  def test_no_limit_by_default(self):
+    client = FakeClient(fake_params(), 'Italian')
+    assert type(client.rate_limiter) is RateLimiter
+    client = FakeClient(fake_params(requests_per_minute=60), 'Italian')
+    assert isinstance(client.rate_limiter, TokenBucketRateLimiter)
+    # the providers are not throttled unless asked, their rate limit errors are retried
+    for client_class in (OpenAIClient, ClaudeClient, GeminiClient):
+      assert client_class.requests_per_minute is None and client_class.tokens_per_minute is None
+
+  def test_backoff_and_retry(self):
+    client = RateLimitedClient(fake_params(requests_per_minute=6000), 'Italian')
+    translation, _ = client.translate("Hello", "Bonjour")
+    assert translation == "[Italian] Bonjour"
+    assert client.calls == 2
+
+  def test_skipped_entries_not_throttled(self, tmp_path):
+    output_file = tmp_path / 'output.po'
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, output_file)
+    # everything is already translated: no request, no throttling even with a very low limit
+    client = FakeClient(fake_params(requests_per_minute=1), 'Italian')
+    start = monotonic()
+    client.translate_pofile(INPUT_PO, output_file)
+    assert client.calls == 0
+    assert monotonic() - start < 1
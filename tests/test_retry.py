@@ -0,0 +1,125 @@
+import pytest
+
+from auto_po_lyglot.clients.client_base import PoLyglotException
+from auto_po_lyglot.clients.metrics import LLMMetrics
+from auto_po_lyglot.clients.retry import RetryBudget, RetryRule, classify_error
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class StatusError(Exception):
+  """An error of an LLM SDK with an HTTP status"""
+  def __init__(self, message, status_code):
+    super().__init__(message)
+    self.status_code = status_code
+
+
+class RateLimitError(Exception):
+  """The rate limit error type of the SDKs"""
+
+
+class FlakyClient(FakeClient):
+  """Fails the first nb_failures requests with the given error"""
+  def __init__(self, params, target_language, nb_failures, error):
+    super().__init__(params, target_language)
+    self.nb_failures, self.error = nb_failures, error
+    self.failures = 0
+    self.metrics = LLMMetrics()
+    # no need to wait in the tests
+    self.retry_rules = {error_class: RetryRule(rule.max_retries, initial_delay=0.001, max_delay=0.01)
+                        for error_class, rule in self.retry_rules.items()}
+
+  def get_translation(self, system_prompt, user_prompt):
+    if self.failures < self.nb_failures:
+      self.failures += 1
+      raise self.error
+    return super().get_translation(system_prompt, user_prompt)
+
+
+def wrapped(error):
+  """Wraps an error like the clients do"""
+  try:
+    raise PoLyglotException(str(error)) from error
+  except PoLyglotException as e:
+    return e
+
+
+class TestRetry:
+
+  @pytest.mark.parametrize('error, error_class', [
+    (PoLyglotException("Error code: 429 - {'error': 'Too many requests'}"), 'rate_limit'),
+    (PoLyglotException("Error code: 529 - {'type': 'error', 'error': {'type': 'overloaded_error'}}"), 'overloaded'),
+    (PoLyglotException("Error code: 503 - Service unavailable"), 'server_error'),
+    (wrapped(StatusError("Bad gateway", 502)), 'server_error'),
+    (PoLyglotException("Request timed out."), 'timeout'),
+    (TimeoutError(), 'timeout'),
+    (PoLyglotException("Connection error."), 'connection'),
+    (PoLyglotException("Error code: 401 - Invalid API key"), None),
+    (wrapped(StatusError("Not found", 404)), None),
+    (PoLyglotException("Error:target_language must be set before trying to translate anything"), None),
+    (wrapped(RateLimitError("Too many requests")), 'rate_limit'),
+    (wrapped(StatusError("Rate limit exceeded", 429)), 'rate_limit'),
+    (PoLyglotException("Resource has been exhausted (e.g. check quota). 429"), 'rate_limit'),
+    # 429 in a message which is not a status
+    (wrapped(StatusError("The prompt has 429 tokens, the maximum is 128", 400)), None),
+    (wrapped(StatusError("Model gpt-429 not found", 404)), None),
+    (PoLyglotException("Model model-429 does not exist"), None),
+  ])
+  def test_classify_error(self, error, error_class):
+    assert classify_error(error) == error_class
+
+  def test_delays(self):
+    rule = RetryRule(5, initial_delay=1.0, max_delay=10.0)
+    for retries in range(6):
+      expected = min(2 ** retries, 10)
+      assert expected / 2 <= rule.get_delay(retries) <= expected
+    # the delay requested by the provider is used, capped to max_delay
+    assert rule.get_delay(0, retry_after=3.5) == 3.5
+    assert rule.get_delay(0, retry_after=100) == 10.0
+
+  def test_transient_errors_are_retried(self):
+    client = FlakyClient(fake_params(), 'Italian', 2, PoLyglotException("Error code: 503 - Service unavailable"))
+    assert client.translate("Hello", "Bonjour")[0] == "[Italian] Bonjour"
+    assert client.metrics.total().retries == 2 and client.metrics.total().errors == 0
+
+  def test_max_retries(self, tmp_path):
+    client = FlakyClient(fake_params(max_retries=0), 'Italian', 1, PoLyglotException("Error code: 500"))
+    with pytest.raises(PoLyglotException):
+      client.translate("Hello", "Bonjour")
+    client = FlakyClient(fake_params(), 'Italian', 4, PoLyglotException("Error code: 500"))
+    with pytest.raises(PoLyglotException):
+      client.translate("Hello", "Bonjour")
+    assert client.failures == 4  # the first request and 3 retries
+
+  def test_permanent_errors_are_not_retried(self):
+    client = FlakyClient(fake_params(), 'Italian', 1, PoLyglotException("Error code: 401 - Invalid API key"))
+    with pytest.raises(PoLyglotException):
+      client.translate("Hello", "Bonjour")
+    assert client.failures == 1
+
+  def test_retry_budget(self):
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    assert budget.withdraw() and not budget.withdraw()
+    budget.deposit()
+    budget.deposit()
+    assert budget.withdraw() and not budget.withdraw()
+
+  def test_retries_disabled(self):
+    client = FlakyClient(fake_params(retry_budget=0), 'Italian', 1, PoLyglotException("Error code: 503"))
+    with pytest.raises(PoLyglotException):
+      client.translate("Hello", "Bonjour")
+    assert client.failures == 1 and client.metrics.total().retries == 0
+
+  def test_retry_budget_exhausted(self, tmp_path):
+    # the provider is down: after the budget is exhausted, the requests fail without being retried
+    client = FlakyClient(fake_params(retry_budget=0.1), 'Italian', 1000, PoLyglotException("Error code: 503"))
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    total = client.metrics.total()
+    assert total.errors == total.requests
+    assert total.retries <= 10 + 0.1 * total.requests
+
+  def test_async_retries(self, tmp_path):
+    client = FlakyClient(fake_params(async_requests=True, workers=4), 'Italian', 3, TimeoutError())
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert client.metrics.total().retries == 3 and client.metrics.total().errors == 0
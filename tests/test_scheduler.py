@@ -0,0 +1,82 @@
+import threading
+from time import sleep
+
+from auto_po_lyglot.scheduler import JobScheduler, TranslationJob
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test-small.po'
+LANGUAGES = ['Italian', 'Spanish', 'German', 'Portuguese']
+
+
+class SlowFakeClient(FakeClient):
+  running = 0
+  max_running = 0
+  started = []
+  lock = threading.Lock()
+
+  def translate_pofile(self, input_file, output_file):
+    with self.lock:
+      SlowFakeClient.started.append(self.params.llm_client)
+      SlowFakeClient.running += 1
+      SlowFakeClient.max_running = max(SlowFakeClient.max_running, SlowFakeClient.running)
+    sleep(0.1)
+    try:
+      return super().translate_pofile(input_file, output_file)
+    finally:
+      with self.lock:
+        SlowFakeClient.running -= 1
+
+
+class FakeScheduler(JobScheduler):
+  def new_client(self, params):
+    client = SlowFakeClient(params)
+    self.clients.append(client)
+    return client
+
+  def build_client(self, job):
+    client = super().build_client(job)
+    self.job_clients.append(client)
+    return client
+
+
+def run_jobs(tmp_path, llm_clients=(None,), **kwargs):
+  SlowFakeClient.max_running, SlowFakeClient.started = 0, []
+  scheduler = FakeScheduler(fake_params(**kwargs))
+  scheduler.clients, scheduler.job_clients = [], []
+  jobs = [TranslationJob(INPUT_PO, language, tmp_path / f'{language}.po', llm_clients[i % len(llm_clients)])
+          for i, language in enumerate(LANGUAGES)]
+  return scheduler, scheduler.run(jobs)
+
+
+class TestJobScheduler:
+
+  def test_one_client_per_provider(self, tmp_path):
+    scheduler, results = run_jobs(tmp_path, max_jobs=4)
+    assert len(results) == len(LANGUAGES) and all(results)
+    assert len(scheduler.clients) == 1
+    assert sorted(client.target_language for client in scheduler.job_clients) == sorted(LANGUAGES)
+    # the jobs share the rate limiter of the provider
+    assert all(client.rate_limiter is scheduler.clients[0].rate_limiter for client in scheduler.job_clients)
+    for language in LANGUAGES:
+      assert f'[{language}]' in (tmp_path / f'{language}.po').read_text()
+    assert SlowFakeClient.max_running > 1
+
+  def test_several_providers(self, tmp_path):
+    scheduler, results = run_jobs(tmp_path, llm_clients=('openai', 'claude'), max_jobs=4)
+    assert all(results)
+    assert sorted(client.params.llm_client for client in scheduler.clients) == ['claude', 'openai']
+
+  def test_providers_share_the_pool(self, tmp_path):
+    # the jobs waiting for the busy provider don't prevent the job of the other provider from running
+    scheduler, results = run_jobs(tmp_path, llm_clients=('openai', 'openai', 'openai', 'claude'), max_jobs=2,
+                                  max_jobs_per_provider=1)
+    assert all(results)
+    assert 'claude' in SlowFakeClient.started[:2]
+
+  def test_provider_cap(self, tmp_path):
+    run_jobs(tmp_path, max_jobs=4, max_jobs_per_provider=2)
+    assert SlowFakeClient.max_running <= 2
+
+  def test_sequential(self, tmp_path):
+    run_jobs(tmp_path, max_jobs=1)
+    assert SlowFakeClient.max_running == 1
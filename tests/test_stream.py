@@ -0,0 +1,97 @@
+import polib
+import pytest
+
+from auto_po_lyglot.po_stream import POStreamReader, StreamedPOIndex, partial_file_name
+from .fake_client import FakeClient, fake_params
+from .test_checkpoint import CrashingClient, Killed, translations
+
+INPUT_PO = 'tests/input/test.po'
+
+
+def stream_params(**kwargs):
+  return fake_params(stream_po=True, stream_window=7, **kwargs)
+
+
+def header_apart_file(tmp_path):
+  """test.po with a blank line between the comments of its header and its metadata"""
+  text = open(INPUT_PO, encoding='utf-8').read().replace('#\n#, fuzzy\nmsgid ""', '#\n\n#, fuzzy\nmsgid ""', 1)
+  input_file = tmp_path / 'fr.po'
+  input_file.write_text(text, encoding='utf-8')
+  return input_file
+
+
+class TestStream:
+
+  def test_reader(self):
+    po = polib.pofile(INPUT_PO)
+    reader = POStreamReader(INPUT_PO, 7)
+    windows = list(reader.windows())
+    assert all(len(window) <= 7 for window in windows)
+    assert [entry.msgid for window in windows for entry in window] == [entry.msgid for entry in po]
+    assert reader.header.header == po.header and reader.header.metadata == po.metadata
+
+  def test_header_apart_from_metadata(self, tmp_path):
+    input_file = header_apart_file(tmp_path)
+    po = polib.pofile(INPUT_PO)
+    reader = POStreamReader(input_file, 7)
+    assert reader.header.header == po.header and reader.header.metadata == po.metadata
+    assert [entry.msgid for window in reader.windows() for entry in window] == [entry.msgid for entry in po]
+    FakeClient(fake_params(), 'Italian').translate_pofile(input_file, tmp_path / 'reference.po')
+    FakeClient(stream_params(), 'Italian').translate_pofile(input_file, tmp_path / 'it.po')
+    reference, streamed = polib.pofile(tmp_path / 'reference.po'), polib.pofile(tmp_path / 'it.po')
+    assert streamed.metadata['Content-Type'] == 'text/plain; charset=UTF-8'
+    assert streamed.metadata.keys() == reference.metadata.keys()
+    assert not any(entry.msgid == '' for entry in streamed)
+    assert translations(tmp_path / 'it.po') == translations(tmp_path / 'reference.po')
+
+  def test_metadata_entry_after_the_header(self, tmp_path):
+    input_file = tmp_path / 'fr.po'
+    input_file.write_text(open(INPUT_PO, encoding='utf-8').read() + '\nmsgid ""\nmsgstr ""\n"Language: fr\\n"\n',
+                          encoding='utf-8')
+    windows = list(POStreamReader(input_file, 7).windows())
+    assert [entry.msgid for window in windows for entry in window] == [entry.msgid for entry in polib.pofile(INPUT_PO)]
+
+  def test_index(self):
+    index = StreamedPOIndex(INPUT_PO, window_size=7)
+    po = polib.pofile(INPUT_PO)
+    assert len(index) == len(po)
+    for entry in po:
+      assert index.find(entry) == entry
+    assert index.find(polib.POEntry(msgid='Not in the file')) is None
+    index.close()
+
+  @pytest.mark.parametrize('batch_size', [1, 5])
+  def test_same_output_as_translate_pofile(self, tmp_path, batch_size):
+    FakeClient(fake_params(batch_size=batch_size), 'Italian').translate_pofile(INPUT_PO, tmp_path / 'reference.po')
+    client = FakeClient(stream_params(batch_size=batch_size), 'Italian')
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert translations(tmp_path / 'it.po') == translations(tmp_path / 'reference.po')
+    assert not partial_file_name(tmp_path / 'it.po').exists()
+
+  def test_already_translated_entries(self, tmp_path):
+    FakeClient(fake_params(), 'Italian').translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    client = FakeClient(stream_params(), 'Italian')
+    already_translated = client.translate_pofile(INPUT_PO, tmp_path / 'it.po')[2]
+    assert client.calls == 0
+    assert already_translated == len(translations(tmp_path / 'it.po'))
+
+  @pytest.mark.parametrize('exception', [KeyboardInterrupt(), Killed()])
+  def test_resume_after_interruption(self, tmp_path, exception):
+    reference = FakeClient(fake_params(), 'Italian')
+    reference.translate_pofile(INPUT_PO, tmp_path / 'reference.po')
+
+    client = CrashingClient(stream_params(), 'Italian', 10, exception)
+    with pytest.raises(type(exception)):
+      client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    if isinstance(exception, KeyboardInterrupt):
+      # the translated entries are saved in the output file
+      assert len(translations(tmp_path / 'it.po')) == 9
+    else:
+      # the process was killed: the translated entries are left in the partial file
+      assert len(translations(partial_file_name(tmp_path / 'it.po'))) == 7
+
+    resumed = FakeClient(stream_params(resume=True), 'Italian')
+    resumed.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert resumed.calls < reference.calls
+    assert translations(tmp_path / 'it.po') == translations(tmp_path / 'reference.po')
+    assert not partial_file_name(tmp_path / 'it.po').exists()
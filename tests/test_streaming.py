@@ -0,0 +1,91 @@
+import asyncio
+
+import polib
+import pytest
+
+from auto_po_lyglot import ClientBuilder
+from auto_po_lyglot.clients.gemini_client import GeminiClient
+from auto_po_lyglot.clients.metrics import LLMMetrics
+from auto_po_lyglot.clients.streaming import FirstLineReader
+from .fake_client import FakeClient, fake_params
+from .fake_ollama_server import FakeOllamaServer
+from .fake_openai_server import FakeOpenAIServer
+from .test_gemini import FakeGenerativeModel, fake_genai, new_client  # noqa: F401
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class ExplainingClient(FakeClient):
+  """Adds an explanation after the translation"""
+  def get_translation(self, system_prompt, user_prompt):
+    return super().get_translation(system_prompt, user_prompt) + "\nAn explanation"
+
+
+def get_client(params):
+  client = ClientBuilder(params).get_client()
+  client.target_language, client.metrics = 'Italian', LLMMetrics()
+  return client
+
+
+class TestStreaming:
+
+  def test_first_line_reader(self):
+    reader = FirstLineReader()
+    assert not reader.add('\n  "Ciao')
+    assert not reader.add(None)
+    assert reader.add(' mondo"\nExplanation')
+    assert reader.line == '"Ciao mondo"' and reader.nb_chunks == 3
+
+  def test_no_explanation(self, tmp_path):
+    client = ExplainingClient(fake_params(no_explanation=True), 'Italian')
+    assert client.translate("Hello", "Bonjour") == ("[Italian] Bonjour", None)
+    assert client.get_max_tokens("Hello", "Bonjour") == 32 + len("Bonjour")
+    assert ExplainingClient(fake_params(), 'Italian').translate("Hello", "Bonjour") == ("[Italian] Bonjour", "An explanation")
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    assert not any(entry.comment for entry in polib.pofile(tmp_path / 'it.po') if entry.msgid and not entry.msgid_plural)
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_ollama_native(self, async_requests):
+    with FakeOllamaServer() as server:
+      client = get_client(fake_params(llm_client='ollama_native', model='qwen2.5:3b', no_explanation=True,
+                                      async_requests=async_requests, ollama_base_url=server.base_url))
+      translate = client.translate if not async_requests else \
+        lambda *phrase: asyncio.run(client.async_translate(*phrase))
+      assert translate("Hello", "Bonjour") == ("[Fake] Bonjour", None)
+      request = server.chat_requests[-1]
+      assert request['stream'] and request['options']['num_predict'] == 32 + len("Bonjour")
+    # the request is stopped after the translation line: '"[Fake]', ' Bonjour"' and the first word of the explanation
+    assert client.metrics.total().requests == 1 and client.metrics.total().completion_tokens == 3
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_openai(self, monkeypatch, async_requests):
+    monkeypatch.setenv('OPENAI_API_KEY', 'fake-key')
+    with FakeOpenAIServer() as server:
+      monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+      client = get_client(fake_params(llm_client='openai', model='gpt-4o-mini', no_explanation=True,
+                                      requests_per_minute=0))
+      translate = client.translate if not async_requests else \
+        lambda *phrase: asyncio.run(client.async_translate(*phrase))
+      assert translate("Hello", "Bonjour") == ("[Fake] Bonjour", None)
+      assert server.last_request['stream'] and server.last_request['max_tokens'] == 32 + len("Bonjour")
+    assert client.metrics.total().completion_tokens == 3
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_gemini(self, fake_genai, async_requests):  # noqa: F811
+    client = new_client(GeminiClient, no_explanation=True)
+
+    def stopped_streams():
+      return [stream.closed if async_requests else stream.cancelled for stream in FakeGenerativeModel.created[-1].streams]
+
+    async def async_translate(*phrase):
+      # checked before the end of the event loop, which closes the async generators left open
+      return await client.async_translate(*phrase), stopped_streams()
+
+    if async_requests:
+      translation, stopped = asyncio.run(async_translate("Hello", "Bonjour"))
+    else:
+      translation, stopped = client.translate("Hello", "Bonjour"), stopped_streams()
+    assert translation == ("[Fake] Bonjour", None)
+    assert FakeGenerativeModel.created[-1].generation_configs == [{"max_output_tokens": 32 + len("Bonjour")}]
+    # the request is stopped once the translation line is read
+    assert stopped == [True]
@@ -0,0 +1,103 @@
+import json
+from types import SimpleNamespace
+
+import polib
+import pytest
+
+from auto_po_lyglot import ClientBuilder
+from auto_po_lyglot.clients.claude_client import get_message_text
+from auto_po_lyglot.clients.gemini_client import GeminiClient
+from auto_po_lyglot.clients.metrics import LLMMetrics
+from auto_po_lyglot.default_prompts import structured_output_retry_prompt
+from .fake_client import USER_PROMPT_RE, FakeClient, fake_params
+from .fake_ollama_server import FakeOllamaServer
+from .fake_openai_server import FakeOpenAIServer
+from .test_gemini import fake_genai, new_client  # noqa: F401
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class StructuredClient(FakeClient):
+  """
+  Answers a JSON object in structured output mode, after a preamble. The first nb_invalid answers are not valid.
+  """
+  nb_invalid = 0
+
+  def get_structured_translation(self, system_prompt, user_prompt):
+    assert '"translation"' in system_prompt
+    with self._calls_lock:
+      self.calls += 1
+      if self.calls <= self.nb_invalid:
+        return "Sure! Here is the translation:\n[Italian] ..."
+    context_translation = USER_PROMPT_RE.search(user_prompt.replace(structured_output_retry_prompt, '')).group('context')
+    answer = {"translation": self.fake_translation(context_translation), "explanation": "first line\nsecond line"}
+    return f"Here is the JSON:\n```json\n{json.dumps(answer, ensure_ascii=False)}\n```"
+
+
+def structured_client(nb_invalid=0, **kwargs):
+  client = StructuredClient(fake_params(structured_output=True, **kwargs), 'Italian')
+  client.nb_invalid = nb_invalid
+  return client
+
+
+class TestStructuredOutput:
+
+  @pytest.mark.parametrize('raw_result, expected', [
+    ('{"translation": "Ciao", "explanation": ""}', ("Ciao", None)),
+    ('Preamble\n```json\n{"translation": "Ciao\\nmondo", "explanation": "why"}\n```', ("Ciao\nmondo", "why")),
+    ('{"translation": "\\"Ciao\\"", "explanation": null}', ("Ciao", None)),
+  ])
+  def test_validator(self, raw_result, expected):
+    assert FakeClient(fake_params(), 'Italian').process_structured_translation(raw_result) == expected
+
+  @pytest.mark.parametrize('raw_result', ['"Ciao"', '{"translation": ""}', '{"explanation": "x"}', '{"translation": '])
+  def test_validator_errors(self, raw_result):
+    with pytest.raises(ValueError):
+      FakeClient(fake_params(), 'Italian').process_structured_translation(raw_result)
+
+  @pytest.mark.parametrize('async_requests', [False, True])
+  def test_translate_pofile(self, tmp_path, async_requests):
+    client = structured_client(async_requests=async_requests, workers=4)
+    client.translate_pofile(INPUT_PO, tmp_path / 'it.po')
+    for entry in polib.pofile(tmp_path / 'it.po'):
+      if entry.msgid and not entry.fuzzy and not entry.msgid_plural:
+        assert entry.msgstr.startswith('[Italian] ') and entry.comment == 'first line\nsecond line'
+
+  def test_single_retry(self):
+    client = structured_client(nb_invalid=1)
+    assert client.translate("Hello", "Bonjour") == ("[Italian] Bonjour", "first line\nsecond line")
+    assert client.calls == 2
+
+  def test_failed_after_retry(self):
+    client = structured_client(nb_invalid=2)
+    res = client.translate_entry(polib.POEntry(msgid="Hello", msgstr="Bonjour"))
+    assert res['status'] == 'Failed' and res['entry'].msgstr == ''
+    assert client.calls == 2
+
+  def test_openai_response_format(self, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'fake-key')
+    with FakeOpenAIServer() as server:
+      monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+      client = ClientBuilder(fake_params(llm_client='openai', model='gpt-4o-mini', structured_output=True,
+                                         requests_per_minute=0)).get_client()
+      client.target_language, client.metrics = 'Italian', LLMMetrics()
+      request = client.get_completion_request('system', 'user', structured=True)
+      assert request['response_format']['json_schema']['schema']['additionalProperties'] is False
+      assert client.translate("Hello", "Bonjour") == ("[Fake] Bonjour", None)
+
+  def test_ollama_native_format(self):
+    with FakeOllamaServer() as server:
+      client = ClientBuilder(fake_params(llm_client='ollama_native', model='qwen2.5:3b', structured_output=True,
+                                         ollama_base_url=server.base_url)).get_client()
+      client.target_language, client.metrics = 'Italian', LLMMetrics()
+      assert client.translate("Hello", "Bonjour") == ("[Fake] Bonjour", None)
+      assert server.chat_requests[-1]['format']['required'] == ['translation', 'explanation']
+
+  def test_claude_tool_use(self):
+    message = SimpleNamespace(content=[SimpleNamespace(type='tool_use', input={"translation": "Ciao", "explanation": ""})])
+    assert json.loads(get_message_text(message)) == {"translation": "Ciao", "explanation": ""}
+    assert get_message_text(SimpleNamespace(content=[SimpleNamespace(type='text', text='"Ciao"')])) == '"Ciao"'
+
+  def test_gemini_response_schema(self, fake_genai):  # noqa: F811
+    client = new_client(GeminiClient, structured_output=True)
+    assert client.translate("Hello", "Bonjour") == ("[Fake] Bonjour", None)
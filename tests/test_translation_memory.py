@@ -0,0 +1,59 @@
+from auto_po_lyglot.translation_memory import TranslationMemory
+from .fake_client import FakeClient, fake_params
+
+INPUT_PO = 'tests/input/test.po'
+
+
+class ExplainingClient(FakeClient):
+  """Adds an explanation after the translation"""
+  def get_translation(self, system_prompt, user_prompt):
+    return super().get_translation(system_prompt, user_prompt) + "\nAn explanation"
+
+
+class TestTranslationMemory:
+
+  def test_reused_across_runs(self, tmp_path):
+    memory_file = tmp_path / 'memory.sqlite'
+    first = FakeClient(fake_params(translation_memory=memory_file), 'Italian')
+    first.translate_pofile(INPUT_PO, tmp_path / 'first.po')
+    assert first.calls > 0
+    assert first.translation_memory.hits == 0
+
+    # another output file, so nothing is already translated, but everything is in the memory
+    second = FakeClient(fake_params(translation_memory=memory_file), 'Italian')
+    second.translate_pofile(INPUT_PO, tmp_path / 'second.po')
+    assert second.calls == 0
+    assert second.translation_memory.hits == first.calls
+    assert (tmp_path / 'first.po').read_text().count('[Italian]') == (tmp_path / 'second.po').read_text().count('[Italian]')
+
+    # another target language is not in the memory
+    spanish = FakeClient(fake_params(translation_memory=memory_file), 'Spanish')
+    assert spanish.translate("Hello", "Bonjour") == ("[Spanish] Bonjour", None)
+    assert spanish.calls == 1
+
+  def test_no_explanation(self, tmp_path):
+    memory_file = tmp_path / 'memory.sqlite'
+    client = ExplainingClient(fake_params(translation_memory=memory_file, no_explanation=True), 'Italian')
+    assert client.translate("Hello", "Bonjour") == ("[Italian] Bonjour", None)
+    # the translation without explanation is not reused when the explanations are wanted
+    client = ExplainingClient(fake_params(translation_memory=memory_file), 'Italian')
+    assert client.translate("Hello", "Bonjour") == ("[Italian] Bonjour", "An explanation")
+    assert client.calls == 1
+
+  def test_forced(self, tmp_path):
+    memory_file = tmp_path / 'memory.sqlite'
+    FakeClient(fake_params(translation_memory=memory_file), 'Italian').translate("Hello", "Bonjour")
+    client = FakeClient(fake_params(translation_memory=memory_file, force=True), 'Italian')
+    client.translate("Hello", "Bonjour")
+    assert client.calls == 1
+
+  def test_lru_eviction(self, tmp_path):
+    memory = TranslationMemory(tmp_path / 'memory.sqlite', max_entries=10)
+    for i in range(10):
+      memory.put(f"key{i}", f"translation{i}", None)
+    assert memory.get("key0") == ("translation0", None)  # key0 becomes the most recently used
+    memory.put("key10", "translation10", None)
+    assert memory.size <= 10
+    assert memory.get("key0") is not None
+    assert memory.get("key1") is None
+    assert memory.get("key10") is not None